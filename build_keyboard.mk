@@ -96,8 +96,22 @@ MAIN_KEYMAP_PATH_3 := $(KEYBOARD_PATH_3)/keymaps/$(KEYMAP)
 MAIN_KEYMAP_PATH_4 := $(KEYBOARD_PATH_4)/keymaps/$(KEYMAP)
 MAIN_KEYMAP_PATH_5 := $(KEYBOARD_PATH_5)/keymaps/$(KEYMAP)
 
-# Pull in rules from info.json
-INFO_RULES_MK = $(shell bin/qmk generate-rules-mk --quiet --escape --keyboard $(KEYBOARD) --output $(KEYBOARD_OUTPUT)/src/rules.mk)
+# Pull in rules from info.json. This also writes info_config.h, default_keyboard.h
+# and layouts.h. generate-all records every file it read, and the python sources
+# of the CLI, in INFO_DEPFILE, so we only run python again when one of those files
+# has changed, or one of the files it writes is missing. The check needs --eval
+# from GNU make 4.0 or later. Older versions, such as the make 3.81 that ships
+# with macOS, fail the check and run python every time.
+INFO_RULES_MK := $(KEYBOARD_OUTPUT)/src/rules.mk
+INFO_DEPFILE := $(KEYBOARD_OUTPUT)/src/info_deps.d
+INFO_OUTPUTS := $(INFO_DEPFILE) $(addprefix $(KEYBOARD_OUTPUT)/src/,rules.mk info_config.h default_keyboard.h layouts.h)
+INFO_CURRENT :=
+ifeq ($(words $(wildcard $(INFO_OUTPUTS))),$(words $(INFO_OUTPUTS)))
+    INFO_CURRENT := $(shell $(MAKE) --no-print-directory -q -f $(INFO_DEPFILE) --eval='$(abspath $(INFO_DEPFILE)): ; @:' $(abspath $(INFO_DEPFILE)) >/dev/null 2>&1 && echo current)
+endif
+ifneq ($(INFO_CURRENT),current)
+    INFO_RULES_MK := $(shell bin/qmk generate-all --quiet --escape --keyboard $(KEYBOARD) --output $(KEYBOARD_OUTPUT)/src --depfile $(INFO_DEPFILE))
+endif
 include $(INFO_RULES_MK)
 
 # Check for keymap.json first, so we can regenerate keymap.c
@@ -274,33 +288,17 @@ ifneq ("$(wildcard $(KEYBOARD_PATH_5)/post_config.h)","")
     POST_CONFIG_H += $(KEYBOARD_PATH_5)/post_config.h
 endif
 
-# Pull in stuff from info.json
-INFO_JSON_FILES :=
-ifneq ("$(wildcard $(KEYBOARD_PATH_1)/info.json)","")
-    INFO_JSON_FILES += $(KEYBOARD_PATH_1)/info.json
-endif
-ifneq ("$(wildcard $(KEYBOARD_PATH_2)/info.json)","")
-    INFO_JSON_FILES += $(KEYBOARD_PATH_2)/info.json
-endif
-ifneq ("$(wildcard $(KEYBOARD_PATH_3)/info.json)","")
-    INFO_JSON_FILES += $(KEYBOARD_PATH_3)/info.json
-endif
-ifneq ("$(wildcard $(KEYBOARD_PATH_4)/info.json)","")
-    INFO_JSON_FILES += $(KEYBOARD_PATH_4)/info.json
-endif
-ifneq ("$(wildcard $(KEYBOARD_PATH_5)/info.json)","")
-    INFO_JSON_FILES += $(KEYBOARD_PATH_5)/info.json
-endif
-
 CONFIG_H += $(KEYBOARD_OUTPUT)/src/info_config.h $(KEYBOARD_OUTPUT)/src/layouts.h
 
-$(KEYBOARD_OUTPUT)/src/info_config.h: $(INFO_JSON_FILES)
+# generate-all keeps these up to date when their inputs change, and only touches
+# them when their content changes. These rules just recreate a missing file.
+$(KEYBOARD_OUTPUT)/src/info_config.h:
 	bin/qmk generate-config-h --quiet --keyboard $(KEYBOARD) --output $(KEYBOARD_OUTPUT)/src/info_config.h
 
-$(KEYBOARD_OUTPUT)/src/default_keyboard.h: $(INFO_JSON_FILES)
+$(KEYBOARD_OUTPUT)/src/default_keyboard.h:
 	bin/qmk generate-keyboard-h --quiet --keyboard $(KEYBOARD) --output $(KEYBOARD_OUTPUT)/src/default_keyboard.h
 
-$(KEYBOARD_OUTPUT)/src/layouts.h: $(INFO_JSON_FILES)
+$(KEYBOARD_OUTPUT)/src/layouts.h:
 	bin/qmk generate-layouts --quiet --keyboard $(KEYBOARD) --output $(KEYBOARD_OUTPUT)/src/layouts.h
 
 generated-files: $(KEYBOARD_OUTPUT)/src/info_config.h $(KEYBOARD_OUTPUT)/src/default_keyboard.h $(KEYBOARD_OUTPUT)/src/layouts.h
@@ -0,0 +1,203 @@
+"""Work out which keyboard:keymap targets a set of changed files can affect.
+
+This follows the same rules `make` uses to find the files for a build:
+
+* A keyboard reads the files in every folder from `keyboards/` down to its own, and whatever those folders pull in from the folders next to them.
+* A keymap is the deepest `keymaps/<keymap>` folder from the keyboard up, or a `layouts/community/` or `layouts/default/` folder for one of the keyboard's community layouts.
+* A keymap builds the userspace in `users/<USER_NAME>`, which is `users/<keymap>` unless the keymap's rules.mk sets `USER_NAME`.
+
+Changes anywhere else, including `data/` mappings and schemas, can affect every target.
+"""
+from collections import namedtuple
+from pathlib import Path, PurePosixPath
+
+from milc import cli
+
+from qmk import keyboard_index
+from qmk.info import find_info_json
+from qmk.json_schema import json_load
+from qmk.keyboard import list_keyboards, rules_mk
+from qmk.keymap import is_keymap_dir, list_keymaps, locate_keymap
+from qmk.makefile import parse_rules_mk_file
+from qmk.parse_cache import shared_parses
+
+# Changes to these never affect a build
+IGNORED_DIRS = ('.github', 'docs')
+IGNORED_SUFFIXES = ('.md', '.gif', '.jpg', '.jpeg', '.png', '.svg')
+
+LAYOUT_REPOS = ('layouts/community', 'layouts/default')
+
+
+Changes = namedtuple('Changes', ('everything', 'keyboard_dirs', 'keymaps', 'layout_keymaps', 'layouts', 'users'))
+
+
+def sort_changes(files):
+    """Sort changed files by what they can affect.
+
+    Returns:
+        a `Changes` tuple of:
+
+        * `everything`: the files that can affect every target
+        * `keyboard_dirs`: folders under `keyboards/` with changed files that aren't in a `keymaps` folder
+        * `keymaps`: (keyboard folder, keymap) for changed files in `keyboards/<folder>/keymaps/<keymap>/`, keymap is None for files directly in `keymaps/`
+        * `layout_keymaps`: (layout, keymap) for changed files in `layouts/*/<layout>/<keymap>/`
+        * `layouts`: layouts with changed files that aren't in a keymap
+        * `users`: userspaces with changed files
+    """
+    changes = Changes([], set(), set(), set(), set(), set())
+
+    for file in map(PurePosixPath, files):
+        parts = file.parts
+
+        if not parts or parts[0] in IGNORED_DIRS or file.suffix.lower() in IGNORED_SUFFIXES:
+            continue
+
+        if parts[0] == 'keyboards':
+            folder = parts[1:-1]
+
+            if 'keymaps' in folder:
+                keymaps = folder.index('keymaps')
+                changes.keymaps.add(('/'.join(folder[:keymaps]), folder[keymaps + 1] if keymaps + 1 < len(folder) else None))
+
+            elif folder:
+                changes.keyboard_dirs.add('/'.join(folder))
+
+        elif parts[0] == 'layouts':
+            if '/'.join(parts[:2]) in LAYOUT_REPOS and len(parts) > 4:
+                changes.layout_keymaps.add((parts[2], parts[3]))
+
+            elif '/'.join(parts[:2]) in LAYOUT_REPOS and len(parts) == 4:
+                changes.layouts.add(parts[2])
+
+        elif parts[0] == 'users':
+            if len(parts) > 2:
+                changes.users.add(parts[1])
+
+        else:
+            changes.everything.append(str(file))
+
+    return changes
+
+
+def _owner(folder, keyboard_folders):
+    """Returns the closest folder at or above `folder` that has a keyboard in it or below it.
+
+    Code shared by the keyboards in a folder, such as `keyboards/<vendor>/common/`, is used by every keyboard in the folder above it.
+    """
+    folder = PurePosixPath(folder)
+
+    while str(folder) != '.' and str(folder) not in keyboard_folders:
+        folder = folder.parent
+
+    return None if str(folder) == '.' else str(folder)
+
+
+def _is_below(keyboard, folder):
+    """Returns True if `keyboard` is `folder` or inside it.
+    """
+    return keyboard == folder or keyboard.startswith(folder + '/')
+
+
+def _keyboard_keymap(keyboard, keymap):
+    """Returns the keymap folder under `keyboards/` that `keymap` is built from for `keyboard`, or None.
+    """
+    keymap_file = locate_keymap(keyboard, keymap)
+
+    if keymap_file and keymap_file.parts[0] == 'keyboards':
+        return keymap_file.parent.as_posix()
+
+
+def _layout_keymaps(layout):
+    """Returns the names of the keymaps for `layout` in every layout repo.
+    """
+    keymaps = set()
+
+    for repo in LAYOUT_REPOS:
+        keymaps.update(keymap for keymap in keyboard_index.subdirectories(f'{repo}/{layout}') if is_keymap_dir(Path(repo, layout, keymap)))
+
+    return keymaps
+
+
+def _layouts(keyboard):
+    """Returns the community layouts a keyboard supports, from its rules.mk and info.json files.
+    """
+    layouts = set(rules_mk(keyboard).get('LAYOUTS', '').split())
+
+    for info_json in find_info_json(keyboard):
+        # Most don't set any, and parsing them all is slow
+        if 'community_layouts' in info_json.read_text(encoding='utf-8'):
+            layouts.update(json_load(info_json).get('community_layouts', []))
+
+    return layouts
+
+
+def _user_name(keyboard, keymap):
+    """Returns the userspace a keymap builds with.
+    """
+    keymap_file = locate_keymap(keyboard, keymap)
+
+    if keymap_file:
+        return parse_rules_mk_file(keymap_file.parent / 'rules.mk').get('USER_NAME', keymap)
+
+    return keymap
+
+
+def changed_files(revision_range):
+    """Returns the files `git diff` lists for `revision_range`, including deleted files and both sides of renames.
+
+    Args:
+        revision_range: anything `git diff` accepts, such as `origin/master...HEAD`, or a single commit to include uncommitted changes
+    """
+    git_diff = cli.run(['git', 'diff', '--name-only', '--no-renames', '-z', revision_range, '--'])
+
+    if git_diff.returncode != 0:
+        raise ValueError(git_diff.stderr.strip())
+
+    return [file for file in git_diff.stdout.split('\0') if file]
+
+
+def affected_targets(files):
+    """Returns the (keyboard, keymap) targets that changes to `files` can affect.
+
+    Args:
+        files: paths relative to the root of qmk_firmware, including files that have since been deleted
+
+    Returns:
+        a sorted list of (keyboard, keymap) tuples
+    """
+    changes = sort_changes(files)
+    targets = set()
+
+    with shared_parses():
+        keyboards = list_keyboards()
+        keyboard_folders = {str(parent) for keyboard in keyboards for parent in PurePosixPath(keyboard).parents} | set(keyboards)
+        owners = {_owner(folder, keyboard_folders) for folder in changes.keyboard_dirs} - {None}
+
+        for keyboard in keyboards:
+            if changes.everything or any(_is_below(keyboard, owner) for owner in owners):
+                targets.update((keyboard, keymap) for keymap in list_keymaps(keyboard))
+                continue
+
+            for folder, keymap in changes.keymaps:
+                if _is_below(keyboard, folder):
+                    for name in [keymap] if keymap else keyboard_index.subdirectories(f'keyboards/{folder}/keymaps'):
+                        if (_keyboard_keymap(keyboard, name) or '').startswith(f'keyboards/{folder}/keymaps/'):
+                            targets.add((keyboard, name))
+
+            layouts = _layouts(keyboard) if changes.layouts or changes.layout_keymaps else set()
+            layout_keymaps = set()
+
+            for layout in changes.layouts & layouts:
+                layout_keymaps.update(_layout_keymaps(layout))
+
+            for layout, keymap in changes.layout_keymaps:
+                if layout in layouts and any(is_keymap_dir(Path(repo, layout, keymap)) for repo in LAYOUT_REPOS):
+                    layout_keymaps.add(keymap)
+
+            # A keymap in the keyboard's own folders is used instead of the layout's
+            targets.update((keyboard, keymap) for keymap in layout_keymaps if not _keyboard_keymap(keyboard, keymap))
+
+            if changes.users:
+                targets.update((keyboard, keymap) for keymap in list_keymaps(keyboard) if _user_name(keyboard, keymap) in changes.users)
+
+    return sorted(targets)
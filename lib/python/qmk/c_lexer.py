@@ -0,0 +1,104 @@
+"""A single pass lexer for the parts of C that the CLI reads from headers.
+
+The text is scanned once for the tokens that change how the rest of a line is read: comments, string and character literals, and line continuations. Everything between them is passed through untouched. This follows the order the C preprocessor works in:
+
+* A backslash at the end of a line joins it to the next line, including inside comments and strings.
+* Comments are replaced by a single space, so a `/* */` comment spanning several lines joins them into one logical line.
+* Comment markers inside string and character literals are not comments. An unterminated literal ends at the end of its line.
+"""
+from collections import namedtuple
+import re
+
+# Stands in for each newline removed while joining lines, so line numbers can still be counted
+JOINED = '\0'
+
+token_regex = re.compile(r'//[^\\\n]*(?:\\.[^\\\n]*)*|/\*[^*]*(?:\*+(?!/)[^*]*)*(?:\*/|\Z)|"[^"\\\n]*(?:\\.[^"\\\n]*)*"?|\'[^\'\\\n]*(?:\\.[^\'\\\n]*)*\'?|\\\n', re.DOTALL)
+directive_regex = re.compile(r'^(?:[^\S\n]|\0)*#(?:[^\S\n]|\0)*(\w*)([^\n]*)', re.MULTILINE)
+define_regex = re.compile(r'(\w+)(\(([^)]*)\))?(.*)', re.DOTALL)
+
+Directive = namedtuple('Directive', ('line', 'name', 'text', 'logical_line'))
+Define = namedtuple('Define', ('name', 'params', 'value'))
+
+
+def _join_token(match):
+    """Replace a token with the text it stands for once comments are removed and lines are joined.
+    """
+    token = match.group(0)
+
+    if token == '\\\n':
+        return JOINED
+
+    if token[0] == '/':
+        return ' ' + JOINED * token.count('\n')
+
+    return token.replace('\\\n', JOINED) if '\\\n' in token else token
+
+
+def _join_lines(text):
+    """Returns `text` with each comment replaced by a space and each continued line joined, leaving a `JOINED` in place of every newline that was removed.
+    """
+    return token_regex.sub(_join_token, text)
+
+
+def logical_lines(text):
+    """Yields (line number, line) for each logical line of C source, with comments replaced by a space and continued lines joined.
+
+    The line number is the line of the text each logical line starts on.
+    """
+    line_number = 1
+
+    for line in _join_lines(text).split('\n'):
+        if JOINED in line:
+            yield line_number, line.replace(JOINED, '')
+            line_number += line.count(JOINED) + 1
+
+        else:
+            yield line_number, line
+            line_number += 1
+
+
+def directives(text):
+    """Yields a `Directive` for each preprocessor directive in C source.
+
+    `name` is the directive without the `#`, such as `define`, and `text` is the rest of the logical line with surrounding whitespace removed. `logical_line` is the whole line, for parsers that also care how the directive is written.
+    """
+    text = _join_lines(text)
+    line_number = 1
+    position = 0
+
+    for match in directive_regex.finditer(text):
+        start = match.start()
+        line_number += text.count('\n', position, start) + text.count(JOINED, position, start)
+        position = start
+        line = match.group(0)
+
+        if JOINED in line:
+            yield Directive(line_number, match.group(1), match.group(2).replace(JOINED, '').strip(), line.replace(JOINED, ''))
+
+        else:
+            yield Directive(line_number, match.group(1), match.group(2).strip(), line)
+
+
+def parse_define(text):
+    """Split the text of a `#define` into a `Define` of its name, parameters and value.
+
+    `params` is the text between the parentheses of a function-like macro, or None for an object-like macro. Returns None if `text` doesn't start with a macro name.
+    """
+    match = define_regex.match(text)
+
+    if match:
+        return Define(match.group(1), match.group(3), match.group(4).strip())
+
+
+def remove_comments(text):
+    """Returns `text` with each comment replaced by a space, leaving everything else, including line continuations, in place.
+    """
+    return token_regex.sub(_comment_stripper, text)
+
+
+def _comment_stripper(match):
+    """Replace a comment token with a space.
+    """
+    token = match.group(0)
+
+    return ' ' if token[0] == '/' else token
@@ -1,27 +1,26 @@
 """Functions for working with config.h files.
 """
 from pathlib import Path
-import re
 
-from milc import cli
-
-from qmk.comment_remover import comment_remover
+from qmk import diagnostics
+from qmk.c_lexer import directives, parse_define, remove_comments
+from qmk.layers import Setting, layer
+from qmk.layout import Key, Layout
+from qmk.parse_cache import cached_parse
 
 default_key_entry = {'x': -1, 'y': 0, 'w': 1}
-single_comment_regex = re.compile(r' */[/*].*$')
-multi_comment_regex = re.compile(r'/\*(.|\n)*?\*/', re.MULTILINE)
 
 
 def strip_line_comment(string):
     """Removes comments from a single line string.
     """
-    return single_comment_regex.sub('', string)
+    return remove_comments(string).rstrip()
 
 
 def strip_multiline_comment(string):
-    """Removes comments from a single line string.
+    """Removes comments from a string.
     """
-    return multi_comment_regex.sub('', string)
+    return remove_comments(string)
 
 
 def c_source_files(dir_names):
@@ -46,14 +45,15 @@ def find_layouts(file):
     parsed_layouts = {}
 
     # Search the file for LAYOUT macros and aliases
-    file_contents = file.read_text(encoding='utf-8')
-    file_contents = comment_remover(file_contents)
-    file_contents = file_contents.replace('\\\n', '')
+    for directive in directives(file.read_text(encoding='utf-8')):
+        define = parse_define(directive.text) if directive.name == 'define' else None
+
+        if not define:
+            continue
 
-    for line in file_contents.split('\n'):
-        if line.startswith('#define') and '(' in line and 'LAYOUT' in line:
+        if define.params is not None and directive.logical_line.startswith('#define') and 'LAYOUT' in directive.text:
             # We've found a LAYOUT macro
-            macro_name, layout, matrix = _parse_layout_macro(line.strip())
+            macro_name, layout, matrix = _parse_layout_macro(define)
 
             # Reject bad macro names
             if macro_name.startswith('LAYOUT_kc') or not macro_name.startswith('LAYOUT'):
@@ -64,12 +64,11 @@ def find_layouts(file):
 
             # Parse the layout entries into a basic structure
             default_key_entry['x'] = -1  # Set to -1 so _default_key(key) will increment it to 0
-            layout = layout.strip()
-            parsed_layout = [_default_key(key) for key in layout.split(',')]
+            parsed_layout = Layout(_default_key(key) for key in layout.split(','))
 
             for i, key in enumerate(parsed_layout):
                 if 'label' not in key:
-                    cli.log.error('Invalid LAYOUT macro in %s: Empty parameter name in macro %s at pos %s.', file, macro_name, i)
+                    diagnostics.error('E108', None, 'Invalid LAYOUT macro: Empty parameter name in macro %s at pos %s.' % (macro_name, i), file)
                 elif key['label'] in matrix_locations:
                     key['matrix'] = matrix_locations[key['label']]
 
@@ -79,13 +78,9 @@ def find_layouts(file):
                 'filename': str(file),
             }
 
-        elif '#define' in line:
-            # Attempt to extract a new layout alias
-            try:
-                _, pp_macro_name, pp_macro_text = line.strip().split(' ', 2)
-                aliases[pp_macro_name] = pp_macro_text
-            except ValueError:
-                continue
+        elif define.params is None:
+            # A new layout alias
+            aliases[define.name] = define.value
 
     return parsed_layouts, aliases
 
@@ -96,47 +91,79 @@ def parse_config_h_file(config_h_file, config_h=None):
     if not config_h:
         config_h = {}
 
+    for directive, name, value, line in cached_parse('config.h', config_h_file, _config_h_directives):
+        if directive == '#define':
+            config_h[name] = value
+
+        elif name in config_h:
+            if config_h[name] is True:
+                del config_h[name]
+            else:
+                config_h[name] = False
+
+    return config_h
+
+
+def config_h_layer(config_h_file):
+    """Returns the layer of settings a config.h file adds on top of the files read before it.
+
+    Like `parse_config_h_file()`, an `#undef` only affects the `#define`s before it in the same file.
+
+    Returns:
+        an immutable mapping of each name the file defines to a `qmk.layers.Setting`
+    """
+    settings = {}
+
+    for directive, name, value, line in cached_parse('config.h', config_h_file, _config_h_directives):
+        if directive == '#define':
+            settings[name] = Setting(value, str(config_h_file), line)
+
+        elif name in settings:
+            if settings[name].value is True:
+                del settings[name]
+            else:
+                settings[name] = Setting(False, str(config_h_file), line)
+
+    return layer(settings)
+
+
+def _config_h_directives(config_h_file):
+    """Returns the `#define` and `#undef` directives in a config.h file as a tuple of (directive, name, value, line).
+    """
+    config_h_directives = []
     config_h_file = Path(config_h_file)
 
     if config_h_file.exists():
         config_h_text = config_h_file.read_text(encoding='utf-8')
-        config_h_text = config_h_text.replace('\\\n', '')
-        config_h_text = strip_multiline_comment(config_h_text)
 
-        for linenum, line in enumerate(config_h_text.split('\n')):
-            line = strip_line_comment(line).strip()
-
-            if not line:
+        for linenum, name, text, line in directives(config_h_text):
+            # Only read directives written without a space after the `#`
+            if name not in ('define', 'undef') or not line.lstrip().startswith('#' + name):
                 continue
 
-            line = line.split()
+            words = text.split()
 
-            if line[0] == '#define':
-                if len(line) == 1:
-                    cli.log.error('%s: Incomplete #define! On or around line %s' % (config_h_file, linenum))
-                elif len(line) == 2:
-                    config_h[line[1]] = True
-                else:
-                    config_h[line[1]] = ' '.join(line[2:])
-
-            elif line[0] == '#undef':
-                if len(line) == 2:
-                    if line[1] in config_h:
-                        if config_h[line[1]] is True:
-                            del config_h[line[1]]
-                        else:
-                            config_h[line[1]] = False
+            if name == 'define':
+                if not words:
+                    diagnostics.error('E109', None, 'Incomplete #define! On or around line %s' % (linenum,), config_h_file)
+                elif len(words) == 1:
+                    config_h_directives.append(('#define', words[0], True, linenum))
                 else:
-                    cli.log.error('%s: Incomplete #undef! On or around line %s' % (config_h_file, linenum))
+                    config_h_directives.append(('#define', words[0], ' '.join(words[1:]), linenum))
 
-    return config_h
+            elif len(words) == 1:
+                config_h_directives.append(('#undef', words[0], None, linenum))
+            else:
+                diagnostics.error('E110', None, 'Incomplete #undef! On or around line %s' % (linenum,), config_h_file)
+
+    return tuple(config_h_directives)
 
 
 def _default_key(label=None):
     """Increment x and return a copy of the default_key_entry.
     """
     default_key_entry['x'] += 1
-    new_key = default_key_entry.copy()
+    new_key = Key(default_key_entry)
 
     if label:
         new_key['label'] = label
@@ -144,14 +171,10 @@ def _default_key(label=None):
     return new_key
 
 
-def _parse_layout_macro(layout_macro):
-    """Split the LAYOUT macro into its constituent parts
+def _parse_layout_macro(define):
+    """Split a LAYOUT macro into its name, parameters and matrix, with whitespace removed.
     """
-    layout_macro = layout_macro.replace('\\', '').replace(' ', '').replace('\t', '').replace('#define', '')
-    macro_name, layout = layout_macro.split('(', 1)
-    layout, matrix = layout.split(')', 1)
-
-    return macro_name, layout, matrix
+    return define.name, ''.join(define.params.split()), ''.join(define.value.split())
 
 
 def _parse_matrix_locations(matrix, file, macro_name):
@@ -161,7 +184,7 @@ def _parse_matrix_locations(matrix, file, macro_name):
 
     for row_num, row in enumerate(matrix.split('},{')):
         if row.startswith('LAYOUT'):
-            cli.log.error('%s: %s: Nested layout macro detected. Matrix data not available!', file, macro_name)
+            diagnostics.error('E107', None, '%s: Nested layout macro detected. Matrix data not available!' % (macro_name,), file)
             break
 
         row = row.replace('{', '').replace('}', '')
@@ -135,15 +135,21 @@ if cli.config.user.developer:
                 exit(1)
 
 # Import our subcommands
+from . import affected  # noqa
+from . import benchmark  # noqa
 from . import c2json  # noqa
+from . import cache  # noqa
 from . import cformat  # noqa
 from . import chibios  # noqa
 from . import clean  # noqa
 from . import compile  # noqa
 from . import config  # noqa
+from . import daemon  # noqa
 from . import docs  # noqa
 from . import doctor  # noqa
 from . import fileformat  # noqa
+from . import find  # noqa
+from . import find_usb  # noqa
 from . import flash  # noqa
 from . import format  # noqa
 from . import generate  # noqa
@@ -0,0 +1,31 @@
+"""List the keyboard:keymap targets that changes in git can affect.
+"""
+from milc import cli
+
+from qmk.affected import affected_targets, changed_files, sort_changes
+
+
+@cli.argument('-km', '--keymap', arg_only=True, help='Only list targets for this keymap.')
+@cli.argument('range', nargs='?', arg_only=True, default='origin/master', help='The changes to check, in any form `git diff` accepts. Default: origin/master, which includes uncommitted changes.')
+@cli.subcommand('List the keyboard:keymap targets that changes in git can affect.', hidden=False if cli.config.user.developer else True)
+def affected(cli):
+    """List the keyboard:keymap targets that changes in git can affect.
+    """
+    try:
+        files = changed_files(cli.args.range)
+
+    except ValueError as e:
+        cli.log.error('Could not list the changes in %s: %s', cli.args.range, e)
+        return False
+
+    everything = sort_changes(files).everything
+
+    if everything:
+        cli.log.info('{fg_cyan}%s{fg_reset} can affect every target.', everything[0])
+
+    targets = [(keyboard, keymap) for keyboard, keymap in affected_targets(files) if not cli.args.keymap or keymap == cli.args.keymap]
+
+    for keyboard, keymap in targets:
+        cli.echo(f'{keyboard}:{keymap}')
+
+    cli.log.info('%d changed files can affect %d targets.', len(files), len(targets))
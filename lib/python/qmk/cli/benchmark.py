@@ -0,0 +1,186 @@
+"""Measure the speed of parts of the QMK CLI.
+"""
+from pathlib import Path
+import re
+from time import perf_counter
+
+import jsonschema
+from milc import cli
+
+from qmk.c_lexer import directives
+from qmk.json_schema import Validator, compiled_validator, interpreted_validator, json_load, keyboard_api_validate, keyboard_validate, load_jsonschema
+
+
+def _time(function, instances, repeat):
+    """Returns the best time, out of `repeat` runs, to call `function` once with each of `instances`, and how many calls raised a validation error.
+    """
+    best = None
+
+    for _ in range(repeat):
+        failures = 0
+        start = perf_counter()
+
+        for instance in instances:
+            try:
+                function(instance)
+
+            except jsonschema.ValidationError:
+                failures += 1
+
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, failures
+
+
+def _report(subject, results, count):
+    """Print a table of timings, relative to the first result.
+    """
+    baseline = results[0][1]
+
+    cli.echo('{fg_blue}%s{fg_reset}: %d instances', subject, count)
+
+    for name, elapsed in results:
+        cli.echo('    %-24s %9.2f ms %9.1f us/instance %7.1fx', name, elapsed * 1000, elapsed * 1e6 / count, baseline / elapsed if elapsed else 0)
+
+
+def _uncached_keyboard_validate(data):
+    """Validate the way `keyboard_validate()` used to, building a new validator for every call.
+    """
+    return Validator(load_jsonschema('keyboard')).validate(data)
+
+
+def _uncached_keyboard_api_validate(data):
+    """Validate the way `keyboard_api_validate()` used to, building a new resolver and validator for every call.
+    """
+    resolver = jsonschema.RefResolver.from_schema(load_jsonschema('keyboard'))
+
+    return Validator(load_jsonschema('api_keyboard'), resolver=resolver).validate(data)
+
+
+def benchmark_schema(repeat):
+    """Compare the compiled info.json validators with jsonschema.
+    """
+    instances = [json_load(info_file) for info_file in sorted(Path('keyboards').rglob('info.json'))]
+
+    for schema_name, uncached, validate in (('keyboard', _uncached_keyboard_validate, keyboard_validate), ('api_keyboard', _uncached_keyboard_api_validate, keyboard_api_validate)):
+        if not compiled_validator(schema_name):
+            cli.log.error('The %s schema could not be compiled.', schema_name)
+            return False
+
+        results = []
+        failures = set()
+
+        for name, function in (('jsonschema, per call', uncached), ('jsonschema, cached', interpreted_validator(schema_name).validate), ('compiled', validate)):
+            elapsed, failed = _time(function, instances, repeat)
+            results.append((name, elapsed))
+            failures.add(failed)
+
+        _report(f'{schema_name}.jsonschema', results, len(instances))
+
+        if len(failures) != 1:
+            cli.log.error('The validators disagree about how many instances are invalid: %s', ', '.join(map(str, sorted(failures))))
+            return False
+
+    return True
+
+
+_comment_regex = re.compile(r'//.*?$|/\*.*?\*/|\'(?:\\.|[^\\\'])*\'|"(?:\\.|[^\\"])*"', re.DOTALL | re.MULTILINE)
+_line_comment_regex = re.compile(r' */[/*].*$')
+_line_join_regex = re.compile(r'\\\n|/\*(?:.|\n)*?\*/')
+
+
+def _regex_logical_lines(text):
+    """Split C source into (line number, line) the way `qmk.c_parse` used to, before it used `qmk.c_lexer`.
+    """
+    lines = []
+    current = ''
+    line_number = start = 1
+    position = 0
+
+    for match in [*_line_join_regex.finditer(text), None]:
+        end = match.start() if match else len(text)
+        *complete, partial = text[position:end].split('\n')
+
+        for segment in complete:
+            lines.append((start, current + segment))
+            line_number += 1
+            start = line_number
+            current = ''
+
+        current += partial
+
+        if match:
+            line_number += match.group(0).count('\n')
+            position = match.end()
+
+    lines.append((start, current))
+
+    return lines
+
+
+def _regex_directives(header):
+    """Find the `#define` and `#undef` lines in a header the way the parsers used to, each with its own regexes.
+    """
+    name, text = header
+
+    if name == 'config.h':
+        found = []
+
+        for line_number, line in _regex_logical_lines(text):
+            line = _line_comment_regex.sub('', line).strip().split()
+
+            if line and line[0] in ('#define', '#undef'):
+                found.append((line_number, line))
+
+        return found
+
+    text = _comment_regex.sub(lambda match: ' ' if match.group(0).startswith('/') else match.group(0), text)
+
+    return [line for line in text.replace('\\\n', '').split('\n') if '#define' in line]
+
+
+def _lexer_directives(header):
+    """Find the `#define` and `#undef` directives in a header with `qmk.c_lexer`.
+    """
+    return [directive for directive in directives(header[1]) if directive.name in ('define', 'undef')]
+
+
+def benchmark_lexer(repeat):
+    """Compare the C lexer with the regexes the header parsers used before.
+    """
+    headers = []
+
+    for file in sorted(Path('keyboards').rglob('*.h')):
+        if file.name == 'config.h' or file.name == file.parent.name + '.h':
+            headers.append(('config.h' if file.name == 'config.h' else 'keyboard.h', file.read_text(encoding='utf-8')))
+
+    results = [(name, _time(function, headers, repeat)[0]) for name, function in (('regexes', _regex_directives), ('lexer', _lexer_directives))]
+    _report('config.h and keyboard.h', results, len(headers))
+
+    return True
+
+
+benchmarks = {
+    'lexer': benchmark_lexer,
+    'schema': benchmark_schema,
+}
+
+
+@cli.argument('-n', '--repeat', type=int, default=3, help='Number of times to run each benchmark, the best time is reported.')
+@cli.argument('subject', nargs='*', arg_only=True, help=f'What to benchmark: {", ".join(sorted(benchmarks))}. Everything if omitted.')
+@cli.subcommand('Measure the speed of parts of the QMK CLI.', hidden=False if cli.config.user.developer else True)
+def benchmark(cli):
+    """Run benchmarks and print how long each one took.
+    """
+    success = True
+    unknown = [subject for subject in cli.args.subject if subject not in benchmarks]
+
+    if unknown:
+        cli.log.error('Unknown benchmark: %s', ', '.join(unknown))
+        return False
+
+    for subject in cli.args.subject or sorted(benchmarks):
+        success = benchmarks[subject](max(1, cli.config.benchmark.repeat)) and success
+
+    return success
@@ -0,0 +1,29 @@
+"""Inspect or clear the info.json cache.
+"""
+from milc import cli
+
+from qmk import info_cache
+
+
+@cli.argument('-c', '--clear', arg_only=True, action='store_true', help='Remove every cached entry and reset the statistics.')
+@cli.subcommand('Show statistics for the info.json cache.', hidden=False if cli.config.user.developer else True)
+def cache(cli):
+    """Show statistics for the info.json cache, or clear it.
+    """
+    if cli.args.clear:
+        info_cache.cache_clear()
+        cli.log.info('Cleared the info.json cache in {fg_cyan}%s', info_cache.CACHE_DIR)
+        return True
+
+    stats = info_cache.load_stats()
+    lookups = stats['hits'] + stats['misses']
+    hit_rate = 100 * stats['hits'] / lookups if lookups else 0
+    entries = info_cache.cache_info().currsize
+    size = sum(file.stat().st_size for file in info_cache.CACHE_DIR.glob('*.json')) if info_cache.CACHE_DIR.exists() else 0
+
+    cli.echo('{fg_blue}Location{fg_reset}: %s', info_cache.CACHE_DIR)
+    cli.echo('{fg_blue}Enabled{fg_reset}: %s', info_cache.enabled())
+    cli.echo('{fg_blue}Entries{fg_reset}: %s (%s KiB)', entries, size // 1024)
+    cli.echo('{fg_blue}Hits{fg_reset}: %s', stats['hits'])
+    cli.echo('{fg_blue}Misses{fg_reset}: %s', stats['misses'])
+    cli.echo('{fg_blue}Hit rate{fg_reset}: %.1f%%', hit_rate)
@@ -0,0 +1,254 @@
+"""Keep a warm QMK CLI process that `bin/qmk` hands commands to.
+"""
+import logging
+import os
+import runpy
+import signal
+import socket
+import sys
+import traceback
+
+import colorama
+from milc import cli
+from milc.attrdict import AttrDict
+
+from qmk import daemon as qmk_daemon
+from qmk import info_cache, keyboard_aliases
+from qmk.constants import QMK_FIRMWARE
+from qmk.json_schema import compiled_validator
+from qmk.mappings import load_mapping
+
+
+def _warm_up():
+    """Parse and compile everything a command is likely to need, so every forked request starts with it in memory.
+
+    None of this depends on a particular keyboard. It is all built from the files in `qmk_daemon.source_signature()`, so it is thrown away with the daemon when they change.
+    """
+    for mapping_name in ('info_config', 'info_rules'):
+        load_mapping(mapping_name)
+
+    for schema_name in ('keyboard', 'api_keyboard'):
+        compiled_validator(schema_name)
+
+    keyboard_aliases.index()
+    info_cache.global_digest()
+
+
+def _reset_cli():
+    """Forget the arguments and configuration of the `qmk daemon` command, so `cli()` can run again.
+
+    milc expects to run a single command per process, and has no public way to do this. The colorama wrappers around stdout and stderr are replaced too, because whether they strip colors was decided by where the daemon's own output went.
+    """
+    sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    colorama.init()
+    cli.log_print_to = sys.stderr
+    cli.args = AttrDict()
+    cli._subcommand = None
+    cli._inside_context_manager = False
+    cli.interactive = sys.stdin.isatty()
+    cli.log_print_level = logging.INFO
+    cli.initialize_config()
+
+
+def _run_request(connection, request, fds):
+    """Run one command in a forked copy of the daemon.
+
+    Returns:
+        the exit code of the command
+    """
+    # Give the command its own process group, so the caller's signals can be passed on to everything it runs
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+
+    os.umask(request['umask'])
+    os.environ.clear()
+    os.environ.update(request['environ'])
+    os.chdir(request['cwd'])
+    sys.argv = request['argv']
+    _reset_cli()
+
+    qmk_daemon.send_int(connection, os.getpid())
+
+    try:
+        # Everything `bin/qmk` imports is already loaded, so this only runs its `main()`
+        runpy.run_path(str(QMK_FIRMWARE / 'bin' / 'qmk'), run_name='qmk_main')['main']()
+        exit_code = 0
+
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            exit_code = e.code or 0
+
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+
+    except KeyboardInterrupt:
+        exit_code = 128 + signal.SIGINT
+
+    except Exception:
+        traceback.print_exc()
+        exit_code = 255
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    return exit_code
+
+
+def _stop():
+    """Ask the running daemon to exit.
+    """
+    connection = qmk_daemon.connect(QMK_FIRMWARE)
+
+    if not connection:
+        cli.log.error('qmk daemon is not running.')
+        return False
+
+    with connection:
+        qmk_daemon.send_message(connection, {'version': qmk_daemon.PROTOCOL_VERSION, 'stop': True})
+        qmk_daemon.receive_int(connection)
+
+    cli.log.info('Stopped qmk daemon.')
+    return True
+
+
+def _listen(socket_file):
+    """Returns a socket listening on `socket_file`, or None if another daemon is already listening there.
+    """
+    connection = qmk_daemon.connect(QMK_FIRMWARE)
+
+    if connection:
+        connection.close()
+        return None
+
+    if socket_file.exists():
+        # Left behind by a daemon that didn't exit cleanly
+        socket_file.unlink()
+
+    socket_file.parent.mkdir(parents=True, exist_ok=True)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    # Only this user can connect, and so run commands as this user
+    umask = os.umask(0o077)
+
+    try:
+        listener.bind(str(socket_file))
+
+    finally:
+        os.umask(umask)
+
+    listener.listen(64)
+
+    return listener
+
+
+def _serve(listener, signature):
+    """Handle requests until the daemon is stopped or out of date.
+
+    Returns:
+        True if the daemon should restart itself
+    """
+    while True:
+        connection, _ = listener.accept()
+
+        with connection:
+            try:
+                request, fds = qmk_daemon.receive_message(connection)
+
+            except (OSError, EOFError, ValueError):
+                continue
+
+            try:
+                if request.get('stop'):
+                    qmk_daemon.send_int(connection, 0)
+                    return False
+
+                if request.get('version') != qmk_daemon.PROTOCOL_VERSION or len(fds) != 3:
+                    qmk_daemon.send_int(connection, 0)
+                    continue
+
+                if qmk_daemon.source_signature(QMK_FIRMWARE) != signature:
+                    # Let the caller run the command itself while we restart
+                    cli.log.info('The QMK CLI has changed, restarting.')
+                    qmk_daemon.send_int(connection, 0)
+                    return True
+
+                if os.fork() == 0:
+                    exit_code = 255
+
+                    try:
+                        listener.close()
+                        exit_code = _run_request(connection, request, fds)
+                        qmk_daemon.send_int(connection, exit_code)
+
+                    finally:
+                        os._exit(exit_code)
+
+            except OSError as e:
+                cli.log.debug('Could not handle a request: %s', e)
+
+            finally:
+                for fd in fds:
+                    os.close(fd)
+
+
+@cli.argument('--stop', arg_only=True, action='store_true', help='Stop the running daemon.')
+@cli.subcommand('Keep a warm QMK CLI process that bin/qmk hands commands to.')
+def daemon(cli):
+    """Run commands sent by `bin/qmk` in forked copies of this process.
+
+    Forking a process that has already imported every subcommand and loaded the schemas and mappings is much faster than starting a new interpreter for each command.
+    """
+    if not qmk_daemon.supported():
+        cli.log.error('qmk daemon is not supported on %s.', cli.platform)
+        return False
+
+    if cli.args.stop:
+        return _stop()
+
+    socket_file = qmk_daemon.socket_file(QMK_FIRMWARE)
+    signature = qmk_daemon.source_signature(QMK_FIRMWARE)
+
+    try:
+        listener = _listen(socket_file)
+
+    except OSError as e:
+        cli.log.error('Could not listen on %s: %s', socket_file, e)
+        return False
+
+    if not listener:
+        cli.log.error('qmk daemon is already running on %s.', socket_file)
+        return False
+
+    _warm_up()
+
+    # Reap finished commands automatically, and exit cleanly on SIGTERM
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    cli.log.info('qmk daemon listening on {fg_cyan}%s', socket_file)
+    restart = False
+
+    try:
+        restart = _serve(listener, signature)
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        listener.close()
+
+        if socket_file.exists():
+            socket_file.unlink()
+
+    if restart:
+        os.execv(sys.executable, [sys.executable, str(QMK_FIRMWARE / 'bin' / 'qmk'), 'daemon'])
+
+    cli.log.info('qmk daemon stopped.')
+    return True
@@ -0,0 +1,41 @@
+"""Search for keyboards by their info.json data.
+"""
+from milc import cli
+
+from qmk import search
+from qmk.keyboard import list_keyboards
+
+
+@cli.argument('-f', '--filter', arg_only=True, action='append', default=[], help="Only list keyboards matching this expression, eg 'processor=STM32F303 and features.rgblight'. May be passed multiple times, all of them must match.")
+@cli.argument('-p', '--print', arg_only=True, action='append', default=[], help="Print this info.json field for each keyboard, eg 'matrix_size.cols'. May be passed multiple times.")
+@cli.argument('-j', '--parallel', type=int, default=1, help="Number of processes to use when updating the search index, 0 to use every CPU.")
+@cli.subcommand('Find keyboards whose info.json data matches an expression.')
+def find(cli):
+    """Search for keyboards by their info.json data.
+    """
+    db = search.connect()
+
+    try:
+        search.refresh(db, list_keyboards(), cli.config.find.parallel)
+
+        try:
+            keyboards = search.find(db, cli.args.filter)
+
+        except ValueError as e:
+            cli.log.error('Invalid filter: %s', e)
+            return False
+
+        for keyboard in keyboards:
+            if not cli.args.print:
+                cli.echo(keyboard)
+                continue
+
+            values = []
+
+            for field in cli.args.print:
+                values.extend(f'{name}={text}' for name, text in search.field_values(db, keyboard, field))
+
+            cli.echo('{fg_cyan}%s{fg_reset}: %s', keyboard, ' '.join(values))
+
+    finally:
+        db.close()
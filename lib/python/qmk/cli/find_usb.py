@@ -0,0 +1,55 @@
+"""Find the keyboards that use a USB vendor and product ID.
+"""
+from milc import cli
+
+from qmk import usb_index
+
+
+@cli.argument('device', nargs='?', arg_only=True, help='The VID:PID of the device, eg 0xFEED:0x6060 or feed:6060.')
+@cli.argument('--rebuild', arg_only=True, action='store_true', help='Rebuild the whole index from the keyboards directory first.')
+@cli.argument('--collisions', arg_only=True, action='store_true', help='List every VID:PID that is used by more than one keyboard.')
+@cli.subcommand('Find the keyboards that use a USB vendor and product ID.')
+def find_usb(cli):
+    """Look up the keyboards that use a USB VID:PID in the USB index.
+    """
+    if not cli.args.device and not cli.args.collisions:
+        cli.log.error('You must supply a VID:PID or --collisions.')
+        cli.print_help()
+        return False
+
+    if cli.args.device:
+        try:
+            device = usb_index.parse_usb_id(cli.args.device)
+
+        except ValueError as e:
+            cli.log.error('Invalid USB ID: %s', e)
+            return False
+
+    stored_index = None if cli.args.rebuild else usb_index.load_index()
+    index, updated = usb_index.refresh_index(stored_index)
+
+    if index is not stored_index:
+        usb_index.write_index(index)
+
+    if updated:
+        usb_index.log_collisions(index)
+
+    if cli.args.collisions:
+        for shared_device, keyboards in usb_index.collisions(index).items():
+            cli.echo('{fg_cyan}%s{fg_reset}: %s', shared_device, ', '.join(keyboards))
+
+        return True
+
+    keyboards = usb_index.lookup(index, device)
+
+    if not keyboards:
+        cli.log.error('No keyboards use %s.', device)
+        return False
+
+    for keyboard, usb in keyboards.items():
+        cli.echo('{fg_cyan}%s{fg_reset} (device version %s)', keyboard, usb.get('device_ver', 'unknown'))
+
+    if len(keyboards) > 1:
+        cli.log.warning('%d keyboards use %s, the ID alone does not tell them apart.', len(keyboards), device)
+
+    return True
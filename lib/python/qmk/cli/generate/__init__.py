@@ -1,3 +1,4 @@
+from . import all
 from . import api
 from . import config_h
 from . import dfu_header
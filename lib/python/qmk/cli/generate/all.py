@@ -0,0 +1,79 @@
+"""Used by the make system to generate every info.json derived file in a single pass.
+"""
+from milc import cli
+
+from qmk.cli.generate.config_h import build_config_h
+from qmk.cli.generate.keyboard_h import build_keyboard_h
+from qmk.cli.generate.layouts import build_layouts_h
+from qmk.cli.generate.rules_mk import build_rules_mk
+from qmk.decorators import automagic_keyboard, automagic_keymap
+from qmk.info import generated_file_dependencies, info_json
+from qmk.keyboard import keyboard_completer, keyboard_folder
+from qmk.makefile import write_depfile
+from qmk.path import is_keyboard, normpath, write_if_changed
+
+
+def _write_file(output_file, content):
+    """Write a generated file if its content has changed.
+    """
+    if write_if_changed(output_file, content):
+        if not cli.args.quiet:
+            cli.log.info('Wrote %s.', output_file)
+
+    elif not cli.args.quiet:
+        cli.log.info('%s is up to date.', output_file)
+
+
+@cli.argument('-o', '--output', arg_only=True, type=normpath, required=True, help='Directory to write the generated files to')
+@cli.argument('--depfile', arg_only=True, type=normpath, help='Also write a make dependency file listing every input that was read')
+@cli.argument('-q', '--quiet', arg_only=True, action='store_true', help="Quiet mode, only output error messages and the path to rules.mk")
+@cli.argument('-e', '--escape', arg_only=True, action='store_true', help="Escape spaces in quiet mode")
+@cli.argument('-kb', '--keyboard', type=keyboard_folder, completer=keyboard_completer, help='Keyboard to generate files for.')
+@cli.subcommand('Used by the make system to generate rules.mk, info_config.h, default_keyboard.h and layouts.h from info.json', hidden=True)
+@automagic_keyboard
+@automagic_keymap
+def generate_all(cli):
+    """Generates rules.mk, info_config.h, default_keyboard.h and layouts.h from a single info.json build.
+    """
+    keyboard = cli.config.generate_all.keyboard
+
+    if not keyboard:
+        cli.log.error('Missing parameter: --keyboard')
+        cli.subcommands['generate-all'].print_help()
+        return False
+
+    if not is_keyboard(keyboard):
+        cli.log.error('Invalid keyboard: "%s"', keyboard)
+        return False
+
+    # Build everything before writing anything so a failure leaves the previous files intact
+    kb_info_json = info_json(keyboard)
+    layouts_h = build_layouts_h(keyboard, kb_info_json)
+
+    if layouts_h is None:
+        return False
+
+    generated_files = {
+        'rules.mk': build_rules_mk(kb_info_json),
+        'info_config.h': build_config_h(kb_info_json),
+        'default_keyboard.h': build_keyboard_h(keyboard, kb_info_json),
+        'layouts.h': layouts_h,
+    }
+
+    cli.args.output.mkdir(parents=True, exist_ok=True)
+
+    for filename, content in generated_files.items():
+        _write_file(cli.args.output / filename, content)
+
+    # The depfile is rewritten every time so make can use it as a stamp for the whole set
+    if cli.args.depfile:
+        write_depfile(cli.args.depfile, [cli.args.output / filename for filename in generated_files], generated_file_dependencies(keyboard))
+
+    # make includes the rules.mk path we print here
+    if cli.args.quiet:
+        rules_mk = cli.args.output / 'rules.mk'
+
+        if cli.args.escape:
+            print(rules_mk.as_posix().replace(' ', '\\ '))
+        else:
+            print(rules_mk)
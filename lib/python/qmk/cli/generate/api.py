@@ -1,19 +1,367 @@
 """This script automates the generation of the QMK API data.
 """
+from contextlib import contextmanager
+from itertools import zip_longest
+from multiprocessing import Pool
 from pathlib import Path
 from shutil import copyfile
+import filecmp
+import hashlib
 import json
+import os
+import re
+import tempfile
 
 from milc import cli
 
+import qmk.keyboard_aliases
+from qmk import diagnostics, info_cache, usb_index
 from qmk.datetime import current_datetime
 from qmk.info import info_json
-from qmk.json_encoders import InfoJSONEncoder
-from qmk.json_schema import json_load
+from qmk.json_encoders import InfoJSONEncoder, json_default
 from qmk.keyboard import list_keyboards
+from qmk.parse_cache import shared_parses
+from qmk.path import normpath, write_if_changed
+from qmk.profiling import log_report, profiling, write_report
+
+# Bump this when the format of the input manifest changes
+INPUT_MANIFEST_VERSION = 1
+
+last_updated_regex = re.compile(r'"last_updated": ?"[^"]*"')
+
+
+def _keyboard_chunks(keyboards):
+    """Group keyboards by their top level folder, so keyboards that share files are built in the same worker.
+    """
+    chunks = {}
+
+    for keyboard in keyboards:
+        chunks.setdefault(keyboard.split('/')[0], []).append(keyboard)
+
+    return list(chunks.values())
+
+
+def _same_api_data(new_file, old_file):
+    """Returns True if two API files hold the same data, ignoring when they were last updated.
+    """
+    try:
+        with open(new_file, encoding='utf-8') as new, open(old_file, encoding='utf-8') as old:
+            return all(last_updated_regex.sub('', new_line, 1) == last_updated_regex.sub('', old_line, 1) for new_line, old_line in zip_longest(new, old, fillvalue=''))
+
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def _output_entry(file, changed):
+    """Returns the SHA-256, size and changed flag recorded for an output file.
+    """
+    content = Path(file).read_bytes()
+
+    return hashlib.sha256(content).hexdigest(), len(content), changed
+
+
+@contextmanager
+def _open_api_file(v1_dir, file, outputs, dry_run, binary=False):
+    """Open a file in api_data to write in pieces.
+
+    The file is only replaced when its data changes, ignoring `last_updated`, so files that haven't changed keep their timestamp and mtime. During a dry run the new content goes to a temporary file that is thrown away. When `binary` is True the file takes bytes instead of text.
+
+    The SHA-256 and size of the file, as it is or would be on disk, and whether it changed are recorded in `outputs`.
+    """
+    if dry_run:
+        tmp_fd, tmp_name = tempfile.mkstemp(prefix='qmk-api-', suffix='.tmp')
+        os.close(tmp_fd)
+        tmp_file = Path(tmp_name)
+
+    else:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = file.parent / f'.{file.name}.{os.getpid()}.tmp'
+
+    try:
+        with (tmp_file.open('wb') if binary else tmp_file.open('w', encoding='utf-8')) as fd:
+            yield fd
+
+        changed = not _same_api_data(tmp_file, file)
+
+        if changed and not dry_run:
+            os.replace(tmp_file, file)
+            cli.log.debug('Wrote file %s', file)
+
+        outputs[file.relative_to(v1_dir).as_posix()] = _output_entry(tmp_file if changed and dry_run else file, changed)
+
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+
+def _write_api_file(v1_dir, file, content, outputs, dry_run):
+    """Write a file in api_data if its data has changed, see `_open_api_file()`.
+    """
+    with _open_api_file(v1_dir, file, outputs, dry_run) as fd:
+        fd.write(content)
+
+
+def _copy_api_file(v1_dir, source, file, outputs, dry_run):
+    """Copy a file into api_data if its content has changed.
+    """
+    changed = not file.exists() or not filecmp.cmp(source, file, shallow=False)
+
+    if changed and not dry_run:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        copyfile(source, file)
+        cli.log.debug('Copied %s -> %s', source, file)
+
+    outputs[file.relative_to(v1_dir).as_posix()] = _output_entry(source, changed)
+
+
+def _write_keyboard(v1_dir, keyboard_name, keyboard_info, last_updated, dry_run):
+    """Write the keyboard specific files for one keyboard.
+
+    Returns:
+        the `outputs` of the files, see `_open_api_file()`
+    """
+    keyboard_dir = v1_dir / 'keyboards' / keyboard_name
+    keyboard_readme_src = Path('keyboards') / keyboard_name / 'readme.md'
+    keyboard_json = json.dumps({'last_updated': last_updated, 'keyboards': {keyboard_name: keyboard_info}}, default=json_default)
+    outputs = {}
+
+    _write_api_file(v1_dir, keyboard_dir / 'info.json', keyboard_json, outputs, dry_run)
+
+    if keyboard_readme_src.exists():
+        _copy_api_file(v1_dir, keyboard_readme_src, keyboard_dir / 'readme.md', outputs, dry_run)
+
+    return outputs
+
+
+def _existing_keyboard_outputs(v1_dir, keyboard_name):
+    """Returns the `outputs` of the keyboard specific files left by the last run, see `_open_api_file()`.
+    """
+    keyboard_dir = v1_dir / 'keyboards' / keyboard_name
+
+    return {file.relative_to(v1_dir).as_posix(): _output_entry(file, False) for file in (keyboard_dir / 'info.json', keyboard_dir / 'readme.md') if file.exists()}
+
+
+def _build_keyboards(keyboards, v1_dir, last_updated, dry_run):
+    """Build the info.json data for each keyboard in turn and write its keyboard specific files.
+
+    Yields:
+        a tuple of keyboard name, info.json data and the `outputs` of its files for each keyboard
+    """
+    with shared_parses():
+        for keyboard_name in keyboards:
+            keyboard_info = info_json(keyboard_name)
+
+            yield keyboard_name, keyboard_info, _write_keyboard(v1_dir, keyboard_name, keyboard_info, last_updated, dry_run)
+
+
+def _build_keyboards_worker(args):
+    """Run `_build_keyboards()` in a worker process.
+
+    Returns:
+        a tuple of the chunk's index, its info.json data, or None if the build stopped early, and the diagnostics recorded while building it
+    """
+    index, *args = args
+
+    with diagnostics.collecting() as collected:
+        try:
+            kb_chunk = list(_build_keyboards(*args))
+
+        except SystemExit:
+            kb_chunk = None
+
+    return index, kb_chunk, collected
+
+
+def _build_keyboards_parallel(keyboards, parallel, *args):
+    """Build keyboards in a pool of `parallel` worker processes.
+
+    Keyboards are yielded a chunk at a time as each worker finishes, so they don't come out in the same order as `keyboards`. `_all_keyboards()` puts them back in order.
+
+    Yields:
+        a tuple of keyboard name, info.json data and the `outputs` of its files for each keyboard
+    """
+    chunks = _keyboard_chunks(keyboards)
+    built = 0
+
+    with Pool(parallel, initializer=diagnostics.reset) as pool:
+        for index, kb_chunk, chunk_diagnostics in pool.imap_unordered(_build_keyboards_worker, [(index, chunk, *args) for index, chunk in enumerate(chunks)]):
+            diagnostics.replay(chunk_diagnostics)
+
+            if kb_chunk is None:
+                pool.terminate()
+                cli.log.error('Could not build %s, see the errors above.', ', '.join(chunks[index]))
+                exit(1)
+
+            built += 1
+            cli.log.debug('Built %d of %d keyboard folders', built, len(chunks))
+
+            yield from kb_chunk
+
+
+def _all_keyboards(keyboards, kb_changed, kb_built, v1_dir, last_updated, dry_run):
+    """Merge the keyboards that were built with those that haven't changed since the last run.
+
+    `kb_built` can yield the keyboards in `kb_changed` in any order. Those that come out before they are needed are held until their turn.
+
+    Yields:
+        a tuple of keyboard name, info.json data and the `outputs` of its files for each keyboard, in the same order as `keyboards`
+    """
+    built = {}
+
+    for keyboard_name in keyboards:
+        if keyboard_name in kb_changed:
+            while keyboard_name not in built:
+                built_name, *built_data = next(kb_built)
+                built[built_name] = built_data
+
+            yield (keyboard_name, *built.pop(keyboard_name))
+            continue
+
+        keyboard_info = _load_keyboard(v1_dir, keyboard_name)
+
+        if keyboard_info is None:
+            keyboard_info = info_json(keyboard_name)
+            yield keyboard_name, keyboard_info, _write_keyboard(v1_dir, keyboard_name, keyboard_info, last_updated, dry_run)
+
+        else:
+            yield keyboard_name, keyboard_info, _existing_keyboard_outputs(v1_dir, keyboard_name)
+
+
+def _index_keyboards(keyboards, keyboard_list, usb_list, outputs):
+    """Record the name, USB IDs and output files of each keyboard as it passes through.
+    """
+    for keyboard_name, keyboard_info, keyboard_outputs in keyboards:
+        keyboard_list.append(keyboard_name)
+        usb_index.add_keyboard(usb_list, keyboard_name, keyboard_info)
+        outputs.update(keyboard_outputs)
+
+        yield keyboard_name, keyboard_info
+
+
+def _write_shard(v1_dir, vendor, vendor_keyboards, last_updated, shard_index, outputs, dry_run):
+    """Write one top level folder's keyboards to its shard file.
+
+    Each keyboard's info.json data is written on a line of its own, and the shard, byte offset and length of that data are recorded in `shard_index`. The shard is written as bytes so the offsets are the same on every platform.
+    """
+    shard_file = v1_dir / 'shards' / f'{vendor}.json'
+    shard = shard_file.relative_to(v1_dir).as_posix()
+
+    with _open_api_file(v1_dir, shard_file, outputs, dry_run, binary=True) as fd:
+        position = fd.write(b'{"keyboards": {')
+        separator = b'\n'
+
+        for keyboard_name, keyboard_json in vendor_keyboards:
+            position += fd.write(separator + json.dumps(keyboard_name).encode('utf-8') + b': ')
+            length = fd.write(keyboard_json)
+            shard_index[keyboard_name] = {'shard': shard, 'offset': position, 'length': length}
+            position += length
+            separator = b',\n'
+
+        # last_updated goes at the end so it can never move the offsets
+        fd.write(f'\n}}, "last_updated": {json.dumps(last_updated)}}}'.encode('utf-8'))
+
+
+def _write_shards(kb_all, keyboards, v1_dir, last_updated, shard_index, outputs, dry_run):
+    """Write each top level folder's keyboards to its own shard file as they pass through.
+
+    Sorting by name doesn't keep each folder together, `foo-bar/x` comes between `foo` and `foo/a`, so keyboards are held by folder until the last of that folder's keyboards in `keyboards` has passed.
+    """
+    last_keyboards = {keyboard.split('/')[0]: keyboard for keyboard in keyboards}
+    vendors = {}
+
+    for keyboard in kb_all:
+        keyboard_name, keyboard_info = keyboard[:2]
+        vendor = keyboard_name.split('/')[0]
+        vendors.setdefault(vendor, []).append((keyboard_name, json.dumps(keyboard_info, default=json_default).encode('utf-8')))
+
+        if keyboard_name == last_keyboards[vendor]:
+            _write_shard(v1_dir, vendor, vendors.pop(vendor), last_updated, shard_index, outputs, dry_run)
+
+        yield keyboard
+
+
+def _add_shard_aliases(shard_index, keyboard_aliases):
+    """Add every keyboard alias to the shard index, pointing at the same data as the keyboard it resolves to.
+    """
+    keyboards = set(shard_index)
+
+    for alias in keyboard_aliases:
+        target = alias
+
+        # Aliases can point at other aliases
+        for _ in range(10):
+            target = keyboard_aliases.get(target, {}).get('target', target)
+
+            if target in keyboards:
+                break
+
+        if target in keyboards and alias not in keyboards:
+            shard_index[alias] = {**shard_index[target], 'target': target}
+
+
+def _write_keyboards_json(fd, keyboards, last_updated):
+    """Write keyboards.json one keyboard at a time.
+
+    The output is the same as `json.dumps({'last_updated': last_updated, 'keyboards': dict(keyboards)}, cls=InfoJSONEncoder)`, but only one keyboard is held in memory at once. `keyboards` must be sorted by name.
+    """
+    encoder = InfoJSONEncoder()
+    encoder.indentation_level = 1
+
+    fd.write('{\n' + encoder.indent_str + '"keyboards": ')
+
+    for chunk in encoder.iterencode_items(keyboards):
+        fd.write(chunk)
+
+    fd.write(',\n' + encoder.indent_str + f'"last_updated": {json.dumps(last_updated)}\n}}')
+
+
+def _keyboard_inputs(keyboard):
+    """Returns a dictionary of every file the API data for a keyboard is built from to the SHA-256 of its content.
+    """
+    inputs = info_cache.input_digests(keyboard)
+    readme = Path('keyboards') / keyboard / 'readme.md'
+
+    if readme.exists():
+        inputs[readme.as_posix()] = info_cache.file_digest(readme)
+
+    return inputs
+
+
+def _load_input_manifest(input_manifest_file):
+    """Returns the keyboard inputs recorded by the last run, or an empty dictionary if they can't be trusted.
+
+    The manifest is ignored when it was written by a different version of the info.json pipeline, or with different mappings or schemas.
+    """
+    try:
+        manifest = json.loads(input_manifest_file.read_text(encoding='utf-8'))
+
+    except (OSError, ValueError):
+        return {}
+
+    if manifest.get('version') != INPUT_MANIFEST_VERSION or manifest.get('global_digest') != info_cache.global_digest():
+        return {}
+
+    return manifest.get('keyboards', {})
+
+
+def _load_keyboard(v1_dir, keyboard):
+    """Returns the info.json data for a keyboard written by the last run, or None if it can't be read.
+    """
+    try:
+        return json.loads((v1_dir / 'keyboards' / keyboard / 'info.json').read_text(encoding='utf-8'))['keyboards'][keyboard]
+
+    except (OSError, ValueError, KeyError):
+        return None
 
 
 @cli.argument('-n', '--dry-run', arg_only=True, action='store_true', help="Don't write the data to disk.")
+@cli.argument('--shards', arg_only=True, action='store_true', help='Also write each top level folder to its own file under shards/, with an index of where to find each keyboard.')
+@cli.argument('--full', arg_only=True, action='store_true', help='Rebuild every keyboard, even those whose files have not changed since the last run.')
+@cli.argument('-j', '--parallel', arg_only=True, type=int, default=1, help='Number of worker processes to build keyboards with, 0 to use every CPU. (Default: 1)')
+@cli.argument('--diagnostics', arg_only=True, choices=['summary', 'log', 'none'], default='summary', help='How to report the problems found in keyboards: a summary by code, every message, or nothing. (Default: summary)')
+@cli.argument('--diagnostics-jsonl', arg_only=True, type=normpath, help='Write every problem found in keyboards to this file as JSON lines.')
+@cli.argument('--profile', arg_only=True, action='store_true', help='Report the time and memory used by each stage of the info.json pipeline. Every keyboard is rebuilt, as with --full.')
+@cli.argument('--profile-json', arg_only=True, type=normpath, help='Also write the raw profiling data to this file as JSON.')
 @cli.subcommand('Creates a new keymap for the keyboard of your choosing', hidden=False if cli.config.user.developer else True)
 def generate_api(cli):
     """Generates the QMK API data.
@@ -25,63 +373,110 @@ def generate_api(cli):
     keyboard_aliases_file = v1_dir / 'keyboard_aliases.json'  # A list of historical keyboard names and their new name
     keyboard_metadata_file = v1_dir / 'keyboard_metadata.json'  # All the data configurator/via needs for initialization
     usb_file = v1_dir / 'usb.json'  # A mapping of USB VID/PID -> keyboard target
+    manifest_file = v1_dir / 'manifest.json'  # The SHA-256 and size of every other file in v1
+    shard_index_file = v1_dir / 'keyboard_shards.json'  # The shard, byte offset and length of each keyboard's data
+    input_manifest_file = api_data_dir / 'input_manifest.json'  # The hashes of each keyboard's input files at the last run
+    last_updated = current_datetime()
+    parallel = cli.args.parallel or os.cpu_count()
+    profile_enabled = cli.args.profile or cli.args.profile_json
 
     if not api_data_dir.exists():
         api_data_dir.mkdir()
 
-    kb_all = {}
+    if profile_enabled and parallel > 1:
+        cli.log.warning('Profiling only works in a single process, ignoring --parallel.')
+        parallel = 1
+
+    # Reuse the data for keyboards whose files haven't changed since the last run
+    keyboards = list_keyboards()
+    previous_inputs = {} if cli.args.full or profile_enabled else _load_input_manifest(input_manifest_file)
+
+    with shared_parses():
+        inputs = {keyboard: _keyboard_inputs(keyboard) for keyboard in keyboards}
+
+    usb_sources = usb_index.source_signatures()
+
+    kb_changed = [keyboard for keyboard in keyboards if previous_inputs.get(keyboard) != inputs[keyboard] or not (v1_dir / 'keyboards' / keyboard / 'info.json').exists()]
+    if len(kb_changed) < len(keyboards):
+        cli.log.info('Building %d of %d keyboards, the rest have not changed since the last run.', len(kb_changed), len(keyboards))
+
+    if parallel > 1:
+        kb_built = _build_keyboards_parallel(kb_changed, parallel, v1_dir, last_updated, cli.args.dry_run)
+
+    else:
+        kb_built = _build_keyboards(kb_changed, v1_dir, last_updated, cli.args.dry_run)
+
+    # Write keyboards.json as each keyboard's data becomes available
     usb_list = {}
+    keyboard_list = []
+    outputs = {}
+    shard_index = {}
 
-    # Generate and write keyboard specific JSON files
-    for keyboard_name in list_keyboards():
-        kb_all[keyboard_name] = info_json(keyboard_name)
-        keyboard_dir = v1_dir / 'keyboards' / keyboard_name
-        keyboard_info = keyboard_dir / 'info.json'
-        keyboard_readme = keyboard_dir / 'readme.md'
-        keyboard_readme_src = Path('keyboards') / keyboard_name / 'readme.md'
+    with profiling(profile_enabled) as profile, diagnostics.collecting(cli.args.diagnostics_jsonl) as collected:
+        with _open_api_file(v1_dir, keyboard_all_file, outputs, cli.args.dry_run) as fd:
+            kb_all = _all_keyboards(keyboards, set(kb_changed), kb_built, v1_dir, last_updated, cli.args.dry_run)
 
-        keyboard_dir.mkdir(parents=True, exist_ok=True)
-        keyboard_json = json.dumps({'last_updated': current_datetime(), 'keyboards': {keyboard_name: kb_all[keyboard_name]}})
-        if not cli.args.dry_run:
-            keyboard_info.write_text(keyboard_json)
-            cli.log.debug('Wrote file %s', keyboard_info)
+            if cli.args.shards:
+                kb_all = _write_shards(kb_all, keyboards, v1_dir, last_updated, shard_index, outputs, cli.args.dry_run)
 
-            if keyboard_readme_src.exists():
-                copyfile(keyboard_readme_src, keyboard_readme)
-                cli.log.debug('Copied %s -> %s', keyboard_readme_src, keyboard_readme)
+            _write_keyboards_json(fd, _index_keyboards(kb_all, keyboard_list, usb_list, outputs), last_updated)
 
-        if 'usb' in kb_all[keyboard_name]:
-            usb = kb_all[keyboard_name]['usb']
+    if cli.args.diagnostics == 'summary':
+        diagnostics.log_summary(collected)
 
-            if 'vid' in usb and usb['vid'] not in usb_list:
-                usb_list[usb['vid']] = {}
+    elif cli.args.diagnostics == 'log':
+        diagnostics.log_diagnostics(collected)
 
-            if 'pid' in usb and usb['pid'] not in usb_list[usb['vid']]:
-                usb_list[usb['vid']][usb['pid']] = {}
+    if profile:
+        log_report(profile)
 
-            if 'vid' in usb and 'pid' in usb:
-                usb_list[usb['vid']][usb['pid']][keyboard_name] = usb
+        if cli.args.profile_json:
+            write_report(profile, cli.args.profile_json)
+            cli.log.info('Wrote profiling data to %s', cli.args.profile_json)
 
     # Generate data for the global files
-    keyboard_list = sorted(kb_all)
-    keyboard_aliases = json_load(Path('data/mappings/keyboard_aliases.json'))
+    keyboard_aliases = qmk.keyboard_aliases.aliases()
     keyboard_metadata = {
-        'last_updated': current_datetime(),
+        'last_updated': last_updated,
         'keyboards': keyboard_list,
         'keyboard_aliases': keyboard_aliases,
         'usb': usb_list,
     }
 
     # Write the global JSON files
-    keyboard_all_json = json.dumps({'last_updated': current_datetime(), 'keyboards': kb_all}, cls=InfoJSONEncoder)
-    usb_json = json.dumps({'last_updated': current_datetime(), 'usb': usb_list}, cls=InfoJSONEncoder)
-    keyboard_list_json = json.dumps({'last_updated': current_datetime(), 'keyboards': keyboard_list}, cls=InfoJSONEncoder)
-    keyboard_aliases_json = json.dumps({'last_updated': current_datetime(), 'keyboard_aliases': keyboard_aliases}, cls=InfoJSONEncoder)
+    usb_json = json.dumps({'last_updated': last_updated, 'usb': usb_list}, cls=InfoJSONEncoder)
+    keyboard_list_json = json.dumps({'last_updated': last_updated, 'keyboards': keyboard_list}, cls=InfoJSONEncoder)
+    keyboard_aliases_json = json.dumps({'last_updated': last_updated, 'keyboard_aliases': keyboard_aliases}, cls=InfoJSONEncoder)
     keyboard_metadata_json = json.dumps(keyboard_metadata, cls=InfoJSONEncoder)
 
-    if not cli.args.dry_run:
-        keyboard_all_file.write_text(keyboard_all_json)
-        usb_file.write_text(usb_json)
-        keyboard_list_file.write_text(keyboard_list_json)
-        keyboard_aliases_file.write_text(keyboard_aliases_json)
-        keyboard_metadata_file.write_text(keyboard_metadata_json)
+    _write_api_file(v1_dir, usb_file, usb_json, outputs, cli.args.dry_run)
+    _write_api_file(v1_dir, keyboard_list_file, keyboard_list_json, outputs, cli.args.dry_run)
+    _write_api_file(v1_dir, keyboard_aliases_file, keyboard_aliases_json, outputs, cli.args.dry_run)
+    _write_api_file(v1_dir, keyboard_metadata_file, keyboard_metadata_json, outputs, cli.args.dry_run)
+
+    if cli.args.shards:
+        _add_shard_aliases(shard_index, keyboard_aliases)
+        _write_api_file(v1_dir, shard_index_file, json.dumps({'last_updated': last_updated, 'keyboards': shard_index}, cls=InfoJSONEncoder), outputs, cli.args.dry_run)
+
+    # Publish the hash and size of every file so mirrors can fetch only what changed
+    changed = sorted(file for file, (sha256, size, file_changed) in outputs.items() if file_changed)
+    manifest = {
+        'last_updated': last_updated,
+        'files': {file: {'sha256': sha256, 'size': size} for file, (sha256, size, file_changed) in sorted(outputs.items())},
+    }
+    _write_api_file(v1_dir, manifest_file, json.dumps(manifest, cls=InfoJSONEncoder), outputs, cli.args.dry_run)
+
+    if cli.args.dry_run:
+        cli.log.info('%d of %d files would change.', len(changed), len(outputs) - 1)
+
+        for file in changed:
+            cli.log.debug('Would change %s', v1_dir / file)
+
+    else:
+        cli.log.info('%d of %d files changed.', len(changed), len(outputs) - 1)
+
+        # Refresh the index `qmk find-usb` uses
+        usb_devices = usb_index.build_index(usb_list, keyboards, usb_sources)
+        usb_index.write_index(usb_devices)
+        usb_index.log_collisions(usb_devices)
+        write_if_changed(input_manifest_file, json.dumps({'version': INPUT_MANIFEST_VERSION, 'global_digest': info_cache.global_digest(), 'keyboards': inputs}, indent=4, sort_keys=True))
@@ -4,8 +4,8 @@ from dotty_dict import dotty
 from milc import cli
 
 from qmk.decorators import automagic_keyboard
-from qmk.info import info_json
-from qmk.path import is_keyboard, normpath
+from qmk.info import lazy_info_json
+from qmk.path import is_keyboard, normpath, write_if_changed
 from qmk.keyboard import keyboard_completer
 
 
@@ -28,7 +28,7 @@ def generate_dfu_header(cli):
         return False
 
     # Build the Keyboard.h file.
-    kb_info_json = dotty(info_json(cli.config.generate_dfu_header.keyboard))
+    kb_info_json = dotty(lazy_info_json(cli.config.generate_dfu_header.keyboard).sections('manufacturer', 'qmk_lufa_bootloader'))
 
     keyboard_h_lines = ['/* This file was generated by `qmk generate-dfu-header`. Do not edit or copy.' ' */', '', '#pragma once']
     keyboard_h_lines.append(f'#define MANUFACTURER {kb_info_json["manufacturer"]}')
@@ -48,10 +48,7 @@ def generate_dfu_header(cli):
     keyboard_h = '\n'.join(keyboard_h_lines)
 
     if cli.args.output:
-        cli.args.output.parent.mkdir(parents=True, exist_ok=True)
-        if cli.args.output.exists():
-            cli.args.output.replace(cli.args.output.parent / (cli.args.output.name + '.bak'))
-        cli.args.output.write_text(keyboard_h)
+        write_if_changed(cli.args.output, keyboard_h)
 
         if not cli.args.quiet:
             cli.log.info('Wrote Keyboard.h to %s.', cli.args.output)
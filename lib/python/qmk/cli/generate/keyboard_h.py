@@ -3,16 +3,18 @@
 from milc import cli
 
 from qmk.decorators import automagic_keyboard, automagic_keymap
-from qmk.info import info_json
+from qmk.info import generated_file_dependencies, lazy_info_json
 from qmk.keyboard import keyboard_completer, keyboard_folder
-from qmk.path import normpath
+from qmk.makefile import write_depfile
+from qmk.path import normpath, write_if_changed
 
 
-def would_populate_layout_h(keyboard):
+def would_populate_layout_h(keyboard, kb_info_json=None):
     """Detect if a given keyboard is doing data driven layouts
     """
-    # Build the info.json file
-    kb_info_json = info_json(keyboard)
+    # Only the layouts are needed, so skip the rest of the info.json pipeline
+    if kb_info_json is None:
+        kb_info_json = lazy_info_json(keyboard)
 
     for layout_name in kb_info_json['layouts']:
         if kb_info_json['layouts'][layout_name]['c_macro']:
@@ -27,7 +29,22 @@ def would_populate_layout_h(keyboard):
     return False
 
 
+def build_keyboard_h(keyboard, kb_info_json=None):
+    """Returns the text of default_keyboard.h for a keyboard.
+    """
+    has_layout_h = would_populate_layout_h(keyboard, kb_info_json)
+
+    # Build the layouts.h file.
+    keyboard_h_lines = ['/* This file was generated by `qmk generate-keyboard-h`. Do not edit or copy.' ' */', '', '#pragma once', '#include "quantum.h"']
+
+    if not has_layout_h:
+        keyboard_h_lines.append('#pragma error("<keyboard>.h is only optional for data driven keyboards - kb.h == bad times")')
+
+    return '\n'.join(keyboard_h_lines) + '\n'
+
+
 @cli.argument('-o', '--output', arg_only=True, type=normpath, help='File to write to')
+@cli.argument('--depfile', arg_only=True, type=normpath, help='Also write a make dependency file listing every input that was read')
 @cli.argument('-q', '--quiet', arg_only=True, action='store_true', help="Quiet mode, only output error messages")
 @cli.argument('-kb', '--keyboard', type=keyboard_folder, completer=keyboard_completer, required=True, help='Keyboard to generate keyboard.h for.')
 @cli.subcommand('Used by the make system to generate keyboard.h from info.json', hidden=True)
@@ -36,22 +53,14 @@ def would_populate_layout_h(keyboard):
 def generate_keyboard_h(cli):
     """Generates the keyboard.h file.
     """
-    has_layout_h = would_populate_layout_h(cli.config.generate_keyboard_h.keyboard)
-
-    # Build the layouts.h file.
-    keyboard_h_lines = ['/* This file was generated by `qmk generate-keyboard-h`. Do not edit or copy.' ' */', '', '#pragma once', '#include "quantum.h"']
-
-    if not has_layout_h:
-        keyboard_h_lines.append('#pragma error("<keyboard>.h is only optional for data driven keyboards - kb.h == bad times")')
+    keyboard_h = build_keyboard_h(cli.config.generate_keyboard_h.keyboard)
 
     # Show the results
-    keyboard_h = '\n'.join(keyboard_h_lines) + '\n'
-
     if cli.args.output:
-        cli.args.output.parent.mkdir(parents=True, exist_ok=True)
-        if cli.args.output.exists():
-            cli.args.output.replace(cli.args.output.parent / (cli.args.output.name + '.bak'))
-        cli.args.output.write_text(keyboard_h)
+        write_if_changed(cli.args.output, keyboard_h)
+
+        if cli.args.depfile:
+            write_depfile(cli.args.depfile, [cli.args.output], generated_file_dependencies(cli.config.generate_keyboard_h.keyboard))
 
         if not cli.args.quiet:
             cli.log.info('Wrote keyboard_h to %s.', cli.args.output)
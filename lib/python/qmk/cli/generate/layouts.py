@@ -4,9 +4,10 @@ from milc import cli
 
 from qmk.constants import COL_LETTERS, ROW_LETTERS
 from qmk.decorators import automagic_keyboard, automagic_keymap
-from qmk.info import info_json
+from qmk.info import generated_file_dependencies, info_json
 from qmk.keyboard import keyboard_completer, keyboard_folder
-from qmk.path import is_keyboard, normpath
+from qmk.makefile import write_depfile
+from qmk.path import is_keyboard, normpath, write_if_changed
 
 usb_properties = {
     'vid': 'VENDOR_ID',
@@ -15,28 +16,9 @@ usb_properties = {
 }
 
 
-@cli.argument('-o', '--output', arg_only=True, type=normpath, help='File to write to')
-@cli.argument('-q', '--quiet', arg_only=True, action='store_true', help="Quiet mode, only output error messages")
-@cli.argument('-kb', '--keyboard', type=keyboard_folder, completer=keyboard_completer, help='Keyboard to generate config.h for.')
-@cli.subcommand('Used by the make system to generate layouts.h from info.json', hidden=True)
-@automagic_keyboard
-@automagic_keymap
-def generate_layouts(cli):
-    """Generates the layouts.h file.
+def build_layouts_h(keyboard, kb_info_json):
+    """Returns the text of layouts.h for a keyboard, or None if the matrix data is invalid.
     """
-    # Determine our keyboard(s)
-    if not cli.config.generate_layouts.keyboard:
-        cli.log.error('Missing parameter: --keyboard')
-        cli.subcommands['info'].print_help()
-        return False
-
-    if not is_keyboard(cli.config.generate_layouts.keyboard):
-        cli.log.error('Invalid keyboard: "%s"', cli.config.generate_layouts.keyboard)
-        return False
-
-    # Build the info.json file
-    kb_info_json = info_json(cli.config.generate_layouts.keyboard)
-
     # Build the layouts.h file.
     layouts_h_lines = ['/* This file was generated by `qmk generate-layouts`. Do not edit or copy.' ' */', '', '#pragma once']
 
@@ -48,15 +30,15 @@ def generate_layouts(cli):
             col_num = len(kb_info_json['matrix_pins']['cols'])
             row_num = len(kb_info_json['matrix_pins']['rows'])
         else:
-            cli.log.error('%s: Invalid matrix config.', cli.config.generate_layouts.keyboard)
-            return False
+            cli.log.error('%s: Invalid matrix config.', keyboard)
+            return None
 
     for layout_name in kb_info_json['layouts']:
         if kb_info_json['layouts'][layout_name]['c_macro']:
             continue
 
         if 'matrix' not in kb_info_json['layouts'][layout_name]['layout'][0]:
-            cli.log.debug('%s/%s: No matrix data!', cli.config.generate_layouts.keyboard, layout_name)
+            cli.log.debug('%s/%s: No matrix data!', keyboard, layout_name)
             continue
 
         layout_keys = []
@@ -73,7 +55,7 @@ def generate_layouts(cli):
             except IndexError:
                 key_name = key.get('label', identifier)
                 cli.log.error('Matrix data out of bounds for layout %s at index %s (%s): %s, %s', layout_name, i, key_name, row, col)
-                return False
+                return None
 
         layouts_h_lines.append('')
         layouts_h_lines.append('#define %s(%s) {\\' % (layout_name, ', '.join(layout_keys)))
@@ -87,14 +69,41 @@ def generate_layouts(cli):
         layouts_h_lines.append('')
         layouts_h_lines.append('#define %s %s' % (alias, target))
 
-    # Show the results
-    layouts_h = '\n'.join(layouts_h_lines) + '\n'
+    return '\n'.join(layouts_h_lines) + '\n'
+
+
+@cli.argument('-o', '--output', arg_only=True, type=normpath, help='File to write to')
+@cli.argument('--depfile', arg_only=True, type=normpath, help='Also write a make dependency file listing every input that was read')
+@cli.argument('-q', '--quiet', arg_only=True, action='store_true', help="Quiet mode, only output error messages")
+@cli.argument('-kb', '--keyboard', type=keyboard_folder, completer=keyboard_completer, help='Keyboard to generate config.h for.')
+@cli.subcommand('Used by the make system to generate layouts.h from info.json', hidden=True)
+@automagic_keyboard
+@automagic_keymap
+def generate_layouts(cli):
+    """Generates the layouts.h file.
+    """
+    # Determine our keyboard(s)
+    if not cli.config.generate_layouts.keyboard:
+        cli.log.error('Missing parameter: --keyboard')
+        cli.subcommands['info'].print_help()
+        return False
+
+    if not is_keyboard(cli.config.generate_layouts.keyboard):
+        cli.log.error('Invalid keyboard: "%s"', cli.config.generate_layouts.keyboard)
+        return False
 
+    # Build the layouts.h file.
+    layouts_h = build_layouts_h(cli.config.generate_layouts.keyboard, info_json(cli.config.generate_layouts.keyboard))
+
+    if layouts_h is None:
+        return False
+
+    # Show the results
     if cli.args.output:
-        cli.args.output.parent.mkdir(parents=True, exist_ok=True)
-        if cli.args.output.exists():
-            cli.args.output.replace(cli.args.output.parent / (cli.args.output.name + '.bak'))
-        cli.args.output.write_text(layouts_h)
+        write_if_changed(cli.args.output, layouts_h)
+
+        if cli.args.depfile:
+            write_depfile(cli.args.depfile, [cli.args.output], generated_file_dependencies(cli.config.generate_layouts.keyboard))
 
         if not cli.args.quiet:
             cli.log.info('Wrote info_config.h to %s.', cli.args.output)
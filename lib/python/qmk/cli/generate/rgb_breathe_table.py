@@ -68,10 +68,7 @@ static const int table_scale = 256 / sizeof(rgblight_effect_breathe_table);
 '''.format(cli.args.center, cli.args.max, values_template)
 
     if cli.args.output:
-        cli.args.output.parent.mkdir(parents=True, exist_ok=True)
-        if cli.args.output.exists():
-            cli.args.output.replace(cli.args.output.parent / (cli.args.output.name + '.bak'))
-        cli.args.output.write_text(table_template)
+        qmk.path.write_if_changed(cli.args.output, table_template)
 
         if not cli.args.quiet:
             cli.log.info('Wrote header to %s.', cli.args.output)
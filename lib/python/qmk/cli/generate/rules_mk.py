@@ -1,42 +1,47 @@
 """Used by the make system to generate a rules.mk
 """
-from pathlib import Path
-
-from dotty_dict import dotty
 from milc import cli
 
 from qmk.decorators import automagic_keyboard, automagic_keymap
-from qmk.info import info_json
-from qmk.json_schema import json_load
+from qmk.info import generated_file_dependencies, lazy_info_json
 from qmk.keyboard import keyboard_completer, keyboard_folder
-from qmk.path import is_keyboard, normpath
+from qmk.makefile import write_depfile
+from qmk.mappings import load_mapping
+from qmk.path import is_keyboard, normpath, write_if_changed
 
 
-def process_mapping_rule(kb_info_json, rules_key, info_dict):
-    """Return the rules.mk line(s) for a mapping rule.
+def build_rules_mk(kb_info_json):
+    """Returns the text of a rules.mk for an info.json dictionary.
     """
-    if not info_dict.get('to_c', True):
-        return None
+    rules_mk_lines = ['# This file was generated by `qmk generate-rules-mk`. Do not edit or copy.', '']
 
-    info_key = info_dict['info_key']
-    key_type = info_dict.get('value_type', 'str')
+    # Iterate through the info_rules map to generate basic rules
+    for entry in load_mapping('info_rules'):
+        if not entry.to_c:
+            continue
 
-    try:
-        rules_value = kb_info_json[info_key]
-    except KeyError:
-        return None
+        try:
+            rules_value = entry.get(kb_info_json)
+        except KeyError:
+            continue
 
-    if key_type == 'array':
-        return f'{rules_key} ?= {" ".join(rules_value)}'
-    elif key_type == 'bool':
-        return f'{rules_key} ?= {"on" if rules_value else "off"}'
-    elif key_type == 'mapping':
-        return '\n'.join([f'{key} ?= {value}' for key, value in rules_value.items()])
+        rules_mk_lines.extend(entry.format(rules_value))
 
-    return f'{rules_key} ?= {rules_value}'
+    # Iterate through features to enable/disable them
+    if 'features' in kb_info_json:
+        for feature, enabled in kb_info_json['features'].items():
+            if feature == 'bootmagic_lite' and enabled:
+                rules_mk_lines.append('BOOTMAGIC_ENABLE ?= lite')
+            else:
+                feature = feature.upper()
+                enabled = 'yes' if enabled else 'no'
+                rules_mk_lines.append(f'{feature}_ENABLE ?= {enabled}')
+
+    return '\n'.join(rules_mk_lines) + '\n'
 
 
 @cli.argument('-o', '--output', arg_only=True, type=normpath, help='File to write to')
+@cli.argument('--depfile', arg_only=True, type=normpath, help='Also write a make dependency file listing every input that was read')
 @cli.argument('-q', '--quiet', arg_only=True, action='store_true', help="Quiet mode, only output error messages")
 @cli.argument('-e', '--escape', arg_only=True, action='store_true', help="Escape spaces in quiet mode")
 @cli.argument('-kb', '--keyboard', type=keyboard_folder, completer=keyboard_completer, help='Keyboard to generate config.h for.')
@@ -55,35 +60,17 @@ def generate_rules_mk(cli):
         cli.log.error('Invalid keyboard: "%s"', cli.config.generate_rules_mk.keyboard)
         return False
 
-    kb_info_json = dotty(info_json(cli.config.generate_rules_mk.keyboard))
-    info_rules_map = json_load(Path('data/mappings/info_rules.json'))
-    rules_mk_lines = ['# This file was generated by `qmk generate-rules-mk`. Do not edit or copy.', '']
-
-    # Iterate through the info_rules map to generate basic rules
-    for rules_key, info_dict in info_rules_map.items():
-        new_entry = process_mapping_rule(kb_info_json, rules_key, info_dict)
-
-        if new_entry:
-            rules_mk_lines.append(new_entry)
-
-    # Iterate through features to enable/disable them
-    if 'features' in kb_info_json:
-        for feature, enabled in kb_info_json['features'].items():
-            if feature == 'bootmagic_lite' and enabled:
-                rules_mk_lines.append('BOOTMAGIC_ENABLE ?= lite')
-            else:
-                feature = feature.upper()
-                enabled = 'yes' if enabled else 'no'
-                rules_mk_lines.append(f'{feature}_ENABLE ?= {enabled}')
+    # Only build the parts of info.json that end up in rules.mk
+    sections = {entry.path[0] for entry in load_mapping('info_rules')}
+    kb_info_json = lazy_info_json(cli.config.generate_rules_mk.keyboard).sections(*sorted(sections), 'features')
+    rules_mk = build_rules_mk(kb_info_json)
 
     # Show the results
-    rules_mk = '\n'.join(rules_mk_lines) + '\n'
-
     if cli.args.output:
-        cli.args.output.parent.mkdir(parents=True, exist_ok=True)
-        if cli.args.output.exists():
-            cli.args.output.replace(cli.args.output.parent / (cli.args.output.name + '.bak'))
-        cli.args.output.write_text(rules_mk)
+        write_if_changed(cli.args.output, rules_mk)
+
+        if cli.args.depfile:
+            write_depfile(cli.args.depfile, [cli.args.output], generated_file_dependencies(cli.config.generate_rules_mk.keyboard))
 
         if cli.args.quiet:
             if cli.args.escape:
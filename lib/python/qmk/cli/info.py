@@ -12,8 +12,9 @@ from qmk.constants import COL_LETTERS, ROW_LETTERS
 from qmk.decorators import automagic_keyboard, automagic_keymap
 from qmk.keyboard import keyboard_completer, keyboard_folder, render_layouts, render_layout, rules_mk
 from qmk.keymap import locate_keymap
-from qmk.info import info_json
-from qmk.path import is_keyboard
+from qmk.info import info_json, lazy_info_json
+from qmk.path import is_keyboard, normpath
+from qmk.profiling import log_report, profiling, write_report
 
 UNICODE_SUPPORT = sys.stdout.encoding.lower().startswith('utf')
 
@@ -124,10 +125,14 @@ def print_text_output(kb_info_json):
         show_keymap(kb_info_json, False)
 
 
-def print_parsed_rules_mk(keyboard_name):
+def print_parsed_rules_mk(keyboard_name, explain=False):
     rules = rules_mk(keyboard_name)
     for k in sorted(rules.keys()):
         print('%s = %s' % (k, rules[k]))
+
+        if explain:
+            for setting in rules.explain(k):
+                print('    %s:%s: %s' % (setting.file, setting.line, setting.value))
     return
 
 
@@ -138,6 +143,9 @@ def print_parsed_rules_mk(keyboard_name):
 @cli.argument('-f', '--format', default='friendly', arg_only=True, help='Format to display the data in (friendly, text, json) (Default: friendly).')
 @cli.argument('--ascii', action='store_true', default=not UNICODE_SUPPORT, help='Render layout box drawings in ASCII only.')
 @cli.argument('-r', '--rules-mk', action='store_true', help='Render the parsed values of the keyboard\'s rules.mk file.')
+@cli.argument('-e', '--explain', arg_only=True, action='store_true', help='With --rules-mk, show the file and line each value was set on, and the values it replaced.')
+@cli.argument('--profile', arg_only=True, action='store_true', help='Report the time and memory used by each stage of the info.json pipeline.')
+@cli.argument('--profile-json', arg_only=True, type=normpath, help='Also write the raw profiling data to this file as JSON.')
 @cli.subcommand('Keyboard information.')
 @automagic_keyboard
 @automagic_keymap
@@ -155,11 +163,30 @@ def info(cli):
         return False
 
     if bool(cli.args.rules_mk):
-        print_parsed_rules_mk(cli.config.info.keyboard)
+        print_parsed_rules_mk(cli.config.info.keyboard, cli.args.explain)
         return False
 
-    # Build the info.json file
-    kb_info_json = info_json(cli.config.info.keyboard)
+    with profiling(cli.args.profile or cli.args.profile_json) as profile:
+        result = show_info()
+
+    if profile:
+        log_report(profile)
+
+        if cli.args.profile_json:
+            write_report(profile, cli.args.profile_json)
+            cli.log.info('Wrote profiling data to %s', cli.args.profile_json)
+
+    return result
+
+
+def show_info():
+    """Build the info.json data for the keyboard and print it in the requested format.
+    """
+    # Build the info.json file. The summary only needs a few keys, so it only builds the parts it shows.
+    if cli.args.format == 'friendly' and not (cli.config.info.layouts or cli.config.info.matrix):
+        kb_info_json = lazy_info_json(cli.config.info.keyboard)
+    else:
+        kb_info_json = info_json(cli.config.info.keyboard)
 
     # Output in the requested format
     if cli.args.format == 'json':
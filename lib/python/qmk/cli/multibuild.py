@@ -9,12 +9,14 @@ from milc import cli
 
 from qmk.constants import QMK_FIRMWARE
 from qmk.commands import _find_make
+import qmk.affected
 import qmk.keyboard
+import qmk.search
 
 
-def _make_rules_mk_filter(key, value):
+def _make_rules_mk_filter(key, value, all_rules_mk):
     def _rules_mk_filter(keyboard_name):
-        rules_mk = qmk.keyboard.rules_mk(keyboard_name)
+        rules_mk = all_rules_mk[keyboard_name]
         return True if key in rules_mk and rules_mk[key].lower() == str(value).lower() else False
 
     return _rules_mk_filter
@@ -27,7 +29,8 @@ def _is_split(keyboard_name):
 
 @cli.argument('-j', '--parallel', type=int, default=1, help="Set the number of parallel make jobs to run.")
 @cli.argument('-c', '--clean', arg_only=True, action='store_true', help="Remove object files before compiling.")
-@cli.argument('-f', '--filter', arg_only=True, action='append', default=[], help="Filter the list of keyboards based on the supplied value in rules.mk. Supported format is 'SPLIT_KEYBOARD=yes'. May be passed multiple times.")
+@cli.argument('-f', '--filter', arg_only=True, action='append', default=[], help="Filter the list of keyboards based on the supplied value in rules.mk, eg 'SPLIT_KEYBOARD=yes', or a `qmk find` expression, eg 'processor=STM32F303 and features.rgblight'. May be passed multiple times.")
+@cli.argument('-a', '--affected', arg_only=True, metavar='RANGE', help="Only compile keyboards whose default keymap can be affected by the changes in RANGE, in any form `git diff` accepts, eg 'origin/master'.")
 @cli.subcommand('Compile QMK Firmware for all keyboards.', hidden=False if cli.config.user.developer else True)
 def multibuild(cli):
     """Compile QMK Firmware against all keyboards.
@@ -43,10 +46,35 @@ def multibuild(cli):
     keyboard_list = qmk.keyboard.list_keyboards()
 
     filter_re = re.compile(r'^(?P<key>[A-Z0-9_]+)\s*=\s*(?P<value>[^#]+)$')
-    for filter_txt in cli.args.filter:
-        f = filter_re.match(filter_txt)
-        if f is not None:
-            keyboard_list = filter(_make_rules_mk_filter(f.group('key'), f.group('value')), keyboard_list)
+    rules_mk_filters = [f for f in map(filter_re.match, cli.args.filter) if f is not None]
+    info_filters = [filter_txt for filter_txt in cli.args.filter if filter_re.match(filter_txt) is None]
+
+    if rules_mk_filters:
+        all_rules_mk = qmk.keyboard.rules_mk_many(keyboard_list)
+
+    for f in rules_mk_filters:
+        keyboard_list = filter(_make_rules_mk_filter(f.group('key'), f.group('value'), all_rules_mk), keyboard_list)
+
+    if info_filters:
+        try:
+            matches = set(qmk.search.search(info_filters))
+
+        except ValueError as e:
+            cli.log.error('Invalid filter: %s', e)
+            return False
+
+        keyboard_list = [keyboard for keyboard in keyboard_list if keyboard in matches]
+
+    if cli.args.affected:
+        try:
+            files = qmk.affected.changed_files(cli.args.affected)
+
+        except ValueError as e:
+            cli.log.error('Could not list the changes in %s: %s', cli.args.affected, e)
+            return False
+
+        affected = {keyboard for keyboard, keymap in qmk.affected.affected_targets(files) if keymap == 'default'}
+        keyboard_list = [keyboard for keyboard in keyboard_list if keyboard in affected]
 
     keyboard_list = list(sorted(keyboard_list))
 
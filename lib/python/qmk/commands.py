@@ -11,9 +11,10 @@ from time import strftime
 
 from milc import cli
 
+import qmk.keyboard_aliases
 import qmk.keymap
 from qmk.constants import KEYBOARD_OUTPUT_PREFIX
-from qmk.json_schema import json_load
+from qmk.path import write_if_changed
 
 time_fmt = '%Y-%m-%d-%H:%M:%S'
 
@@ -118,7 +119,7 @@ def write_version_h(git_version, build_date, chibios_version, chibios_contrib_ve
     ]
 
     version_h_file = Path('quantum/version.h')
-    version_h_file.write_text('\n'.join(version_h))
+    write_if_changed(version_h_file, '\n'.join(version_h))
 
 
 def compile_configurator_json(user_keymap, bootloader=None, parallel=1, **env_vars):
@@ -214,14 +215,10 @@ def parse_configurator_json(configurator_file):
     # FIXME(skullydazed/anyone): Add validation here
     user_keymap = json.load(configurator_file)
     orig_keyboard = user_keymap['keyboard']
-    aliases = json_load(Path('data/mappings/keyboard_aliases.json'))
+    user_keymap['keyboard'] = qmk.keyboard_aliases.resolve(orig_keyboard)
 
-    if orig_keyboard in aliases:
-        if 'target' in aliases[orig_keyboard]:
-            user_keymap['keyboard'] = aliases[orig_keyboard]['target']
-
-        if 'layouts' in aliases[orig_keyboard] and user_keymap['layout'] in aliases[orig_keyboard]['layouts']:
-            user_keymap['layout'] = aliases[orig_keyboard]['layouts'][user_keymap['layout']]
+    if 'layout' in user_keymap:
+        user_keymap['layout'] = qmk.keyboard_aliases.resolve_layout(orig_keyboard, user_keymap['layout'])
 
     return user_keymap
 
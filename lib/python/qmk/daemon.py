@@ -0,0 +1,215 @@
+"""Hand commands to a running `qmk daemon`.
+
+`bin/qmk` calls `forward()` before it imports anything else. When a daemon is listening on `.build/qmk_daemon.sock` the command is sent to it, along with the working directory, environment, umask and the file descriptors of stdin, stdout and stderr. The daemon forks a copy of its already warm interpreter to run it, so the output goes straight to the caller's terminal or pipes.
+
+This module only uses the standard library, and must not import `qmk.constants`, which records the working directory at import time.
+"""
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+# Bump this when the messages change
+PROTOCOL_VERSION = 1
+
+# The signals `forward()` passes on to the command running in the daemon
+FORWARDED_SIGNALS = ('SIGINT', 'SIGTERM', 'SIGHUP', 'SIGQUIT')
+
+_int_format = struct.Struct('!i')
+
+
+def supported():
+    """Returns True if this platform can pass file descriptors over Unix sockets.
+    """
+    return hasattr(socket, 'AF_UNIX') and hasattr(socket, 'SCM_RIGHTS') and hasattr(os, 'fork')
+
+
+def enabled():
+    """Returns False when forwarding has been turned off with `QMK_DAEMON=0`.
+    """
+    return os.environ.get('QMK_DAEMON', '1').lower() not in ('0', 'no', 'off', 'false')
+
+
+def socket_file(qmk_dir):
+    """Returns the path of the daemon's socket for the checkout in `qmk_dir`.
+    """
+    return Path(qmk_dir, os.environ.get('BUILD_DIR', '.build'), 'qmk_daemon.sock')
+
+
+def source_signature(qmk_dir):
+    """Returns the size and mtime of every file whose contents a warm daemon holds in memory.
+
+    When this changes the daemon is out of date and has to be restarted.
+    """
+    qmk_dir = Path(qmk_dir)
+    files = [qmk_dir / 'bin' / 'qmk', qmk_dir / 'layouts' / 'default']
+    files.extend(sorted((qmk_dir / 'lib' / 'python').rglob('*.py')))
+    files.extend(sorted((qmk_dir / 'data' / 'mappings').glob('*')))
+    files.extend(sorted((qmk_dir / 'data' / 'schemas').glob('*')))
+    signature = []
+
+    for file in files:
+        try:
+            stat = file.stat()
+            signature.append((str(file), stat.st_size, stat.st_mtime_ns))
+
+        except OSError:
+            signature.append((str(file), None, None))
+
+    return signature
+
+
+def _receive_exactly(connection, size):
+    """Read exactly `size` bytes from `connection`.
+    """
+    data = b''
+
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+
+        if not chunk:
+            raise EOFError('Connection closed')
+
+        data += chunk
+
+    return data
+
+
+def send_int(connection, value):
+    """Send a single integer, such as a process ID or exit code.
+    """
+    connection.sendall(_int_format.pack(value))
+
+
+def receive_int(connection):
+    """Receive a single integer sent with `send_int()`.
+    """
+    return _int_format.unpack(_receive_exactly(connection, _int_format.size))[0]
+
+
+def send_message(connection, message, fds=()):
+    """Send a JSON message, and optionally some file descriptors, over a Unix socket.
+    """
+    payload = json.dumps(message).encode('utf-8')
+    ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array('i', fds))] if fds else []
+
+    connection.sendmsg([_int_format.pack(len(payload))], ancillary)
+    connection.sendall(payload)
+
+
+def receive_message(connection, max_fds=3):
+    """Receive a message sent with `send_message()`.
+
+    Returns:
+        the message, and a list of the file descriptors that came with it
+    """
+    fds = array('i')
+    header, ancillary, _, _ = connection.recvmsg(_int_format.size, socket.CMSG_SPACE(max_fds * fds.itemsize))
+
+    for level, kind, data in ancillary:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+
+    try:
+        if not header:
+            raise EOFError('Connection closed')
+
+        header += _receive_exactly(connection, _int_format.size - len(header))
+        payload = _receive_exactly(connection, _int_format.unpack(header)[0])
+
+        return json.loads(payload.decode('utf-8')), list(fds)
+
+    except Exception:
+        for fd in fds:
+            os.close(fd)
+
+        raise
+
+
+def connect(qmk_dir):
+    """Returns a socket connected to the daemon for `qmk_dir`, or None if there isn't one running.
+    """
+    path = socket_file(qmk_dir)
+
+    if not supported() or not path.exists():
+        return None
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        connection.connect(str(path))
+
+    except OSError:
+        connection.close()
+        return None
+
+    return connection
+
+
+def forward(qmk_dir, argv):
+    """Run a command in the daemon for `qmk_dir`.
+
+    Returns:
+        the command's exit code, or None if there is no daemon that can run it, in which case the caller should run the command itself
+    """
+    # Tab completion writes to extra file descriptors, and `qmk daemon` manages the daemon itself
+    if not enabled() or '_ARGCOMPLETE' in os.environ or 'daemon' in argv[1:]:
+        return None
+
+    connection = connect(qmk_dir)
+
+    if not connection:
+        return None
+
+    try:
+        fds = [sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno()]
+
+    except (AttributeError, OSError, ValueError):
+        # One of them is closed, or isn't a real file
+        connection.close()
+        return None
+
+    with connection:
+        umask = os.umask(0)
+        os.umask(umask)
+        request = {
+            'version': PROTOCOL_VERSION,
+            'argv': argv,
+            'cwd': os.getcwd(),
+            'environ': dict(os.environ),
+            'umask': umask,
+        }
+
+        try:
+            send_message(connection, request, fds)
+            pid = receive_int(connection)
+
+        except (OSError, EOFError, ValueError):
+            return None
+
+        if not pid:
+            # The daemon refused, because it is out of date or stopping
+            return None
+
+        # From here on the command is running in the daemon, pass on anything that should interrupt it
+        def forward_signal(signum, frame):
+            try:
+                os.killpg(pid, signum)
+
+            except OSError:
+                pass
+
+        for name in FORWARDED_SIGNALS:
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), forward_signal)
+
+        try:
+            return receive_int(connection)
+
+        except (OSError, EOFError):
+            print('qmk: lost the connection to qmk daemon', file=sys.stderr)
+            return 255
@@ -0,0 +1,212 @@
+"""Structured diagnostics for the info.json pipeline.
+
+Problems found while building info.json data are recorded here with a stable code, the keyboard and, when known, the file they came from. Normally each one is logged as soon as it is recorded, just like a plain `cli.log` call. Inside a `collecting()` block they are buffered instead, so bulk commands such as `generate-api` can report a summary at the end, write every diagnostic to a JSONL file in batches, or say nothing at all.
+
+Either way the messages still end up in the `parse_errors` and `parse_warnings` lists of the info.json data, that is the job of the caller.
+"""
+import json
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+from milc import cli
+
+Diagnostic = namedtuple('Diagnostic', ('level', 'code', 'keyboard', 'file', 'message'))
+
+# Codes are part of the JSONL output, don't change the meaning of an existing code.
+codes = {
+    'E101': 'info.json root object is not a dictionary',
+    'E102': 'info.json does not match the schema',
+    'E103': 'no layouts defined',
+    'E104': 'community layout does not exist',
+    'E105': 'community layout macro is missing',
+    'E106': 'layout key count does not match info.json',
+    'E107': 'nested layout macro, matrix data not available',
+    'E108': 'layout macro has an empty parameter',
+    'E109': 'incomplete #define',
+    'E110': 'incomplete #undef',
+    'W201': 'feature set in both info.json and rules.mk',
+    'W202': 'matrix size set in both info.json and config.h',
+    'W203': 'matrix pins set in both info.json and config.h',
+    'W204': 'direct pins set in both info.json and config.h',
+    'W205': 'config.h or rules.mk value overwrites info.json',
+    'W206': 'config.h or rules.mk value could not be converted',
+    'W207': 'unknown MCU',
+    'W208': 'info.json uses a layout alias name',
+    'W209': 'falling back to searching every header for layout macros',
+}
+
+_collected = None
+_pending = []
+_jsonl = None
+_batch_size = 0
+_captures = []
+
+
+@contextmanager
+def collecting(jsonl=None, batch_size=500):
+    """Buffer diagnostics for the duration of a `with` block instead of logging them.
+
+    Blocks can be nested, the outermost block owns the buffer.
+
+    Args:
+        jsonl: an optional path to write the diagnostics to as JSON lines, `batch_size` at a time
+        batch_size: how many diagnostics to hold before writing them to `jsonl`
+
+    Yields:
+        the list that diagnostics are collected in
+    """
+    global _collected, _jsonl, _batch_size
+
+    if _collected is not None:
+        yield _collected
+        return
+
+    if jsonl:
+        jsonl.parent.mkdir(parents=True, exist_ok=True)
+        _jsonl = jsonl.open('w', encoding='utf-8')
+
+    _collected = []
+    _pending.clear()
+    _batch_size = batch_size
+
+    try:
+        yield _collected
+
+    finally:
+        _write_pending()
+        _collected = None
+
+        if _jsonl is not None:
+            _jsonl.close()
+            _jsonl = None
+
+
+def reset():
+    """Forget any `collecting()` or `capture()` blocks inherited from a parent process.
+
+    Worker processes call this before recording anything, so their diagnostics go back to the parent instead of into a copy of its buffer or JSONL file.
+    """
+    global _collected, _jsonl
+
+    _collected = None
+    _jsonl = None
+    _pending.clear()
+    _captures.clear()
+
+
+@contextmanager
+def capture():
+    """Keep a copy of every diagnostic recorded inside a `with` block, whether or not it is being collected.
+
+    Yields:
+        a list of `Diagnostic`
+    """
+    captured = []
+    _captures.append(captured)
+
+    try:
+        yield captured
+
+    finally:
+        _captures.remove(captured)
+
+
+def record(level, code, keyboard, message, file=None):
+    """Record a diagnostic.
+
+    Args:
+        level: `error`, `warning` or `debug`, which is only logged when running with `-v`
+        code: one of the keys of `codes`
+        keyboard: the keyboard the diagnostic is about, or None for problems with a file that can be shared by several keyboards
+        message: the human readable message
+        file: the file the problem was found in, if known
+    """
+    _emit(Diagnostic(level, code, str(keyboard) if keyboard else None, str(file) if file else None, message))
+
+
+def error(code, keyboard, message, file=None):
+    """Record an error.
+    """
+    record('error', code, keyboard, message, file)
+
+
+def warning(code, keyboard, message, file=None):
+    """Record a warning.
+    """
+    record('warning', code, keyboard, message, file)
+
+
+def replay(diagnostics):
+    """Record diagnostics again, for example when info.json data is served from a cache.
+    """
+    for diagnostic in diagnostics:
+        _emit(Diagnostic(*diagnostic))
+
+
+def _emit(diagnostic):
+    """Log or buffer a single diagnostic.
+    """
+    for captured in _captures:
+        captured.append(diagnostic)
+
+    if _collected is None:
+        _log(diagnostic)
+        return
+
+    _collected.append(diagnostic)
+
+    if _jsonl is not None:
+        _pending.append(diagnostic)
+
+        if len(_pending) >= _batch_size:
+            _write_pending()
+
+
+def _log(diagnostic):
+    """Log a single diagnostic at its level.
+    """
+    getattr(cli.log, diagnostic.level)('%s: %s', diagnostic.keyboard or diagnostic.file, diagnostic.message)
+
+
+def log_diagnostics(diagnostics):
+    """Log every diagnostic in a list, in the order they were recorded.
+    """
+    for diagnostic in diagnostics:
+        _log(diagnostic)
+
+
+def _write_pending():
+    """Write the diagnostics waiting for the JSONL file.
+    """
+    if _jsonl is not None and _pending:
+        _jsonl.write(''.join(json.dumps(diagnostic._asdict()) + '\n' for diagnostic in _pending))
+        _jsonl.flush()
+
+    _pending.clear()
+
+
+def summarize(diagnostics):
+    """Returns a Counter of `(level, code)` for a list of diagnostics.
+    """
+    return Counter((diagnostic.level, diagnostic.code) for diagnostic in diagnostics)
+
+
+def log_summary(diagnostics):
+    """Log how many of each diagnostic were recorded, and how many keyboards or files they affect.
+    """
+    sources = {}
+
+    for diagnostic in diagnostics:
+        sources.setdefault(diagnostic.code, set()).add(diagnostic.keyboard or diagnostic.file)
+
+    counts = summarize(diagnostics)
+    total = sum(count for (level, code), count in counts.items() if level != 'debug')
+
+    if not total:
+        return
+
+    cli.log.info('{fg_blue}Diagnostics{fg_reset}: %d', total)
+
+    for (level, code), count in sorted(counts.items(), key=lambda item: item[0][1]):
+        if level != 'debug':
+            cli.log.info('  %s %-7s %6d from %4d keyboards or files  %s', code, level, count, len(sources[code]), codes.get(code, ''))
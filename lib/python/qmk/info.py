@@ -1,18 +1,27 @@
 """Functions that help us generate and use info.json files.
 """
+from collections.abc import Mapping
+from copy import deepcopy
+from functools import lru_cache
 from glob import glob
 from pathlib import Path
+import hashlib
+import os
 
 import jsonschema
-from dotty_dict import dotty
 from milc import cli
 
+from qmk import diagnostics, info_cache, keyboard_index
 from qmk.constants import CHIBIOS_PROCESSORS, LUFA_PROCESSORS, VUSB_PROCESSORS
 from qmk.c_parse import find_layouts
-from qmk.json_schema import deep_update, json_load, keyboard_validate, keyboard_api_validate
+from qmk.json_schema import deep_update, json_load, keyboard_validate, keyboard_api_validate, keyboard_validate_key
 from qmk.keyboard import config_h, rules_mk
 from qmk.keymap import list_keymaps
+from qmk.layout import Layout, compact_layouts
 from qmk.makefile import parse_rules_mk_file
+from qmk.mappings import load_mapping, lookup, mapped_keys
+from qmk.parse_cache import active, cached_parse, shared_parses
+from qmk.profiling import enabled as profiling_enabled, profile_keyboard, profile_stage
 from qmk.math import compute
 
 true_values = ['1', 'on', 'yes']
@@ -27,6 +36,247 @@ def _valid_community_layout(layout):
 
 def info_json(keyboard):
     """Generate the info.json data for a specific keyboard.
+
+    Results are served from the on-disk cache in `qmk.info_cache` when none of the keyboard's input files have changed. The diagnostics recorded when the data was built are recorded again on a cache hit. The cache is skipped while profiling, so the pipeline always runs.
+    """
+    with profile_keyboard(keyboard):
+        if not info_cache.enabled() or profiling_enabled():
+            return _build_info_json(keyboard)
+
+        cache_key = info_cache.cache_key(keyboard)
+        entry = info_cache.get(keyboard, cache_key)
+
+        if entry is None:
+            with diagnostics.capture() as captured:
+                info_data = _build_info_json(keyboard)
+
+            info_cache.put(keyboard, info_data, cache_key, captured)
+
+        else:
+            info_data = compact_layouts(entry['info_json'])
+            diagnostics.replay(entry['diagnostics'])
+
+        return info_data
+
+
+def info_json_many(keyboards):
+    """Generate the info.json data for many keyboards at once.
+
+    Files shared between the keyboards, such as a parent rules.mk or info.json, are only parsed once.
+
+    Returns:
+        a dictionary of keyboard name to info.json data
+    """
+    with shared_parses():
+        return {keyboard: info_json(keyboard) for keyboard in keyboards}
+
+
+def info_json_dependencies(keyboard):
+    """Returns every file and directory `info_json()` reads for a keyboard.
+
+    Directories are included so that adding a new info.json, config.h or keymap to the tree is noticed as well.
+    """
+    dependencies = info_cache.input_files(keyboard)
+    keyboard_dirs = [Path('keyboards')]
+
+    for directory in Path(keyboard).parts:
+        keyboard_dirs.append(keyboard_dirs[-1] / directory)
+
+    for keyboard_dir in keyboard_dirs[1:]:
+        dependencies.append(keyboard_dir)
+
+        if 'keymaps' in keyboard_index.subdirectories(keyboard_dir):
+            dependencies.append(keyboard_dir / 'keymaps')
+
+    dependencies.extend(sorted(Path('data/mappings').glob('*.json')))
+    dependencies.extend(sorted(Path('data/schemas').glob('*.jsonschema')))
+
+    return dependencies
+
+
+def generated_file_dependencies(keyboard):
+    """Returns every file the files generated from the info.json data for a keyboard depend on.
+
+    This is `info_json_dependencies()` plus the python sources of the qmk package, so the files are generated again after the CLI changes.
+    """
+    return info_json_dependencies(keyboard) + _qmk_sources()
+
+
+@lru_cache(maxsize=None)
+def _qmk_sources():
+    """Returns the python modules of the qmk package, leaving out its tests.
+    """
+    return [path for path in sorted(Path('lib/python/qmk').rglob('*.py')) if 'tests' not in path.parts]
+
+
+def info_json_signature(keyboard):
+    """Returns a hash of the name, size and mtime of every file and directory the info.json data for `keyboard` is built from.
+    """
+    digest = hashlib.sha256(info_cache.global_digest().encode('utf-8'))
+
+    for path in info_json_dependencies(keyboard):
+        try:
+            stat = os.stat(path)
+            digest.update(f'{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0'.encode('utf-8'))
+
+        except OSError:
+            digest.update(f'{path}\0missing\0'.encode('utf-8'))
+
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def lazy_info_json(keyboard):
+    """Returns a `LazyInfoJSON` for a keyboard.
+
+    The same object is returned for every call within a process, so sections built for one caller are reused by the next.
+    """
+    return LazyInfoJSON(keyboard)
+
+
+class LazyInfoJSON(Mapping):
+    """Read-only info.json data for a keyboard that only runs the parts of the pipeline a caller needs.
+
+    Each top level key is built and validated the first time it's accessed. Keys that only the full pipeline can answer, such as `parse_errors`, and iterating over the whole object run everything. Use `info_json()` when you need the complete data anyway, it is served from the on-disk cache.
+    """
+    stages = ('keymaps', 'layouts', 'info', 'config', 'rules', 'checks')
+    rules_keys = frozenset(('processor', 'processor_type', 'platform', 'protocol', 'bootloader', 'features', 'config_h_features'))
+
+    def __init__(self, keyboard):
+        rules = parse_rules_mk_file(Path('keyboards') / keyboard / 'rules.mk')
+
+        if 'DEFAULT_FOLDER' in rules:
+            keyboard = rules['DEFAULT_FOLDER']
+
+        self.keyboard = keyboard
+        self._data = {
+            'keyboard_name': str(keyboard),
+            'keyboard_folder': str(keyboard),
+            'keymaps': {},
+            'layouts': {},
+            'parse_errors': [],
+            'parse_warnings': [],
+            'maintainer': 'qmk',
+        }
+        self._info_jsons = None
+        self._finished = set()
+        self._validated = set()
+
+    def __getitem__(self, key):
+        self._build(key)
+        value = self._data[key]
+
+        if key not in self._validated:
+            try:
+                keyboard_validate_key(key, value)
+
+            except jsonschema.ValidationError as e:
+                json_path = '.'.join([str(p) for p in (key, *e.absolute_path)])
+                cli.log.error('Invalid API data: %s: %s: %s', self.keyboard, json_path, e.message)
+                exit()
+
+            self._validated.add(key)
+
+        return value
+
+    def __contains__(self, key):
+        self._build(key)
+
+        return key in self._data
+
+    def __iter__(self):
+        self._run_stages(self.stages)
+
+        return iter(self._data)
+
+    def __len__(self):
+        self._run_stages(self.stages)
+
+        return len(self._data)
+
+    def sections(self, *keys):
+        """Returns a plain dictionary holding only the requested top level keys that exist.
+        """
+        return {key: self[key] for key in keys if key in self}
+
+    def _stages_for(self, key):
+        """Returns the pipeline stages that can write `key`, in the order they have to run.
+        """
+        if key == 'keymaps':
+            return ('keymaps',)
+
+        if key == 'layouts':
+            return ('layouts',)
+
+        if key == 'layout_aliases':
+            return ('layouts', 'info', 'config')
+
+        if key in ('parse_errors', 'parse_warnings', 'community_layouts'):
+            return self.stages
+
+        if key in mapped_keys('info_config') or key in ('matrix_size', 'matrix_pins'):
+            return ('info', 'config')
+
+        if key in mapped_keys('info_rules') or key in self.rules_keys:
+            return ('info', 'rules')
+
+        # Everything else can only come from info.json
+        return ('info',)
+
+    def _build(self, key):
+        """Run whatever stages are needed to produce `key`.
+        """
+        self._run_stages(self._stages_for(key))
+
+    def _run_stages(self, stages):
+        """Run each stage in `stages` that hasn't already been run.
+        """
+        with profile_keyboard(self.keyboard):
+            for stage in stages:
+                if stage not in self._finished:
+                    self._finished.add(stage)
+                    getattr(self, f'_build_{stage}')()
+
+    def _load_info_jsons(self):
+        """Returns the validated info.json files, loading them the first time.
+        """
+        if self._info_jsons is None:
+            self._info_jsons = load_info_jsons(self.keyboard, self._data)
+
+        return self._info_jsons
+
+    def _build_keymaps(self):
+        _find_keymaps(self._data, self.keyboard)
+
+    def _build_layouts(self):
+        # If config.h has already set the aliases they win, just as they would have in the full pipeline
+        config_aliases = self._data.pop('layout_aliases', None)
+
+        _find_keyboard_h_layouts(self._data, self.keyboard)
+
+        for new_info_data in self._load_info_jsons():
+            _merge_info_json_layouts(self._data, new_info_data)
+
+        if config_aliases is not None:
+            self._data['layout_aliases'] = config_aliases
+
+    def _build_info(self):
+        for new_info_data in self._load_info_jsons():
+            deep_update(self._data, _without_layouts(new_info_data))
+
+    def _build_config(self):
+        _extract_config_h(self._data)
+
+    def _build_rules(self):
+        _extract_rules_mk(self._data)
+
+    def _build_checks(self):
+        _check_info_json(self.keyboard, self._data)
+        self._validated.update(self._data)
+
+
+def _build_info_json(keyboard):
+    """Build the info.json data for a keyboard from its source files.
     """
     cur_dir = Path('keyboards')
     rules = parse_rules_mk_file(cur_dir / keyboard / 'rules.mk')
@@ -45,10 +295,31 @@ def info_json(keyboard):
     }
 
     # Populate the list of JSON keymaps
+    _find_keymaps(info_data, keyboard)
+
+    # Populate layout data
+    _find_keyboard_h_layouts(info_data, keyboard)
+
+    # Merge in the data from info.json, config.h, and rules.mk
+    info_data = merge_info_jsons(keyboard, info_data)
+    info_data = _extract_config_h(info_data)
+    info_data = _extract_rules_mk(info_data)
+
+    return _check_info_json(keyboard, info_data)
+
+
+def _find_keymaps(info_data, keyboard):
+    """Populate the list of JSON keymaps.
+    """
     for keymap in list_keymaps(keyboard, c=False, fullpath=True):
         info_data['keymaps'][keymap.name] = {'url': f'https://raw.githubusercontent.com/qmk/qmk_firmware/master/{keymap}/keymap.json'}
 
-    # Populate layout data
+    return info_data
+
+
+def _find_keyboard_h_layouts(info_data, keyboard):
+    """Populate the layouts and aliases defined in the keyboard's header files.
+    """
     layouts, aliases = _find_all_layouts(info_data, keyboard)
 
     if aliases:
@@ -59,11 +330,12 @@ def info_json(keyboard):
             layout_json['c_macro'] = True
             info_data['layouts'][layout_name] = layout_json
 
-    # Merge in the data from info.json, config.h, and rules.mk
-    info_data = merge_info_jsons(keyboard, info_data)
-    info_data = _extract_config_h(info_data)
-    info_data = _extract_rules_mk(info_data)
+    return info_data
+
 
+def _check_info_json(keyboard, info_data):
+    """Validate the finished info.json data and check the layouts it claims to support.
+    """
     # Validate against the jsonschema
     try:
         keyboard_api_validate(info_data)
@@ -75,20 +347,20 @@ def info_json(keyboard):
 
     # Make sure we have at least one layout
     if not info_data.get('layouts'):
-        _log_error(info_data, 'No LAYOUTs defined! Need at least one layout defined in the keyboard.h or info.json.')
+        _log_error(info_data, 'E103', 'No LAYOUTs defined! Need at least one layout defined in the keyboard.h or info.json.')
 
     # Filter out any non-existing community layouts
     for layout in info_data.get('community_layouts', []):
         if not _valid_community_layout(layout):
             # Ignore layout from future checks
             info_data['community_layouts'].remove(layout)
-            _log_error(info_data, 'Claims to support a community layout that does not exist: %s' % (layout))
+            _log_error(info_data, 'E104', 'Claims to support a community layout that does not exist: %s' % (layout))
 
     # Make sure we supply layout macros for the community layouts we claim to support
     for layout in info_data.get('community_layouts', []):
         layout_name = 'LAYOUT_' + layout
         if layout_name not in info_data.get('layouts', {}) and layout_name not in info_data.get('layout_aliases', {}):
-            _log_error(info_data, 'Claims to support community layout %s but no %s() macro found' % (layout, layout_name))
+            _log_error(info_data, 'E105', 'Claims to support community layout %s but no %s() macro found' % (layout, layout_name))
 
     return info_data
 
@@ -121,7 +393,7 @@ def _extract_features(info_data, rules):
                 info_data['features'] = {}
 
             if key in info_data['features']:
-                _log_warning(info_data, 'Feature %s is specified in both info.json and rules.mk, the rules.mk value wins.' % (key,))
+                _log_warning(info_data, 'W201', 'Feature %s is specified in both info.json and rules.mk, the rules.mk value wins.' % (key,))
 
             info_data['features'][key] = value
             info_data['config_h_features'][key] = value
@@ -191,7 +463,7 @@ def _extract_matrix_info(info_data, config_c):
 
     if 'MATRIX_ROWS' in config_c and 'MATRIX_COLS' in config_c:
         if 'matrix_size' in info_data:
-            _log_warning(info_data, 'Matrix size is specified in both info.json and config.h, the config.h values win.')
+            _log_warning(info_data, 'W202', 'Matrix size is specified in both info.json and config.h, the config.h values win.')
 
         info_data['matrix_size'] = {
             'cols': compute(config_c.get('MATRIX_COLS', '0')),
@@ -200,7 +472,7 @@ def _extract_matrix_info(info_data, config_c):
 
     if row_pins and col_pins:
         if 'matrix_pins' in info_data:
-            _log_warning(info_data, 'Matrix pins are specified in both info.json and config.h, the config.h values win.')
+            _log_warning(info_data, 'W203', 'Matrix pins are specified in both info.json and config.h, the config.h values win.')
 
         info_data['matrix_pins'] = {
             'cols': _extract_pins(col_pins),
@@ -209,63 +481,38 @@ def _extract_matrix_info(info_data, config_c):
 
     if direct_pins:
         if 'matrix_pins' in info_data:
-            _log_warning(info_data, 'Direct pins are specified in both info.json and config.h, the config.h values win.')
+            _log_warning(info_data, 'W204', 'Direct pins are specified in both info.json and config.h, the config.h values win.')
 
         info_data['matrix_pins']['direct'] = _extract_direct_matrix(info_data, direct_pins)
 
     return info_data
 
 
-def _extract_config_h(info_data):
-    """Pull some keyboard information from existing config.h files
+def _extract_mapping(info_data, mapping_name, values, source):
+    """Copy the values that a data/mappings file describes from a parsed config.h or rules.mk into info_data.
     """
-    config_c = config_h(info_data['keyboard_folder'])
-
-    # Pull in data from the json map
-    dotty_info = dotty(info_data)
-    info_config_map = json_load(Path('data/mappings/info_config.json'))
-
-    for config_key, info_dict in info_config_map.items():
-        info_key = info_dict['info_key']
-        key_type = info_dict.get('value_type', 'str')
-
+    for entry in load_mapping(mapping_name):
         try:
-            if config_key in config_c and info_dict.get('to_json', True):
-                if dotty_info.get(info_key) and info_dict.get('warn_duplicate', True):
-                    _log_warning(info_data, '%s in config.h is overwriting %s in info.json' % (config_key, info_key))
-
-                if key_type.startswith('array'):
-                    if '.' in key_type:
-                        key_type, array_type = key_type.split('.', 1)
-                    else:
-                        array_type = None
+            if entry.key in values and entry.to_json:
+                if entry.warn_duplicate and lookup(entry, info_data):
+                    _log_warning(info_data, 'W205', '%s in %s is overwriting %s in info.json' % (entry.key, source, entry.info_key))
 
-                    config_value = config_c[config_key].replace('{', '').replace('}', '').strip()
+                entry.set(info_data, entry.parse(values[entry.key]))
 
-                    if array_type == 'int':
-                        dotty_info[info_key] = list(map(int, config_value.split(',')))
-                    else:
-                        dotty_info[info_key] = config_value.split(',')
-
-                elif key_type == 'bool':
-                    dotty_info[info_key] = config_c[config_key] in true_values
-
-                elif key_type == 'hex':
-                    dotty_info[info_key] = '0x' + config_c[config_key][2:].upper()
+        except Exception as e:
+            _log_warning(info_data, 'W206', f'{entry.key}->{entry.info_key}: {e}')
 
-                elif key_type == 'list':
-                    dotty_info[info_key] = config_c[config_key].split()
+    return info_data
 
-                elif key_type == 'int':
-                    dotty_info[info_key] = int(config_c[config_key])
 
-                else:
-                    dotty_info[info_key] = config_c[config_key]
-
-        except Exception as e:
-            _log_warning(info_data, f'{config_key}->{info_key}: {e}')
+@profile_stage
+def _extract_config_h(info_data):
+    """Pull some keyboard information from existing config.h files
+    """
+    config_c = config_h(info_data['keyboard_folder'])
 
-    info_data.update(dotty_info)
+    # Pull in data from the json map
+    _extract_mapping(info_data, 'info_config', config_c, 'config.h')
 
     # Pull data that easily can't be mapped in json
     _extract_matrix_info(info_data, config_c)
@@ -273,6 +520,7 @@ def _extract_config_h(info_data):
     return info_data
 
 
+@profile_stage
 def _extract_rules_mk(info_data):
     """Pull some keyboard information from existing rules.mk files
     """
@@ -286,54 +534,11 @@ def _extract_rules_mk(info_data):
         avr_processor_rules(info_data, rules)
 
     else:
-        cli.log.warning("%s: Unknown MCU: %s" % (info_data['keyboard_folder'], info_data['processor']))
+        diagnostics.warning('W207', info_data['keyboard_folder'], 'Unknown MCU: %s' % (info_data['processor'],))
         unknown_processor_rules(info_data, rules)
 
     # Pull in data from the json map
-    dotty_info = dotty(info_data)
-    info_rules_map = json_load(Path('data/mappings/info_rules.json'))
-
-    for rules_key, info_dict in info_rules_map.items():
-        info_key = info_dict['info_key']
-        key_type = info_dict.get('value_type', 'str')
-
-        try:
-            if rules_key in rules and info_dict.get('to_json', True):
-                if dotty_info.get(info_key) and info_dict.get('warn_duplicate', True):
-                    _log_warning(info_data, '%s in rules.mk is overwriting %s in info.json' % (rules_key, info_key))
-
-                if key_type.startswith('array'):
-                    if '.' in key_type:
-                        key_type, array_type = key_type.split('.', 1)
-                    else:
-                        array_type = None
-
-                    rules_value = rules[rules_key].replace('{', '').replace('}', '').strip()
-
-                    if array_type == 'int':
-                        dotty_info[info_key] = list(map(int, rules_value.split(',')))
-                    else:
-                        dotty_info[info_key] = rules_value.split(',')
-
-                elif key_type == 'list':
-                    dotty_info[info_key] = rules[rules_key].split()
-
-                elif key_type == 'bool':
-                    dotty_info[info_key] = rules[rules_key] in true_values
-
-                elif key_type == 'hex':
-                    dotty_info[info_key] = '0x' + rules[rules_key][2:].upper()
-
-                elif key_type == 'int':
-                    dotty_info[info_key] = int(rules[rules_key])
-
-                else:
-                    dotty_info[info_key] = rules[rules_key]
-
-        except Exception as e:
-            _log_warning(info_data, f'{rules_key}->{info_key}: {e}')
-
-    info_data.update(dotty_info)
+    _extract_mapping(info_data, 'info_rules', rules, 'rules.mk')
 
     # Merge in config values that can't be easily mapped
     _extract_features(info_data, rules)
@@ -349,7 +554,7 @@ def _merge_layouts(info_data, new_info_data):
             # Pull in layouts we have a macro for
             if len(info_data['layouts'][layout_name]['layout']) != len(layout_json['layout']):
                 msg = '%s: %s: Number of elements in info.json does not match! info.json:%s != %s:%s'
-                _log_error(info_data, msg % (info_data['keyboard_folder'], layout_name, len(layout_json['layout']), layout_name, len(info_data['layouts'][layout_name]['layout'])))
+                _log_error(info_data, 'E106', msg % (info_data['keyboard_folder'], layout_name, len(layout_json['layout']), layout_name, len(info_data['layouts'][layout_name]['layout'])))
             else:
                 for i, key in enumerate(info_data['layouts'][layout_name]['layout']):
                     key.update(layout_json['layout'][i])
@@ -384,7 +589,7 @@ def _search_keyboard_h(path):
         keyboard_h = '%s.h' % (directory,)
         keyboard_h_path = current_path / keyboard_h
         if keyboard_h_path.exists():
-            new_layouts, new_aliases = find_layouts(keyboard_h_path)
+            new_layouts, new_aliases = _find_layouts(keyboard_h_path)
             layouts.update(new_layouts)
 
             for alias, alias_text in new_aliases.items():
@@ -394,6 +599,7 @@ def _search_keyboard_h(path):
     return layouts, aliases
 
 
+@profile_stage
 def _find_all_layouts(info_data, keyboard):
     """Looks for layout macros associated with this keyboard.
     """
@@ -402,10 +608,11 @@ def _find_all_layouts(info_data, keyboard):
     if not layouts:
         # If we don't find any layouts from info.json or keyboard.h we widen our search. This is error prone which is why we want to encourage people to follow the standard above.
         info_data['parse_warnings'].append('%s: Falling back to searching for KEYMAP/LAYOUT macros.' % (keyboard))
+        diagnostics.record('debug', 'W209', keyboard, 'Falling back to searching for KEYMAP/LAYOUT macros.')
 
         for file in glob('keyboards/%s/*.h' % keyboard):
             if file.endswith('.h'):
-                these_layouts, these_aliases = find_layouts(file)
+                these_layouts, these_aliases = _find_layouts(file)
 
                 if these_layouts:
                     layouts.update(these_layouts)
@@ -417,18 +624,29 @@ def _find_all_layouts(info_data, keyboard):
     return layouts, aliases
 
 
-def _log_error(info_data, message):
-    """Send an error message to both JSON and the log.
+def _find_layouts(file):
+    """Returns the layouts and aliases from a header file, sharing the parsed results inside `shared_parses()`.
+    """
+    layouts, aliases = cached_parse('layouts', file, find_layouts)
+
+    if active():
+        return deepcopy(layouts), dict(aliases)
+
+    return layouts, aliases
+
+
+def _log_error(info_data, code, message, file=None):
+    """Send an error message to both JSON and the diagnostics sink.
     """
     info_data['parse_errors'].append(message)
-    cli.log.error('%s: %s', info_data.get('keyboard_folder', 'Unknown Keyboard!'), message)
+    diagnostics.error(code, info_data.get('keyboard_folder', 'Unknown Keyboard!'), message, file)
 
 
-def _log_warning(info_data, message):
-    """Send a warning message to both JSON and the log.
+def _log_warning(info_data, code, message, file=None):
+    """Send a warning message to both JSON and the diagnostics sink.
     """
     info_data['parse_warnings'].append(message)
-    cli.log.warning('%s: %s', info_data.get('keyboard_folder', 'Unknown Keyboard!'), message)
+    diagnostics.warning(code, info_data.get('keyboard_folder', 'Unknown Keyboard!'), message, file)
 
 
 def arm_processor_rules(info_data, rules):
@@ -481,51 +699,87 @@ def unknown_processor_rules(info_data, rules):
     return info_data
 
 
+@profile_stage
 def merge_info_jsons(keyboard, info_data):
     """Return a merged copy of all the info.json files for a keyboard.
     """
+    for new_info_data in load_info_jsons(keyboard, info_data):
+        _merge_info_json_layouts(info_data, new_info_data)
+        deep_update(info_data, _without_layouts(new_info_data))
+
+    return info_data
+
+
+@profile_stage
+def load_info_jsons(keyboard, info_data):
+    """Returns the validated contents of every info.json file for a keyboard, most specific first.
+
+    Files that can't be used are logged to `info_data` and skipped.
+    """
+    info_jsons = []
+
     for info_file in find_info_json(keyboard):
-        # Load and validate the JSON data
-        new_info_data = json_load(info_file)
+        new_info_data, error = cached_parse('info.json', info_file, _load_info_json)
 
         if not isinstance(new_info_data, dict):
-            _log_error(info_data, "Invalid file %s, root object should be a dictionary." % (str(info_file),))
+            _log_error(info_data, 'E101', "Invalid file %s, root object should be a dictionary." % (str(info_file),), info_file)
+            continue
+
+        if error:
+            json_path = '.'.join([str(p) for p in error.absolute_path])
+            diagnostics.error('E102', keyboard, 'Not including data from file: %s: %s: %s' % (info_file, json_path, error.message), info_file)
             continue
 
+        info_jsons.append(deepcopy(new_info_data) if active() else new_info_data)
+
+    return info_jsons
+
+
+def _load_info_json(info_file):
+    """Load and validate a single info.json file.
+
+    Returns:
+        a tuple of the file's data and the validation error, if any
+    """
+    new_info_data = json_load(info_file)
+
+    if isinstance(new_info_data, dict):
         try:
             keyboard_validate(new_info_data)
         except jsonschema.ValidationError as e:
-            json_path = '.'.join([str(p) for p in e.absolute_path])
-            cli.log.error('Not including data from file: %s', info_file)
-            cli.log.error('\t%s: %s', json_path, e.message)
-            continue
+            return new_info_data, e
 
-        # Merge layout data in
-        if 'layout_aliases' in new_info_data:
-            info_data['layout_aliases'] = {**info_data.get('layout_aliases', {}), **new_info_data['layout_aliases']}
-            del new_info_data['layout_aliases']
+    return new_info_data, None
 
-        for layout_name, layout in new_info_data.get('layouts', {}).items():
-            if layout_name in info_data.get('layout_aliases', {}):
-                _log_warning(info_data, f"info.json uses alias name {layout_name} instead of {info_data['layout_aliases'][layout_name]}")
-                layout_name = info_data['layout_aliases'][layout_name]
 
-            if layout_name in info_data['layouts']:
-                for new_key, existing_key in zip(layout['layout'], info_data['layouts'][layout_name]['layout']):
-                    existing_key.update(new_key)
-            else:
-                layout['c_macro'] = False
-                info_data['layouts'][layout_name] = layout
+def _merge_info_json_layouts(info_data, new_info_data):
+    """Merge the layouts and layout aliases from one info.json file into info_data.
+    """
+    if 'layout_aliases' in new_info_data:
+        info_data['layout_aliases'] = {**info_data.get('layout_aliases', {}), **new_info_data['layout_aliases']}
 
-        # Update info_data with the new data
-        if 'layouts' in new_info_data:
-            del new_info_data['layouts']
+    for layout_name, layout in new_info_data.get('layouts', {}).items():
+        if layout_name in info_data.get('layout_aliases', {}):
+            _log_warning(info_data, 'W208', f"info.json uses alias name {layout_name} instead of {info_data['layout_aliases'][layout_name]}")
+            layout_name = info_data['layout_aliases'][layout_name]
 
-        deep_update(info_data, new_info_data)
+        if layout_name in info_data['layouts']:
+            for new_key, existing_key in zip(layout['layout'], info_data['layouts'][layout_name]['layout']):
+                existing_key.update(new_key)
+        else:
+            layout['c_macro'] = False
+            layout['layout'] = Layout.from_json(layout['layout'])
+            info_data['layouts'][layout_name] = layout
 
     return info_data
 
 
+def _without_layouts(new_info_data):
+    """Returns the info.json data that isn't handled by `_merge_info_json_layouts()`.
+    """
+    return {key: value for key, value in new_info_data.items() if key not in ('layouts', 'layout_aliases')}
+
+
 def find_info_json(keyboard):
     """Finds all the info.json files associated with a keyboard.
     """
@@ -548,4 +802,4 @@ def find_info_json(keyboard):
         keyboard_parent = keyboard_parent.parent
 
     # Return a list of the info.json files that actually exist
-    return [info_json for info_json in info_jsons if info_json.exists()]
+    return [info_json for info_json in info_jsons if keyboard_index.is_file(info_json)]
@@ -0,0 +1,246 @@
+"""Persistent on-disk cache for `qmk.info.info_json()`.
+
+Entries are stored under `.build/info_json_cache/` and keyed by a hash of every file the info.json pipeline reads for a keyboard, along with `data/mappings`, `data/schemas` and the python code that does the parsing. When any of those files change the key changes and the stale entry is simply never looked at again.
+"""
+import atexit
+import hashlib
+import json
+import os
+from collections import namedtuple
+from pathlib import Path
+
+from milc import cli
+
+from qmk import keyboard_index
+from qmk.constants import BUILD_DIR
+from qmk.json_encoders import json_default
+from qmk.keyboard import resolve_keyboard, rules_mk
+from qmk.parse_cache import cached_parse
+from qmk.path import write_if_changed
+from qmk.profiling import profile_stage
+
+# Bump this when the format of the cached data changes
+CACHE_VERSION = 2
+CACHE_DIR = Path(BUILD_DIR) / 'info_json_cache'
+STATS_FILE = CACHE_DIR / 'stats.json'
+
+CacheInfo = namedtuple('CacheInfo', ('hits', 'misses', 'currsize'))
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_registered = False
+_global_digest = None
+
+
+def enabled():
+    """Returns True unless the cache has been turned off with `QMK_INFO_CACHE=0`.
+    """
+    return os.environ.get('QMK_INFO_CACHE', '1').lower() not in ('0', 'no', 'off', 'false')
+
+
+def _keyboard_dirs(keyboard):
+    """Yields each directory from `keyboards/` down to `keyboard`.
+    """
+    cur_dir = Path('keyboards')
+
+    for directory in Path(keyboard).parts:
+        cur_dir = cur_dir / directory
+        yield cur_dir
+
+
+def input_files(keyboard):
+    """Returns a sorted list of every keyboard specific file `info_json()` reads for `keyboard`.
+
+    This covers the rules.mk, config.h, info.json and <keyboard>.h chains, the JSON keymaps, and any community layout keymaps pulled in through `LAYOUTS`. Only files that exist are returned.
+    """
+    keyboards = {keyboard}
+    default_folder = keyboard_index.default_folder(keyboard)
+
+    if default_folder:
+        keyboard = default_folder
+        keyboards.add(keyboard)
+
+    keyboards.add(resolve_keyboard(keyboard))
+    files = set()
+
+    for kb in keyboards:
+        for cur_dir in _keyboard_dirs(kb):
+            present = keyboard_index.files(cur_dir)
+
+            for filename in ('rules.mk', 'config.h', 'info.json', f'{cur_dir.name}.h'):
+                if filename in present:
+                    files.add(cur_dir / filename)
+
+            files.update(_keymap_jsons(cur_dir / 'keymaps'))
+
+        # Used when we have to fall back to searching for LAYOUT macros
+        files.update(Path('keyboards', kb, filename) for filename in keyboard_index.files(Path('keyboards', kb)) if filename.endswith('.h'))
+
+    for layout in rules_mk(keyboard).get('LAYOUTS', '').split():
+        files.update(_keymap_jsons(Path('layouts/community', layout)))
+
+    return sorted(files)
+
+
+def _keymap_jsons(keymaps_dir):
+    """Returns the keymap.json files in the keymap directories inside `keymaps_dir`.
+    """
+    return [keymaps_dir / keymap / 'keymap.json' for keymap in keyboard_index.subdirectories(keymaps_dir) if 'keymap.json' in keyboard_index.files(keymaps_dir / keymap)]
+
+
+def _sha256(file):
+    """Returns the SHA-256 of a file's content.
+    """
+    return hashlib.sha256(Path(file).read_bytes()).hexdigest()
+
+
+def file_digest(file):
+    """Returns the SHA-256 of a file's content, sharing the result inside `shared_parses()`.
+    """
+    return cached_parse('sha256', file, _sha256)
+
+
+def input_digests(keyboard):
+    """Returns a dictionary of every file `input_files()` lists for `keyboard` to the SHA-256 of its content.
+    """
+    return {file.as_posix(): file_digest(file) for file in input_files(keyboard)}
+
+
+def _hash_file(digest, file):
+    """Feed the name and content of `file` into `digest`.
+    """
+    digest.update(str(file).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(Path(file).read_bytes())
+    digest.update(b'\0')
+
+
+def global_digest():
+    """Returns a hash of the inputs shared by every keyboard.
+
+    This covers `data/mappings`, `data/schemas`, the list of community layouts, and the python modules that make up the info.json pipeline. It is computed once per process.
+    """
+    global _global_digest
+
+    if _global_digest is None:
+        digest = hashlib.sha256(f'qmk-info-cache-v{CACHE_VERSION}'.encode('utf-8'))
+
+        for file in sorted(Path('data/mappings').glob('*')) + sorted(Path('data/schemas').glob('*')) + sorted(Path(__file__).parent.glob('*.py')):
+            _hash_file(digest, file)
+
+        if Path('layouts/default').is_dir():
+            digest.update('\0'.join(sorted(os.listdir('layouts/default'))).encode('utf-8'))
+
+        _global_digest = digest.hexdigest()
+
+    return _global_digest
+
+
+@profile_stage
+def cache_key(keyboard):
+    """Returns the cache key for `keyboard`.
+    """
+    digest = hashlib.sha256(global_digest().encode('utf-8'))
+    digest.update(str(keyboard).encode('utf-8'))
+    digest.update(b'\0')
+
+    for file in input_files(keyboard):
+        _hash_file(digest, file)
+
+    return digest.hexdigest()
+
+
+def _register_stats():
+    """Arrange for our statistics to be saved when the process exits.
+    """
+    global _stats_registered
+
+    if not _stats_registered:
+        atexit.register(_save_stats)
+        _stats_registered = True
+
+
+def _save_stats():
+    """Add this process' hits and misses to the persistent statistics.
+    """
+    if not CACHE_DIR.exists():
+        return
+
+    stats = load_stats()
+    stats['hits'] += _stats['hits']
+    stats['misses'] += _stats['misses']
+
+    try:
+        write_if_changed(STATS_FILE, json.dumps(stats))
+    except OSError as e:
+        cli.log.debug('Could not write info.json cache stats: %s', e)
+
+
+def load_stats():
+    """Returns the persistent hit and miss counters.
+    """
+    stats = {'hits': 0, 'misses': 0}
+
+    try:
+        stats.update(json.loads(STATS_FILE.read_text(encoding='utf-8')))
+    except (OSError, ValueError):
+        pass
+
+    return stats
+
+
+@profile_stage
+def get(keyboard, key=None):
+    """Returns the cache entry for `keyboard`, or None if it's not in the cache.
+
+    Entries are dictionaries holding the info.json data under `info_json` and the diagnostics recorded while building it under `diagnostics`.
+    """
+    if not key:
+        key = cache_key(keyboard)
+
+    _register_stats()
+
+    try:
+        entry = json.loads((CACHE_DIR / f'{key}.json').read_text(encoding='utf-8'))
+
+    except (OSError, ValueError):
+        _stats['misses'] += 1
+        return None
+
+    _stats['hits'] += 1
+    return entry
+
+
+@profile_stage
+def put(keyboard, info_data, key=None, diagnostics=()):
+    """Store the info.json data for `keyboard`, and the diagnostics recorded while building it, in the cache.
+    """
+    if not key:
+        key = cache_key(keyboard)
+
+    entry = {'diagnostics': [list(diagnostic) for diagnostic in diagnostics], 'info_json': info_data}
+
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        write_if_changed(CACHE_DIR / f'{key}.json', json.dumps(entry, default=json_default))
+
+    except (OSError, TypeError) as e:
+        cli.log.debug('Could not cache info.json for %s: %s', keyboard, e)
+
+
+def cache_info():
+    """Returns the hits and misses for this process along with the number of entries on disk.
+    """
+    currsize = len(list(CACHE_DIR.glob('*.json'))) - STATS_FILE.exists() if CACHE_DIR.exists() else 0
+
+    return CacheInfo(_stats['hits'], _stats['misses'], currsize)
+
+
+def cache_clear():
+    """Remove every entry and reset the statistics.
+    """
+    if CACHE_DIR.exists():
+        for file in CACHE_DIR.iterdir():
+            file.unlink()
+
+    _stats['hits'] = 0
+    _stats['misses'] = 0
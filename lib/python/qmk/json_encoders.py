@@ -1,15 +1,30 @@
 """Class that pretty-prints QMK info.json files.
 """
 import json
+from collections.abc import Mapping
 from decimal import Decimal
 
 newline = '\n'
 
 
+def json_default(obj):
+    """Serialize the non-JSON types found in info.json data when using the stock encoder.
+
+    Pass this as `default` to `json.dump()` and `json.dumps()`.
+    """
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == int(obj) else float(obj)
+
+    if isinstance(obj, Mapping):
+        return dict(obj)
+
+    raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+
 class QMKJSONEncoder(json.JSONEncoder):
     """Base class for all QMK JSON encoders.
     """
-    container_types = (list, tuple, dict)
+    container_types = (list, tuple, Mapping)
     indentation_char = " "
 
     def __init__(self, *args, **kwargs):
@@ -49,16 +64,36 @@ class QMKJSONEncoder(json.JSONEncoder):
         elif isinstance(obj, (list, tuple)):
             return self.encode_list(obj)
 
-        elif isinstance(obj, dict):
+        elif isinstance(obj, Mapping):
             return self.encode_dict(obj)
 
         else:
             return super().encode(obj)
 
+    def iterencode_items(self, items):
+        """Encode a dictionary from an iterable of `(key, value)` pairs, yielding the output one item at a time.
+
+        This lets very large dictionaries be written out without holding all of their values, or all of the output, in memory at once. The items must already be in the order `encode_dict()` would sort them into. The output matches `encode_dict()` for every dictionary that isn't written on a single line.
+        """
+        self.indentation_level += 1
+        separator = '{\n'
+
+        for key, value in items:
+            yield f'{separator}{self.indent_str}{json.dumps(key)}: {self.encode(value)}'
+            separator = ',\n'
+
+        self.indentation_level -= 1
+
+        if separator == '{\n':
+            yield '{}'
+
+        else:
+            yield '\n' + self.indent_str + '}'
+
     def primitives_only(self, obj):
         """Returns true if the object doesn't have any container type objects (list, tuple, dict).
         """
-        if isinstance(obj, dict):
+        if isinstance(obj, Mapping):
             obj = obj.values()
 
         return not any(isinstance(element, self.container_types) for element in obj)
@@ -1,13 +1,25 @@
 """Functions that help us generate and use info.json files.
 """
+import hashlib
+import importlib.util
 import json
 from collections.abc import Mapping
+from functools import lru_cache
 from pathlib import Path
 
 import hjson
 import jsonschema
 from milc import cli
 
+from qmk import schema_compiler
+from qmk.constants import BUILD_DIR
+from qmk.parse_cache import cached_parse
+from qmk.path import write_if_changed
+from qmk.profiling import profile_stage
+
+SCHEMA_DIR = Path('data/schemas')
+COMPILED_SCHEMA_DIR = Path(BUILD_DIR) / 'schema_validators'
+
 
 def json_load(json_file):
     """Load a json file from disk.
@@ -22,37 +34,163 @@ def json_load(json_file):
         exit(1)
 
 
+def _is_object(checker, instance):
+    """Accept any mapping, such as a `qmk.layout.Key`, where the schema asks for an object.
+    """
+    return isinstance(instance, Mapping)
+
+
+Validator = jsonschema.validators.extend(jsonschema.Draft7Validator, type_checker=jsonschema.Draft7Validator.TYPE_CHECKER.redefine('object', _is_object))
+
+
 def load_jsonschema(schema_name):
     """Read a jsonschema file from disk.
 
     FIXME(skullydazed/anyone): Refactor to make this a public function.
     """
-    schema_path = Path(f'data/schemas/{schema_name}.jsonschema')
+    schema_path = SCHEMA_DIR / f'{schema_name}.jsonschema'
 
     if not schema_path.exists():
-        schema_path = Path('data/schemas/false.jsonschema')
+        schema_path = SCHEMA_DIR / 'false.jsonschema'
+
+    return cached_parse('json', schema_path, json_load)
+
+
+def _jsonschema_version():
+    """Returns the version of jsonschema, whose error messages the compiled validators copy.
+    """
+    try:
+        from importlib.metadata import version
+
+    except ImportError:
+        # Python 3.7, where jsonschema.__version__ isn't deprecated yet
+        return jsonschema.__version__
+
+    return version('jsonschema')
+
+
+def _schema_hash():
+    """Returns a hash of everything that goes into a compiled validator.
+    """
+    digest = hashlib.sha256(f'{schema_compiler.COMPILER_VERSION}\0{_jsonschema_version()}\0'.encode('utf-8'))
+
+    for schema_file in sorted(SCHEMA_DIR.glob('*.jsonschema')):
+        digest.update(f'{schema_file.name}\0'.encode('utf-8'))
+        digest.update(schema_file.read_bytes())
+
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def compiled_validator(schema_name):
+    """Returns the module of validation functions generated from a jsonschema, or None if the schema can't be compiled.
+
+    The generated code is kept in `.build/schema_validators/` and only regenerated when the schemas, the compiler or jsonschema change.
+    """
+    schema_hash = _schema_hash()
+    schema_names = [schema_name] + sorted(schema_file.stem for schema_file in SCHEMA_DIR.glob('*.jsonschema') if schema_file.stem != schema_name)
+    documents = [load_jsonschema(name) for name in schema_names]
+    source_file = COMPILED_SCHEMA_DIR / f'{schema_name}.py'
+
+    try:
+        source = source_file.read_text(encoding='utf-8')
+
+    except OSError:
+        source = ''
 
-    return json_load(schema_path)
+    if f'SCHEMA_HASH = {schema_hash!r}\n' not in source:
+        try:
+            source = schema_compiler.compile_schema(documents, name=schema_name, schema_hash=schema_hash)
 
+        except schema_compiler.UnsupportedSchemaError as e:
+            cli.log.debug('Using jsonschema to validate against %s: %s', schema_name, e.message)
+            return None
 
+        try:
+            write_if_changed(source_file, source)
+
+            # The bytecode cache only notices changes to the size and mtime of the source, which may not have changed
+            cached_bytecode = Path(importlib.util.cache_from_source(source_file))
+
+            if cached_bytecode.exists():
+                cached_bytecode.unlink()
+
+        except OSError as e:
+            cli.log.debug('Could not write the compiled %s validator: %s', schema_name, e)
+            return None
+
+    spec = importlib.util.spec_from_file_location(f'qmk_schema_validators.{schema_name}', source_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.nodes = schema_compiler.schema_nodes(documents, module.NODE_PATHS)
+
+    return module
+
+
+def _raise_compiled_error(module, error):
+    """Raise the `jsonschema.ValidationError` for an error returned by a compiled validator.
+    """
+    if error:
+        message, path, schema_path, keyword, node, instance = error
+        schema = module.nodes[node]
+        validator_value = schema[keyword] if keyword else None
+
+        raise jsonschema.ValidationError(message, validator=keyword, path=path, schema_path=schema_path, instance=instance, validator_value=validator_value, schema=schema)
+
+
+@lru_cache(maxsize=None)
+def interpreted_validator(schema_name):
+    """Returns a jsonschema validator for a schema, with `$ref`s resolved against the keyboard schema.
+    """
+    resolver = jsonschema.RefResolver.from_schema(load_jsonschema('keyboard'))
+
+    return Validator(load_jsonschema(schema_name), resolver=resolver)
+
+
+@profile_stage
 def keyboard_validate(data):
     """Validates data against the keyboard jsonschema.
     """
-    schema = load_jsonschema('keyboard')
-    validator = jsonschema.Draft7Validator(schema).validate
+    module = compiled_validator('keyboard')
 
-    return validator(data)
+    if not module:
+        return interpreted_validator('keyboard').validate(data)
 
+    _raise_compiled_error(module, module.validate(data))
 
+
+@profile_stage
 def keyboard_api_validate(data):
     """Validates data against the api_keyboard jsonschema.
     """
+    module = compiled_validator('api_keyboard')
+
+    if not module:
+        return interpreted_validator('api_keyboard').validate(data)
+
+    _raise_compiled_error(module, module.validate(data))
+
+
+@lru_cache(maxsize=None)
+def _keyboard_key_validator(key):
+    """Returns a validator for a single top level key of the keyboard jsonschema.
+    """
     base = load_jsonschema('keyboard')
-    relative = load_jsonschema('api_keyboard')
     resolver = jsonschema.RefResolver.from_schema(base)
-    validator = jsonschema.Draft7Validator(relative, resolver=resolver).validate
+    schema = base['properties'].get(key, True)
+
+    return Validator(schema, resolver=resolver).validate
+
+
+def keyboard_validate_key(key, value):
+    """Validates the value of a single top level key against the keyboard jsonschema.
+    """
+    module = compiled_validator('keyboard')
+
+    if not module:
+        return _keyboard_key_validator(key)(value)
 
-    return validator(data)
+    _raise_compiled_error(module, module.validate_property(key, value))
 
 
 def deep_update(origdict, newdict):
@@ -3,12 +3,12 @@
 from array import array
 from math import ceil
 from pathlib import Path
-import os
-from glob import glob
 
-from qmk.c_parse import parse_config_h_file
-from qmk.json_schema import json_load
-from qmk.makefile import parse_rules_mk_file
+from qmk import keyboard_aliases, keyboard_index
+from qmk.c_parse import config_h_layer
+from qmk.layers import stack
+from qmk.makefile import rules_mk_layer
+from qmk.parse_cache import cached_parse, shared_parses
 from qmk.path import is_keyboard, under_qmk_firmware
 
 BOX_DRAWING_CHARACTERS = {
@@ -30,8 +30,6 @@ BOX_DRAWING_CHARACTERS = {
     },
 }
 
-base_path = os.path.join(os.getcwd(), "keyboards") + os.path.sep
-
 
 def find_keyboard_from_dir():
     """Returns a keyboard name based on the user's current directory.
@@ -56,16 +54,8 @@ def keyboard_folder(keyboard):
 
     This checks aliases and DEFAULT_FOLDER to resolve the actual path for a keyboard.
     """
-    aliases = json_load(Path('data/mappings/keyboard_aliases.json'))
-
-    if keyboard in aliases:
-        keyboard = aliases[keyboard].get('target', keyboard)
-
-    rules_mk_file = Path(base_path, keyboard, 'rules.mk')
-
-    if rules_mk_file.exists():
-        rules_mk = parse_rules_mk_file(rules_mk_file)
-        keyboard = rules_mk.get('DEFAULT_FOLDER', keyboard)
+    keyboard = keyboard_aliases.resolve(keyboard)
+    keyboard = keyboard_index.default_folder(keyboard) or keyboard
 
     if not is_keyboard(keyboard):
         raise ValueError(f'Invalid keyboard: {keyboard}')
@@ -73,34 +63,29 @@ def keyboard_folder(keyboard):
     return keyboard
 
 
-def _find_name(path):
-    """Determine the keyboard name by stripping off the base_path and rules.mk.
-    """
-    return path.replace(base_path, "").replace(os.path.sep + "rules.mk", "")
-
-
 def keyboard_completer(prefix, action, parser, parsed_args):
     """Returns a list of keyboards for tab completion.
+
+    Keyboards are completed one folder at a time, like paths, so only the folder being completed has to be checked.
     """
-    return list_keyboards()
+    return keyboard_index.keyboard_completions(prefix)
 
 
 def list_keyboards():
     """Returns a list of all keyboards.
     """
-    # We avoid pathlib here because this is performance critical code.
-    kb_wildcard = os.path.join(base_path, "**", "rules.mk")
-    paths = [path for path in glob(kb_wildcard, recursive=True) if 'keymaps' not in path]
-
-    return sorted(set(map(resolve_keyboard, map(_find_name, paths))))
+    return sorted(set(map(resolve_keyboard, keyboard_index.keyboards())))
 
 
 def resolve_keyboard(keyboard):
-    cur_dir = Path('keyboards')
-    rules = parse_rules_mk_file(cur_dir / keyboard / 'rules.mk')
-    while 'DEFAULT_FOLDER' in rules and keyboard != rules['DEFAULT_FOLDER']:
-        keyboard = rules['DEFAULT_FOLDER']
-        rules = parse_rules_mk_file(cur_dir / keyboard / 'rules.mk')
+    """Follows the chain of `DEFAULT_FOLDER`s from `keyboard` to the keyboard that gets built.
+    """
+    default_folder = keyboard_index.default_folder(keyboard)
+
+    while default_folder and keyboard != default_folder:
+        keyboard = default_folder
+        default_folder = keyboard_index.default_folder(keyboard)
+
     return keyboard
 
 
@@ -111,17 +96,27 @@ def config_h(keyboard):
         keyboard: name of the keyboard
 
     Returns:
-        a dictionary representing the content of the entire config.h tree for a keyboard
+        a `qmk.layers.Layers` representing the content of the entire config.h tree for a keyboard
     """
-    config = {}
+    layers = []
     cur_dir = Path('keyboards')
     keyboard = Path(resolve_keyboard(keyboard))
 
     for dir in keyboard.parts:
         cur_dir = cur_dir / dir
-        config = {**config, **parse_config_h_file(cur_dir / 'config.h')}
+        layers.append(config_h_layer(cur_dir / 'config.h'))
+
+    return stack(layers)
+
 
-    return config
+def config_h_many(keyboards):
+    """Parses the config.h files for many keyboards, only parsing files they share once.
+
+    Returns:
+        a dictionary of keyboard name to the content of its config.h tree
+    """
+    with shared_parses():
+        return {keyboard: config_h(keyboard) for keyboard in keyboards}
 
 
 def rules_mk(keyboard):
@@ -131,17 +126,28 @@ def rules_mk(keyboard):
         keyboard: name of the keyboard
 
     Returns:
-        a dictionary representing the content of the entire rules.mk tree for a keyboard
+        a `qmk.layers.Layers` representing the content of the entire rules.mk tree for a keyboard
     """
+    layers = []
     cur_dir = Path('keyboards')
     keyboard = Path(resolve_keyboard(keyboard))
-    rules = parse_rules_mk_file(cur_dir / keyboard / 'rules.mk')
 
-    for i, dir in enumerate(keyboard.parts):
+    for dir in keyboard.parts:
         cur_dir = cur_dir / dir
-        rules = parse_rules_mk_file(cur_dir / 'rules.mk', rules)
+        layers.append(cached_parse('rules.mk layer', cur_dir / 'rules.mk', lambda file: rules_mk_layer(file, stack(layers))))
+
+    # List the names the keyboard's own rules.mk sets first, so dictionaries built from the result, such as `features`, keep the order they always had
+    return stack(layers, leaf_first=True)
+
 
-    return rules
+def rules_mk_many(keyboards):
+    """Get the rules.mk for many keyboards, only parsing files they share once.
+
+    Returns:
+        a dictionary of keyboard name to the content of its rules.mk tree
+    """
+    with shared_parses():
+        return {keyboard: rules_mk(keyboard) for keyboard in keyboards}
 
 
 def render_layout(layout_data, render_ascii, key_labels=None):
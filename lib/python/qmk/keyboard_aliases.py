@@ -0,0 +1,114 @@
+"""A compiled index of `data/mappings/keyboard_aliases.json`.
+
+The hjson file is only parsed when it changes. The compiled index is saved to `.build/keyboard_aliases.json` along with the SHA-256 of the file it was built from, and loaded once per process. After that resolving an alias is a dictionary lookup.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+from milc import cli
+
+from qmk.constants import BUILD_DIR
+from qmk.json_schema import json_load
+from qmk.path import write_if_changed
+
+# Bump this when the format of the compiled index changes
+INDEX_VERSION = 1
+ALIASES_FILE = Path('data/mappings/keyboard_aliases.json')
+INDEX_FILE = Path(BUILD_DIR) / 'keyboard_aliases.json'
+
+_index = None
+
+
+def compile_aliases(aliases, sha256=None):
+    """Returns the index for a dictionary of aliases in the format of `keyboard_aliases.json`.
+
+    The index has:
+
+        aliases: the aliases exactly as they appear in the file
+        targets: alias -> the keyboard it points to, for aliases with a `target`
+        layouts: alias -> old layout name -> new layout name
+        previous_names: keyboard -> every alias that eventually resolves to it
+    """
+    targets = {alias: data['target'] for alias, data in aliases.items() if 'target' in data}
+    layouts = {alias: dict(data['layouts']) for alias, data in aliases.items() if 'layouts' in data}
+    previous_names = {}
+
+    for alias in targets:
+        target = alias
+        seen = set()
+
+        # Follow chains of renames, guarding against loops
+        while target in targets and target not in seen:
+            seen.add(target)
+            target = targets[target]
+
+        previous_names.setdefault(target, []).append(alias)
+
+    return {
+        'version': INDEX_VERSION,
+        'sha256': sha256,
+        'aliases': aliases,
+        'targets': targets,
+        'layouts': layouts,
+        'previous_names': {keyboard: sorted(names) for keyboard, names in sorted(previous_names.items())},
+    }
+
+
+def _load_saved_index(sha256):
+    """Returns the saved index if it was built from a file with `sha256`, otherwise None.
+    """
+    try:
+        index = json.loads(INDEX_FILE.read_text(encoding='utf-8'))
+
+    except (OSError, ValueError):
+        return None
+
+    if index.get('version') != INDEX_VERSION or index.get('sha256') != sha256:
+        return None
+
+    return index
+
+
+def index():
+    """Returns the compiled alias index, building and saving it if `keyboard_aliases.json` has changed.
+    """
+    global _index
+
+    if _index is None:
+        sha256 = hashlib.sha256(ALIASES_FILE.read_bytes()).hexdigest()
+        _index = _load_saved_index(sha256)
+
+        if _index is None:
+            _index = compile_aliases(json_load(ALIASES_FILE), sha256)
+
+            try:
+                write_if_changed(INDEX_FILE, json.dumps(_index))
+            except OSError as e:
+                cli.log.debug('Could not write the keyboard alias index: %s', e)
+
+    return _index
+
+
+def aliases():
+    """Returns the contents of `keyboard_aliases.json`.
+    """
+    return index()['aliases']
+
+
+def resolve(keyboard):
+    """Returns the keyboard an alias points to, or `keyboard` if it isn't an alias.
+    """
+    return index()['targets'].get(keyboard, keyboard)
+
+
+def resolve_layout(keyboard, layout):
+    """Returns the new name of a layout that was renamed along with the aliased `keyboard`, or `layout` if it wasn't.
+    """
+    return index()['layouts'].get(keyboard, {}).get(layout, layout)
+
+
+def previous_names(keyboard):
+    """Returns every alias that resolves to `keyboard`.
+    """
+    return index()['previous_names'].get(keyboard, [])
@@ -0,0 +1,448 @@
+"""An index of the directories in `keyboards/`, `layouts/community/` and `layouts/default/`.
+
+Each directory is stored in `.build/keyboard_index.sqlite` with its mtime, its subdirectories, the files in it that tell keyboards and keymaps apart, and the `DEFAULT_FOLDER` of its rules.mk. Adding, removing or renaming anything in a directory changes its mtime, so a directory only has to be scanned again when its mtime, or the mtime of its rules.mk, has changed.
+
+A lookup only checks the directories it walks through, so asking about one keyboard costs a few stat calls, while `keyboards()` checks the whole tree. Each directory is only checked once per process.
+"""
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from milc import cli
+
+from qmk.constants import BUILD_DIR
+from qmk.makefile import parse_rules_mk_file
+
+# Bump this when the layout of the database changes
+INDEX_VERSION = 1
+DATABASE_FILE = Path(BUILD_DIR) / 'keyboard_index.sqlite'
+ROOTS = ('keyboards', 'layouts/community', 'layouts/default')
+
+# Files that are recorded for each directory, along with every header
+INDEXED_FILES = frozenset(('rules.mk', 'info.json', 'config.h', 'keymap.c', 'keymap.json'))
+
+# An mtime this close to the time of a scan could hide a later change in the same tick
+RACY_SECONDS = 2
+
+Directory = namedtuple('Directory', ('mtime', 'rules_mk', 'default_folder', 'subdirs', 'files'))
+
+_db = None
+_directories = {}
+_checked = set()
+_lookups = {}
+_tree_checked = False
+
+
+def _indexed(filename):
+    """Returns True for the files the index records.
+    """
+    return filename in INDEXED_FILES or filename.endswith('.h')
+
+
+def file_signature(path):
+    """Returns the size and mtime of a file, or None if it doesn't exist.
+    """
+    try:
+        stat = os.stat(path)
+
+    except OSError:
+        return None
+
+    return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+
+def _connect():
+    """Returns the database, opening it the first time.
+
+    The index still works in memory if the database can't be opened or written to.
+    """
+    global _db
+
+    if _db is None:
+        try:
+            DATABASE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            _db = sqlite3.connect(DATABASE_FILE, timeout=10)
+
+            if _db.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+                _db.executescript(
+                    f'''
+                    DROP TABLE IF EXISTS directories;
+                    CREATE TABLE directories (path TEXT PRIMARY KEY, mtime INTEGER, rules_mk TEXT, default_folder TEXT, subdirs TEXT NOT NULL, files TEXT NOT NULL);
+                    PRAGMA user_version = {INDEX_VERSION};
+                    '''
+                )
+
+        except sqlite3.Error as e:
+            cli.log.debug('Could not open the keyboard index: %s', e)
+            _db = False
+
+    return _db
+
+
+def _row_to_directory(mtime, rules_mk, default_folder, subdirs, files):
+    """Returns a `Directory` for a row of the database.
+    """
+    return Directory(mtime, rules_mk, default_folder, tuple(subdirs.split('/')) if subdirs else (), frozenset(files.split('/')) if files else frozenset())
+
+
+def _load(path):
+    """Returns the stored `Directory` for `path`, or None if it isn't in the database.
+    """
+    if path not in _directories:
+        db = _connect()
+        row = None
+
+        if db:
+            try:
+                row = db.execute('SELECT mtime, rules_mk, default_folder, subdirs, files FROM directories WHERE path = ?', (path,)).fetchone()
+
+            except sqlite3.Error as e:
+                cli.log.debug('Could not read the keyboard index: %s', e)
+
+        _directories[path] = _row_to_directory(*row) if row else None
+
+    return _directories[path]
+
+
+def _load_children(path, entry):
+    """Load the stored directories inside `path` with one query, ahead of them being checked one by one.
+    """
+    db = _connect()
+    paths = [f'{path}/{subdir}' for subdir in entry.subdirs if f'{path}/{subdir}' not in _directories]
+
+    if db and paths:
+        try:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                query = f'SELECT path, mtime, rules_mk, default_folder, subdirs, files FROM directories WHERE path IN ({", ".join("?" * len(chunk))})'
+
+                for child, *row in db.execute(query, chunk):
+                    _directories[child] = _row_to_directory(*row)
+
+        except sqlite3.Error as e:
+            cli.log.debug('Could not read the keyboard index: %s', e)
+
+    for child in paths:
+        _directories.setdefault(child, None)
+
+
+def _load_all():
+    """Load every stored directory into memory.
+    """
+    db = _connect()
+
+    if db:
+        try:
+            for path, *row in db.execute('SELECT path, mtime, rules_mk, default_folder, subdirs, files FROM directories'):
+                _directories.setdefault(path, _row_to_directory(*row))
+
+        except sqlite3.Error as e:
+            cli.log.debug('Could not read the keyboard index: %s', e)
+
+
+def _save(changed, removed):
+    """Write changed directories to the database, and remove the ones that are gone.
+    """
+    db = _connect()
+
+    if not db or not (changed or removed):
+        return
+
+    try:
+        with db:
+            for path in removed:
+                db.execute("DELETE FROM directories WHERE path = ? OR path LIKE ? ESCAPE '\\'", (path, path.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '/%'))
+
+            db.executemany(
+                'INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?, ?)',
+                ((path, entry.mtime, entry.rules_mk, entry.default_folder, '/'.join(entry.subdirs), '/'.join(sorted(entry.files))) for path, entry in changed.items() if entry),
+            )
+
+    except sqlite3.Error as e:
+        cli.log.debug('Could not update the keyboard index: %s', e)
+
+
+def _scan(path, changed, removed):
+    """Read a directory from disk, along with any subdirectories that are new to the index.
+    """
+    started = time.time_ns()
+
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        subdirs = []
+        files = set()
+
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+
+                elif _indexed(entry.name):
+                    files.add(entry.name)
+
+    except OSError:
+        _forget(path, removed)
+        return None
+
+    rules_mk = default_folder = None
+    racy = mtime >= started - RACY_SECONDS * 1000000000
+
+    if 'rules.mk' in files:
+        rules_mk = file_signature(f'{path}/rules.mk')
+        default_folder = parse_rules_mk_file(Path(path, 'rules.mk')).get('DEFAULT_FOLDER')
+        racy = racy or (rules_mk and int(rules_mk.split(':')[1]) >= started - RACY_SECONDS * 1000000000)
+
+    if racy:
+        # Check it again next time
+        mtime = None
+
+    previous = _directories.get(path)
+    directory = Directory(mtime, rules_mk, default_folder, tuple(sorted(subdirs)), frozenset(files))
+    _directories[path] = changed[path] = directory
+    _checked.add(path)
+
+    for subdir in set(previous.subdirs if previous else ()) - set(subdirs):
+        _forget(f'{path}/{subdir}', removed)
+
+    for subdir in directory.subdirs:
+        if _load(f'{path}/{subdir}') is None:
+            _scan(f'{path}/{subdir}', changed, removed)
+
+    return directory
+
+
+def _forget(path, removed):
+    """Drop a directory, and everything below it, from the index.
+    """
+    prefix = path + '/'
+
+    for known in [known for known in _directories if known == path or known.startswith(prefix)]:
+        _directories[known] = None
+        _checked.discard(known)
+
+    removed.add(path)
+
+
+def _check(path, changed, removed):
+    """Returns the up to date `Directory` for `path`, scanning it if it has changed since it was stored.
+    """
+    directory = _load(path)
+
+    if path in _checked:
+        return directory
+
+    try:
+        mtime = os.stat(path).st_mtime_ns
+
+    except OSError:
+        if directory:
+            _forget(path, removed)
+
+        _checked.add(path)
+        return None
+
+    if directory and directory.mtime == mtime and (not directory.rules_mk or directory.rules_mk == file_signature(f'{path}/rules.mk')):
+        _checked.add(path)
+        return directory
+
+    return _scan(path, changed, removed)
+
+
+def directory(path):
+    """Returns the `Directory` for `path`, or None if it doesn't exist.
+
+    Args:
+        path: a directory inside one of `ROOTS`, relative to the root of qmk_firmware
+    """
+    path = os.fspath(path).replace(os.sep, '/')
+
+    if path not in _lookups:
+        parts = [part for part in path.split('/') if part not in ('', '.')]
+        root = next((root for root in ROOTS if parts[:root.count('/') + 1] == root.split('/')), None)
+
+        if root is None or path.startswith('/') or '..' in parts:
+            raise ValueError(f'{path} is not inside {" or ".join(ROOTS)}')
+
+        changed = {}
+        removed = set()
+        current = root
+        entry = _check(current, changed, removed)
+
+        for part in parts[root.count('/') + 1:]:
+            if not entry or part not in entry.subdirs:
+                entry = None
+                break
+
+            current = f'{current}/{part}'
+            entry = _check(current, changed, removed)
+
+        _save(changed, removed)
+        _lookups[path] = entry
+
+    return _lookups[path]
+
+
+def is_file(path):
+    """Returns True if `path` is a file.
+
+    Files outside of `ROOTS`, and files the index doesn't record, are looked up on disk.
+    """
+    path = Path(path)
+
+    if _indexed(path.name):
+        try:
+            return path.name in files(path.parent)
+
+        except ValueError:
+            pass
+
+    return path.is_file()
+
+
+def is_keyboard(keyboard):
+    """Returns True if `keyboards/<keyboard>` has a rules.mk.
+    """
+    try:
+        entry = directory(Path('keyboards', keyboard))
+
+    except ValueError:
+        return Path('keyboards', keyboard, 'rules.mk').exists()
+
+    return bool(entry and 'rules.mk' in entry.files)
+
+
+def default_folder(keyboard):
+    """Returns the `DEFAULT_FOLDER` set in a keyboard's own rules.mk, or None.
+    """
+    try:
+        entry = directory(Path('keyboards', keyboard))
+
+    except ValueError:
+        rules_mk_file = Path('keyboards', keyboard, 'rules.mk')
+        return parse_rules_mk_file(rules_mk_file).get('DEFAULT_FOLDER') if rules_mk_file.exists() else None
+
+    return entry.default_folder if entry else None
+
+
+def subdirectories(path):
+    """Returns the names of the directories inside `path`, or an empty tuple if it doesn't exist.
+
+    The stored entries for them are loaded as well, as callers usually look inside each one next.
+    """
+    entry = directory(path)
+
+    if not entry:
+        return ()
+
+    _load_children(os.fspath(path).replace(os.sep, '/').rstrip('/'), entry)
+
+    return entry.subdirs
+
+
+def files(path):
+    """Returns the names of the files the index records inside `path`, or an empty set if it doesn't exist.
+    """
+    entry = directory(path)
+
+    return entry.files if entry else frozenset()
+
+
+def keyboard_completions(prefix):
+    """Returns the keyboards and folders of keyboards in the folder `prefix` is in that start with `prefix`.
+
+    Only that folder and the directories directly inside it are checked. Folders end with a `/`, and are included when the index has a keyboard somewhere below them, so deeper changes are only picked up once completion reaches them.
+    """
+    parent, _, partial = prefix.rpartition('/')
+    base = f'keyboards/{parent}' if parent else 'keyboards'
+
+    try:
+        directory(base)
+
+    except ValueError:
+        return []
+
+    completions = []
+
+    for subdir in subdirectories(base):
+        if subdir == 'keymaps' or not subdir.startswith(partial):
+            continue
+
+        name = f'{parent}/{subdir}' if parent else subdir
+        child = directory(f'{base}/{subdir}')
+
+        if child and 'rules.mk' in child.files:
+            completions.append(name)
+
+        if child and _has_keyboards(f'{base}/{subdir}'):
+            completions.append(name + '/')
+
+    return completions
+
+
+def _has_keyboards(path):
+    """Returns True if a directory below `path` has a rules.mk, going by the index without checking the disk.
+    """
+    db = _connect()
+
+    if db:
+        try:
+            # Every path below `path` sorts between `path/` and `path0`
+            query = "SELECT 1 FROM directories WHERE path > ? AND path < ? AND rules_mk IS NOT NULL AND instr(substr(path, ?), '/keymaps/') = 0 AND substr(path, -8) != '/keymaps' LIMIT 1"
+            return db.execute(query, (path + '/', path + '0', len(path) + 1)).fetchone() is not None
+
+        except sqlite3.Error as e:
+            cli.log.debug('Could not read the keyboard index: %s', e)
+
+    pending = [path]
+
+    while pending:
+        current = pending.pop()
+        entry = _load(current)
+
+        if entry:
+            if current != path and 'rules.mk' in entry.files:
+                return True
+
+            pending.extend(f'{current}/{subdir}' for subdir in entry.subdirs if subdir != 'keymaps')
+
+    return False
+
+
+def keyboards():
+    """Returns every directory in `keyboards/` that has a rules.mk and isn't part of a keymap, after checking the whole tree.
+    """
+    global _tree_checked
+
+    changed = {}
+    removed = set()
+
+    if not _tree_checked:
+        _load_all()
+        pending = list(ROOTS)
+
+        while pending:
+            path = pending.pop()
+            entry = _check(path, changed, removed)
+
+            if entry:
+                pending.extend(f'{path}/{subdir}' for subdir in entry.subdirs)
+
+        _save(changed, removed)
+        _tree_checked = True
+
+    found = []
+    pending = ['keyboards']
+
+    while pending:
+        path = pending.pop()
+        entry = _directories.get(path)
+
+        if entry:
+            if 'rules.mk' in entry.files and path != 'keyboards':
+                found.append(path[len('keyboards/'):])
+
+            pending.extend(f'{path}/{subdir}' for subdir in entry.subdirs if subdir != 'keymaps')
+
+    return found
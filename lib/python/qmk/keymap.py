@@ -13,6 +13,7 @@ from pygments import lex
 
 import qmk.path
 import qmk.commands
+from qmk import keyboard_index
 from qmk.keyboard import find_keyboard_from_dir, rules_mk
 
 # The `keymap.c` template to use when a keyboard doesn't have its own
@@ -107,13 +108,10 @@ def keymap_completer(prefix, action, parser, parsed_args):
     """Returns a list of keymaps for tab completion.
     """
     try:
-        if parsed_args.keyboard:
-            return list_keymaps(parsed_args.keyboard)
-
-        keyboard = find_keyboard_from_dir()
+        keyboard = parsed_args.keyboard or find_keyboard_from_dir()
 
         if keyboard:
-            return list_keymaps(keyboard)
+            return list_keymaps(keyboard, prefix=prefix)
 
     except Exception as e:
         argcomplete.warn(f'Error: {e.__class__.__name__}: {str(e)}')
@@ -147,10 +145,10 @@ def is_keymap_dir(keymap, c=True, json=True, additional_files=None):
         files.append('keymap.json')
 
     for file in files:
-        if (keymap / file).is_file():
+        if keyboard_index.is_file(keymap / file):
             if additional_files:
                 for file in additional_files:
-                    if not (keymap / file).is_file():
+                    if not keyboard_index.is_file(keymap / file):
                         return False
 
             return True
@@ -284,9 +282,9 @@ def locate_keymap(keyboard, keymap):
 
         keymap_dir = Path('keyboards') / checked_dirs / 'keymaps'
 
-        if (keymap_dir / keymap / 'keymap.c').exists():
+        if keyboard_index.is_file(keymap_dir / keymap / 'keymap.c'):
             keymap_path = keymap_dir / keymap / 'keymap.c'
-        if (keymap_dir / keymap / 'keymap.json').exists():
+        if keyboard_index.is_file(keymap_dir / keymap / 'keymap.json'):
             keymap_path = keymap_dir / keymap / 'keymap.json'
 
     if keymap_path:
@@ -298,14 +296,13 @@ def locate_keymap(keyboard, keymap):
     if "LAYOUTS" in rules:
         for layout in rules["LAYOUTS"].split():
             community_layout = Path('layouts/community') / layout / keymap
-            if community_layout.exists():
-                if (community_layout / 'keymap.json').exists():
-                    return community_layout / 'keymap.json'
-                if (community_layout / 'keymap.c').exists():
-                    return community_layout / 'keymap.c'
+            if keyboard_index.is_file(community_layout / 'keymap.json'):
+                return community_layout / 'keymap.json'
+            if keyboard_index.is_file(community_layout / 'keymap.c'):
+                return community_layout / 'keymap.c'
 
 
-def list_keymaps(keyboard, c=True, json=True, additional_files=None, fullpath=False):
+def list_keymaps(keyboard, c=True, json=True, additional_files=None, fullpath=False, prefix=''):
     """List the available keymaps for a keyboard.
 
     Args:
@@ -324,6 +321,9 @@ def list_keymaps(keyboard, c=True, json=True, additional_files=None, fullpath=Fa
         fullpath
             When set to True the full path of the keymap relative to the `qmk_firmware` root will be provided.
 
+        prefix
+            Only include keymaps whose name starts with `prefix`. Other keymap directories aren't checked at all.
+
     Returns:
         a sorted list of valid keymap names.
     """
@@ -332,31 +332,25 @@ def list_keymaps(keyboard, c=True, json=True, additional_files=None, fullpath=Fa
     names = set()
 
     if rules:
+        keymaps_dirs = []
         keyboards_dir = Path('keyboards')
         kb_path = keyboards_dir / keyboard
 
         # walk up the directory tree until keyboards_dir
         # and collect all directories' name with keymap.c file in it
         while kb_path != keyboards_dir:
-            keymaps_dir = kb_path / "keymaps"
-
-            if keymaps_dir.is_dir():
-                for keymap in keymaps_dir.iterdir():
-                    if is_keymap_dir(keymap, c, json, additional_files):
-                        keymap = keymap if fullpath else keymap.name
-                        names.add(keymap)
-
+            keymaps_dirs.append(kb_path / "keymaps")
             kb_path = kb_path.parent
 
         # if community layouts are supported, get them
         if "LAYOUTS" in rules:
             for layout in rules["LAYOUTS"].split():
-                cl_path = Path('layouts/community') / layout
-                if cl_path.is_dir():
-                    for keymap in cl_path.iterdir():
-                        if is_keymap_dir(keymap, c, json, additional_files):
-                            keymap = keymap if fullpath else keymap.name
-                            names.add(keymap)
+                keymaps_dirs.append(Path('layouts/community') / layout)
+
+        for keymaps_dir in keymaps_dirs:
+            for keymap in keyboard_index.subdirectories(keymaps_dir):
+                if keymap.startswith(prefix) and is_keymap_dir(keymaps_dir / keymap, c, json, additional_files):
+                    names.add(keymaps_dir / keymap if fullpath else keymap)
 
     return sorted(names)
 
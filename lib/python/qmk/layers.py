@@ -0,0 +1,94 @@
+"""Layered settings, such as the config.h and rules.mk trees of a keyboard.
+
+Each file becomes an immutable layer mapping the names it sets to a `Setting`, which records the file and line the value came from. A keyboard's settings are a `Layers` view over the layers of every file from `keyboards/` down to the keyboard, so sibling keyboards share their parents' layers instead of each building a copy of them.
+"""
+from collections import ChainMap, namedtuple
+from types import MappingProxyType
+
+Setting = namedtuple('Setting', ('value', 'file', 'line'))
+
+# Marks a name that was deleted from the private layer of a `Layers`
+_deleted = Setting(None, None, None)
+
+
+class Layers(ChainMap):
+    """A view over a stack of layers of `Setting`s, the later layers win.
+
+    Reading a name returns its value, use `source()` or `explain()` to find out where it came from. Writes and deletes go to a private layer on top, so the shared layers are never changed.
+
+    Names are listed in the order they were first set, from the first layer to the last. With `leaf_first` the names set by the last layer come first.
+    """
+    def __init__(self, *maps, leaf_first=False):
+        super().__init__(*maps)
+        self.leaf_first = leaf_first
+
+    def __getitem__(self, key):
+        return self.source(key).value
+
+    def __setitem__(self, key, value):
+        self.maps[0][key] = Setting(value, None, None)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+
+        self.maps[0][key] = _deleted
+
+    def __contains__(self, key):
+        for layer in self.maps:
+            if key in layer:
+                return layer[key] is not _deleted
+
+        return False
+
+    def __iter__(self):
+        keys = dict.fromkeys(self.maps[1]) if self.leaf_first and len(self.maps) > 1 else {}
+
+        for layer in reversed(self.maps):
+            keys.update(dict.fromkeys(layer))
+
+        return (key for key in keys if key in self)
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def copy(self):
+        return self.__class__(self.maps[0].copy(), *self.maps[1:], leaf_first=self.leaf_first)
+
+    __copy__ = copy
+
+    def source(self, key):
+        """Returns the `Setting` that `key`'s value comes from.
+        """
+        setting = super().__getitem__(key)
+
+        if setting is _deleted:
+            raise KeyError(key)
+
+        return setting
+
+    def explain(self, key):
+        """Returns every `Setting` of `key`, starting with the one that wins.
+        """
+        settings = []
+
+        for layer in self.maps:
+            if key in layer:
+                if layer[key] is _deleted:
+                    break
+
+                settings.append(layer[key])
+
+        return settings
+
+
+def layer(settings):
+    """Returns an immutable layer for a dictionary of name -> `Setting`.
+    """
+    return MappingProxyType(settings)
+
+
+def stack(layers, leaf_first=False):
+    """Returns a `Layers` view over a list of layers, ordered from the first to the last file read.
+    """
+    return Layers({}, *reversed(layers), leaf_first=leaf_first)
@@ -0,0 +1,159 @@
+"""Compact types for the keys in a keyboard layout.
+
+A full `generate-api` run holds the layouts of every keyboard in memory at once, which adds up to hundreds of thousands of keys. `Key` keeps each key's properties in slots instead of a per-key dictionary, while still behaving like the dictionary it replaces so existing code and the JSON encoders don't need to know the difference.
+"""
+from collections.abc import Mapping, MutableMapping
+from copy import deepcopy
+
+
+class Key(MutableMapping):
+    """A single key in a layout.
+
+    The properties the keyboard schema allows for a key are stored in slots. A property set to None is treated as missing, so iterating, comparing and serializing a Key gives the same result as the equivalent dictionary, in the same order. Anything else is kept in a small dictionary that is only created when needed.
+
+    The order keys were added in is kept in `_order`. Keys built the same way share the same tuple.
+    """
+    properties = ('x', 'y', 'w', 'h', 'r', 'rx', 'ry', 'label', 'matrix')
+    __slots__ = properties + ('_extra', '_order')
+
+    def __init__(self, *args, **kwargs):
+        self.x = self.y = self.w = self.h = self.r = self.rx = self.ry = self.label = self.matrix = None
+        self._extra = None
+        self._order = ()
+
+        if args or kwargs:
+            self.update(*args, **kwargs)
+
+    def __getitem__(self, key):
+        if key in _properties:
+            value = getattr(self, key)
+
+            if value is not None:
+                return value
+
+        elif self._extra and key in self._extra:
+            return self._extra[key]
+
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _properties:
+            if value is None:
+                self._forget(key)
+
+            elif getattr(self, key) is None:
+                self._order = _intern_order(self._order + (key,))
+
+            setattr(self, key, value)
+
+        else:
+            if self._extra is None:
+                self._extra = {}
+
+            if key not in self._extra:
+                self._order = _intern_order(self._order + (key,))
+
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _properties and getattr(self, key) is not None:
+            setattr(self, key, None)
+
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+
+        else:
+            raise KeyError(key)
+
+        self._forget(key)
+
+    def __contains__(self, key):
+        if key in _properties:
+            return getattr(self, key) is not None
+
+        return bool(self._extra) and key in self._extra
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __repr__(self):
+        return f'Key({dict(self)!r})'
+
+    def __copy__(self):
+        return Key(self)
+
+    def __deepcopy__(self, memo):
+        key = Key(self)
+
+        if self.matrix is not None:
+            key.matrix = list(self.matrix)
+
+        if self._extra:
+            key._extra = deepcopy(self._extra, memo)
+
+        return key
+
+    def __getstate__(self):
+        return dict(self)
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def get(self, key, default=None):
+        if key in _properties:
+            value = getattr(self, key)
+
+            return default if value is None else value
+
+        if self._extra:
+            return self._extra.get(key, default)
+
+        return default
+
+    def copy(self):
+        """Returns a shallow copy of this key.
+        """
+        return Key(self)
+
+    def _forget(self, key):
+        """Remove `key` from the order keys were added in.
+        """
+        if key in self._order:
+            self._order = _intern_order(tuple(name for name in self._order if name != key))
+
+
+_properties = frozenset(Key.properties)
+_orders = {}
+
+
+def _intern_order(order):
+    """Returns a shared copy of `order`, so keys built the same way don't each hold their own tuple.
+    """
+    return _orders.setdefault(order, order)
+
+
+class Layout(list):
+    """The keys of a layout, in order.
+
+    This is a plain list that only ever holds `Key` objects.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, keys):
+        """Returns a Layout built from a list of key dictionaries, reusing any that are already a `Key`.
+        """
+        return cls(key if isinstance(key, Key) else Key(key) for key in keys)
+
+
+def compact_layouts(info_data):
+    """Convert every layout in an info.json dictionary to a `Layout` of `Key` objects, in place.
+    """
+    for layout in info_data.get('layouts', {}).values():
+        if isinstance(layout, Mapping) and 'layout' in layout and not isinstance(layout['layout'], Layout):
+            layout['layout'] = Layout.from_json(layout['layout'])
+
+    return info_data
@@ -2,6 +2,9 @@
 """
 from pathlib import Path
 
+from qmk.layers import Setting, layer
+from qmk.parse_cache import cached_parse
+
 
 def parse_rules_mk_file(file, rules_mk=None):
     """Turn a rules.mk file into a dictionary.
@@ -16,11 +19,57 @@ def parse_rules_mk_file(file, rules_mk=None):
     if not rules_mk:
         rules_mk = {}
 
+    for operator, key, value, line in cached_parse('rules.mk', file, _rules_mk_assignments):
+        # Append
+        if operator == '+=':
+            if key not in rules_mk:
+                rules_mk[key] = value
+            else:
+                rules_mk[key] += ' ' + value
+        # Set if absent
+        elif operator == '?=':
+            if key not in rules_mk:
+                rules_mk[key] = value
+        else:
+            rules_mk[key] = value
+
+    return rules_mk
+
+
+def rules_mk_layer(file, parent):
+    """Returns the layer of settings a rules.mk file adds on top of the files read before it.
+
+    Args:
+        file: path to the rules.mk file
+        parent: a `qmk.layers.Layers` of the rules.mk files read before this one
+
+    Returns:
+        an immutable mapping of each variable the file sets to a `qmk.layers.Setting`
+    """
+    settings = {}
+
+    for operator, key, value, line in cached_parse('rules.mk', file, _rules_mk_assignments):
+        current = settings.get(key) or (parent.source(key) if key in parent else None)
+
+        if operator == '+=' and current:
+            settings[key] = Setting(current.value + ' ' + value, str(file), line)
+
+        elif operator != '?=' or not current:
+            settings[key] = Setting(value, str(file), line)
+
+    return layer(settings)
+
+
+def _rules_mk_assignments(file):
+    """Returns the variable assignments in a rules.mk file as a tuple of (operator, key, value, line).
+    """
+    assignments = []
     file = Path(file)
+
     if file.exists():
         rules_mk_lines = file.read_text().split("\n")
 
-        for line in rules_mk_lines:
+        for line_number, line in enumerate(rules_mk_lines, 1):
             # Filter out comments
             if line.strip().startswith("#"):
                 continue
@@ -30,22 +79,49 @@ def parse_rules_mk_file(file, rules_mk=None):
                 line = line[:line.index('#')].strip()
 
             if '=' in line:
-                # Append
                 if '+=' in line:
                     key, value = line.split('+=', 1)
-                    if key.strip() not in rules_mk:
-                        rules_mk[key.strip()] = value.strip()
-                    else:
-                        rules_mk[key.strip()] += ' ' + value.strip()
-                # Set if absent
+                    assignments.append(('+=', key.strip(), value.strip(), line_number))
                 elif "?=" in line:
                     key, value = line.split('?=', 1)
-                    if key.strip() not in rules_mk:
-                        rules_mk[key.strip()] = value.strip()
+                    assignments.append(('?=', key.strip(), value.strip(), line_number))
                 else:
                     if ":=" in line:
                         line.replace(":", "")
                     key, value = line.split('=', 1)
-                    rules_mk[key.strip()] = value.strip()
+                    assignments.append(('=', key.strip(), value.strip(), line_number))
 
-    return rules_mk
+    return tuple(assignments)
+
+
+def _escape_make_path(path):
+    """Escape a path for use in a make rule.
+    """
+    return str(path).replace('\\', '/').replace(' ', '\\ ').replace('#', '\\#').replace('$', '$$')
+
+
+def write_depfile(depfile, targets, dependencies):
+    """Write a make compatible dependency file.
+
+    The depfile is listed as a target along with `targets`. It is rewritten every time, while generated files are only written when their content changes, so make should depend on the depfile as a stamp. Otherwise a generated file whose content didn't change stays older than its inputs and is regenerated on every build.
+
+    Every dependency also gets an empty rule, the same as `gcc -MP`, so make won't fail when one of them is deleted.
+
+    Args:
+        depfile: path to the dependency file to write
+        targets: the files that were generated
+        dependencies: the files and directories that were read to generate `targets`
+    """
+    depfile = Path(depfile)
+    targets = ' '.join(map(_escape_make_path, [depfile, *targets]))
+    dependencies = [_escape_make_path(dependency) for dependency in dependencies]
+    depfile_lines = [f'{targets}: \\']
+
+    depfile_lines.extend(f'\t{dependency} \\' for dependency in dependencies)
+    depfile_lines.append('')
+
+    for dependency in dependencies:
+        depfile_lines.append(f'{dependency}:')
+
+    depfile.parent.mkdir(parents=True, exist_ok=True)
+    depfile.write_text('\n'.join(depfile_lines) + '\n')
@@ -0,0 +1,216 @@
+"""Compiled converters for the mappings in `data/mappings/`.
+
+`info_config.json` and `info_rules.json` describe how `config.h` and `rules.mk` values map to `info.json` keys. Each mapping file is loaded once per process and every entry is compiled into a `MappingEntry` with a getter and setter for its dotted `info_key` and converters for both directions:
+
+    parse(text): turns a `config.h`/`rules.mk` value into an `info.json` value
+    format(value): turns an `info.json` value into the lines of `config.h`/`rules.mk` that set it
+"""
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+
+from qmk.json_schema import json_load
+
+true_values = ['1', 'on', 'yes']
+
+MappingEntry = namedtuple('MappingEntry', ('key', 'info_key', 'path', 'value_type', 'to_json', 'to_c', 'warn_duplicate', 'get', 'set', 'parse', 'format'))
+
+
+def _compile_getter(path):
+    """Returns a function that reads a dotted path from a dictionary, raising KeyError if it's missing.
+    """
+    if len(path) == 1:
+        key = path[0]
+
+        def get_value(data):
+            return data[key]
+
+    else:
+
+        def get_value(data):
+            for key in path:
+                data = data[key]
+
+            return data
+
+    return get_value
+
+
+def _compile_setter(path):
+    """Returns a function that writes a dotted path into a dictionary, creating parent dictionaries as needed.
+    """
+    if len(path) == 1:
+        key = path[0]
+
+        def set_value(data, value):
+            data[key] = value
+
+    else:
+        parents, key = path[:-1], path[-1]
+
+        def set_value(data, value):
+            for parent in parents:
+                data = data.setdefault(parent, {})
+
+            data[key] = value
+
+    return set_value
+
+
+def _compile_parser(value_type):
+    """Returns a function that turns a `config.h` or `rules.mk` value into an `info.json` value.
+    """
+    if value_type.startswith('array'):
+        array_type = value_type.split('.', 1)[1] if '.' in value_type else None
+
+        def parse_value(value):
+            value = value.replace('{', '').replace('}', '').strip()
+
+            if array_type == 'int':
+                return list(map(int, value.split(',')))
+
+            return value.split(',')
+
+    elif value_type == 'bool':
+
+        def parse_value(value):
+            return value in true_values
+
+    elif value_type == 'hex':
+
+        def parse_value(value):
+            return '0x' + value[2:].upper()
+
+    elif value_type == 'list':
+
+        def parse_value(value):
+            return value.split()
+
+    elif value_type == 'int':
+        parse_value = int
+
+    else:
+
+        def parse_value(value):
+            return value
+
+    return parse_value
+
+
+def _define(key, *value):
+    """Returns the lines for a guarded `#define`, with an optional value.
+    """
+    define = ' '.join(['#   define', key, *map(str, value)])
+
+    return ['', f'#ifndef {key}', define, f'#endif // {key}']
+
+
+def _compile_config_h_formatter(key, value_type):
+    """Returns a function that turns an `info.json` value into `config.h` lines.
+    """
+    if value_type.startswith('array'):
+
+        def format_value(value):
+            return _define(key, f'{{ {", ".join(map(str, value))} }}')
+
+    elif value_type == 'bool':
+
+        def format_value(value):
+            return _define(key) if value else []
+
+    elif value_type == 'mapping':
+
+        def format_value(value):
+            return [line for mapping_key, mapping_value in value.items() for line in _define(mapping_key, mapping_value)]
+
+    else:
+
+        def format_value(value):
+            return _define(key, value)
+
+    return format_value
+
+
+def _compile_rules_mk_formatter(key, value_type):
+    """Returns a function that turns an `info.json` value into `rules.mk` lines.
+    """
+    if value_type == 'array':
+
+        def format_value(value):
+            return [f'{key} ?= {" ".join(value)}']
+
+    elif value_type == 'bool':
+
+        def format_value(value):
+            return [f'{key} ?= {"on" if value else "off"}']
+
+    elif value_type == 'mapping':
+
+        def format_value(value):
+            return [f'{mapping_key} ?= {mapping_value}' for mapping_key, mapping_value in value.items()]
+
+    else:
+
+        def format_value(value):
+            return [f'{key} ?= {value}']
+
+    return format_value
+
+
+_formatters = {
+    'info_config': _compile_config_h_formatter,
+    'info_rules': _compile_rules_mk_formatter,
+}
+
+
+@lru_cache(maxsize=None)
+def load_mapping(mapping_name):
+    """Returns the compiled entries of a mapping file, in the order they appear in the file.
+
+    Args:
+        mapping_name: `info_config` or `info_rules`
+
+    Returns:
+        a tuple of `MappingEntry`
+    """
+    entries = []
+    compile_formatter = _formatters[mapping_name]
+
+    for key, info_dict in json_load(Path(f'data/mappings/{mapping_name}.json')).items():
+        info_key = info_dict['info_key']
+        path = tuple(info_key.split('.'))
+        value_type = info_dict.get('value_type', 'str')
+
+        entries.append(
+            MappingEntry(
+                key=key,
+                info_key=info_key,
+                path=path,
+                value_type=value_type,
+                to_json=info_dict.get('to_json', True),
+                to_c=info_dict.get('to_c', True),
+                warn_duplicate=info_dict.get('warn_duplicate', True),
+                get=_compile_getter(path),
+                set=_compile_setter(path),
+                parse=_compile_parser(value_type),
+                format=compile_formatter(key, value_type),
+            )
+        )
+
+    return tuple(entries)
+
+
+def mapped_keys(mapping_name):
+    """Returns the top level `info.json` keys that a mapping file can write.
+    """
+    return frozenset(entry.path[0] for entry in load_mapping(mapping_name) if entry.to_json)
+
+
+def lookup(entry, info_data):
+    """Returns the value of `entry` in `info_data`, or None if it isn't set.
+    """
+    try:
+        return entry.get(info_data)
+
+    except (KeyError, TypeError):
+        return None
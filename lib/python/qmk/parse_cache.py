@@ -0,0 +1,72 @@
+"""Share parsed files between keyboards while working on many of them at once.
+
+Sibling keyboards such as `clueboard/66/rev*` read the same parent rules.mk, config.h, info.json and keyboard.h files. Inside a `shared_parses()` block each physical file is only parsed once, and every later request for it gets the stored result.
+
+Parsers that hand out mutable data must return copies of what is stored here, so one keyboard can't change what the next one sees.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+
+from milc import cli
+
+_cache = None
+_stats = {'parsed': 0, 'reused': 0}
+
+
+@contextmanager
+def shared_parses():
+    """Share parsed files for the duration of a `with` block.
+
+    Blocks can be nested, the outermost block owns the cache and resets the statistics.
+    """
+    global _cache
+
+    if _cache is not None:
+        yield
+        return
+
+    _cache = {}
+    _stats['parsed'] = 0
+    _stats['reused'] = 0
+
+    try:
+        yield
+
+    finally:
+        _cache = None
+        cli.log.debug('Parsed %d files once and reused them %d times.', _stats['parsed'], _stats['reused'])
+
+
+def active():
+    """Returns True when called inside a `shared_parses()` block.
+    """
+    return _cache is not None
+
+
+def cached_parse(kind, file, parse):
+    """Returns `parse(file)`, reusing an earlier result for the same file when inside `shared_parses()`.
+
+    Args:
+        kind: a name for the parser, so one file can be parsed in more than one way
+        file: path to the file being parsed
+        parse: function that parses `file`
+    """
+    if _cache is None:
+        return parse(file)
+
+    key = (kind, Path(file).as_posix())
+
+    if key in _cache:
+        _stats['reused'] += 1
+
+    else:
+        _stats['parsed'] += 1
+        _cache[key] = parse(file)
+
+    return _cache[key]
+
+
+def parses_saved():
+    """Returns how many parses the current, or most recent, `shared_parses()` block avoided.
+    """
+    return _stats['reused']
@@ -5,6 +5,7 @@ import os
 import argparse
 from pathlib import Path
 
+from qmk import keyboard_index
 from qmk.constants import MAX_KEYBOARD_SUBFOLDERS, QMK_FIRMWARE
 from qmk.errors import NoSuchKeyboardError
 
@@ -13,10 +14,7 @@ def is_keyboard(keyboard_name):
     """Returns True if `keyboard_name` is a keyboard we can compile.
     """
     if keyboard_name:
-        keyboard_path = QMK_FIRMWARE / 'keyboards' / keyboard_name
-        rules_mk = keyboard_path / 'rules.mk'
-
-        return rules_mk.exists()
+        return keyboard_index.is_keyboard(keyboard_name)
 
 
 def under_qmk_firmware():
@@ -69,6 +67,36 @@ def normpath(path):
     return Path(os.environ['ORIG_CWD']) / path
 
 
+def write_if_changed(file, content):
+    """Atomically write `content` to `file` unless it already holds exactly that content.
+
+    Leaving unchanged files alone keeps their mtime intact, so make doesn't rebuild everything that depends on them. New content is written to a temporary file in the same directory and renamed over the old file so readers never see a partial write.
+
+    Returns True if the file was written.
+    """
+    file = Path(file)
+
+    try:
+        if file.read_text(encoding='utf-8') == content:
+            return False
+
+    except (OSError, UnicodeDecodeError):
+        pass
+
+    file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = file.parent / f'.{file.name}.{os.getpid()}.tmp'
+
+    try:
+        tmp_file.write_text(content, encoding='utf-8')
+        os.replace(tmp_file, file)
+
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+    return True
+
+
 class FileType(argparse.FileType):
     def __call__(self, string):
         """normalize and check exists
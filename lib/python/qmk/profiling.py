@@ -0,0 +1,199 @@
+"""Per-stage profiling for the info.json pipeline.
+
+Stages are marked with the `profile_stage` decorator and keyboards with `profile_keyboard()`. Nothing is recorded, and the decorator costs a single check, unless a `profiling()` block is active.
+
+While profiling, every stage records its wall time, how many times it was called and its peak memory use as measured by `tracemalloc`. Stages nest, so `keyboard_validate` time is also counted in `merge_info_jsons`.
+
+Python 3.7 and 3.8 can't reset the peak `tracemalloc` tracks, so there a stage's peak is only seen when it is higher than every peak before it. Otherwise the memory in use when the stage ends is recorded, and peaks are a lower bound.
+"""
+import functools
+import json
+import tracemalloc
+from contextlib import contextmanager
+from time import perf_counter
+
+from milc import cli
+
+_profile = None
+_keyboard = None
+_stack = []
+
+# tracemalloc.reset_peak() was added in Python 3.9
+_exact_peaks = hasattr(tracemalloc, 'reset_peak')
+
+
+@contextmanager
+def profiling(enable=True):
+    """Record profiling data for the duration of a `with` block.
+
+    Args:
+        enable: when False the block runs without profiling and None is yielded
+
+    Yields:
+        a dictionary that the raw profiling data is collected in
+    """
+    global _profile
+
+    if not enable:
+        yield None
+        return
+
+    _profile = {'keyboards': {}}
+    tracemalloc.start()
+
+    try:
+        yield _profile
+
+    finally:
+        tracemalloc.stop()
+        _profile = None
+
+
+def enabled():
+    """Returns True when called inside a `profiling()` block.
+    """
+    return _profile is not None
+
+
+def _keyboard_data(keyboard):
+    """Returns the profiling data for a keyboard, creating it if needed.
+    """
+    return _profile['keyboards'].setdefault(str(keyboard), {'time': 0.0, 'peak': 0, 'stages': {}})
+
+
+@contextmanager
+def _measure():
+    """Measure the wall time and peak memory of a block, correctly accounting for nested blocks.
+
+    Yields:
+        a dictionary that `time` and `peak` are filled in on exit
+    """
+    current, peak = tracemalloc.get_traced_memory()
+
+    if _exact_peaks:
+        if _stack:
+            _stack[-1]['peak'] = max(_stack[-1]['peak'], peak)
+
+        tracemalloc.reset_peak()
+        peak = current
+
+    entry = {'start_mem': current, 'start_peak': peak, 'peak': current}
+    _stack.append(entry)
+    start = perf_counter()
+
+    try:
+        yield entry
+
+    finally:
+        entry['time'] = perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+
+        # Without reset_peak() the peak only belongs to this block if it was reached after the block started
+        entry['peak'] = max(entry['peak'], peak if peak > entry['start_peak'] else current)
+        _stack.pop()
+
+        if _stack:
+            _stack[-1]['peak'] = max(_stack[-1]['peak'], entry['peak'])
+
+        entry['peak'] -= entry['start_mem']
+
+
+@contextmanager
+def profile_keyboard(keyboard):
+    """Attribute the stages run inside a `with` block to `keyboard`.
+
+    Re-entering the block for a keyboard that is already being profiled does nothing.
+    """
+    global _keyboard
+
+    if not enabled() or _keyboard is not None:
+        yield
+        return
+
+    _keyboard = keyboard
+
+    try:
+        with _measure() as measurement:
+            yield
+
+    finally:
+        _keyboard = None
+
+    keyboard_data = _keyboard_data(keyboard)
+    keyboard_data['time'] += measurement['time']
+    keyboard_data['peak'] = max(keyboard_data['peak'], measurement['peak'])
+
+
+def profile_stage(func):
+    """Decorator that records a function as a stage of the info.json pipeline.
+
+    Stages are named after the function and the module it lives in, eg `info._extract_config_h`.
+    """
+    name = f'{func.__module__.split(".")[-1]}.{func.__name__}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not enabled():
+            return func(*args, **kwargs)
+
+        with _measure() as measurement:
+            result = func(*args, **kwargs)
+
+        stage = _keyboard_data(_keyboard or '-')['stages'].setdefault(name, {'calls': 0, 'time': 0.0, 'peak': 0})
+        stage['calls'] += 1
+        stage['time'] += measurement['time']
+        stage['peak'] = max(stage['peak'], measurement['peak'])
+
+        return result
+
+    return wrapper
+
+
+def stage_totals(profile):
+    """Returns the profiling data for each stage summed across every keyboard.
+    """
+    totals = {}
+
+    for keyboard_data in profile['keyboards'].values():
+        for name, stage in keyboard_data['stages'].items():
+            total = totals.setdefault(name, {'calls': 0, 'time': 0.0, 'peak': 0, 'slowest': None, 'slowest_time': 0.0})
+            total['calls'] += stage['calls']
+            total['time'] += stage['time']
+            total['peak'] = max(total['peak'], stage['peak'])
+
+    for keyboard, keyboard_data in profile['keyboards'].items():
+        for name, stage in keyboard_data['stages'].items():
+            if stage['time'] > totals[name]['slowest_time']:
+                totals[name]['slowest'] = keyboard
+                totals[name]['slowest_time'] = stage['time']
+
+    return totals
+
+
+def log_report(profile, limit=10):
+    """Log the slowest keyboards and stages.
+
+    The report is logged rather than printed so it doesn't end up in JSON sent to stdout.
+    """
+    keyboards = sorted(profile['keyboards'].items(), key=lambda item: item[1]['time'], reverse=True)
+    stages = sorted(stage_totals(profile).items(), key=lambda item: item[1]['time'], reverse=True)
+
+    if not _exact_peaks:
+        cli.log.info('Memory peaks are a lower bound on Python versions before 3.9.')
+
+    cli.log.info('{fg_blue}Slowest keyboards{fg_reset}:')
+    for keyboard, keyboard_data in keyboards[:limit]:
+        cli.log.info('  %-40s %9.1f ms %9.1f KiB peak', keyboard, keyboard_data['time'] * 1000, keyboard_data['peak'] / 1024)
+
+    cli.log.info('{fg_blue}Stages{fg_reset}:')
+    for name, stage in stages:
+        mean = stage['time'] / stage['calls'] if stage['calls'] else 0
+        cli.log.info('  %-32s %6d calls %9.1f ms total %7.2f ms mean %9.1f KiB peak  slowest: %s', name, stage['calls'], stage['time'] * 1000, mean * 1000, stage['peak'] / 1024, stage['slowest'])
+
+
+def write_report(profile, file):
+    """Write the raw profiling data to `file` as JSON, so runs can be compared.
+    """
+    data = {**profile, 'stages': stage_totals(profile)}
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_text(json.dumps(data, indent=4, sort_keys=True))
@@ -0,0 +1,374 @@
+"""Compile JSON schemas into Python validation functions.
+
+The generic jsonschema validator interprets the schema for every instance it checks. For the info.json schemas, which are checked thousands of times by `generate-api`, it is much faster to turn each schema node into a plain Python function once.
+
+The generated functions stop at the first problem and return it in the same form jsonschema's `Validator.validate()` would raise it: the same message, path, schema path, keyword, instance and schema node. Only the keywords used by QMK's schemas are supported, `UnsupportedSchemaError` is raised for anything else so callers can fall back to jsonschema.
+"""
+from numbers import Number
+
+import jsonschema
+
+# Bump this when the generated code changes
+COMPILER_VERSION = 1
+
+# Keywords that are not checked without a format checker, or that don't exist in draft 7
+_ignored_keywords = frozenset(('format',))
+
+# The method of `_Compiler` that compiles each keyword
+_keyword_methods = {
+    'additionalProperties': '_keyword_additional_properties',
+    'allOf': '_keyword_all_of',
+    'enum': '_keyword_enum',
+    'exclusiveMaximum': '_keyword_exclusive_maximum',
+    'exclusiveMinimum': '_keyword_exclusive_minimum',
+    'items': '_keyword_items',
+    'maxItems': '_keyword_max_items',
+    'maxLength': '_keyword_max_length',
+    'maximum': '_keyword_maximum',
+    'minItems': '_keyword_min_items',
+    'minLength': '_keyword_min_length',
+    'minimum': '_keyword_minimum',
+    'multipleOf': '_keyword_multiple_of',
+    'oneOf': '_keyword_one_of',
+    'pattern': '_keyword_pattern',
+    'properties': '_keyword_properties',
+    'required': '_keyword_required',
+    'type': '_keyword_type',
+}
+
+_type_checks = {
+    'array': 'isinstance(instance, list)',
+    'boolean': 'isinstance(instance, bool)',
+    'integer': '(isinstance(instance, int) and not isinstance(instance, bool) or isinstance(instance, float) and instance.is_integer())',
+    'null': 'instance is None',
+    'number': '(isinstance(instance, Number) and not isinstance(instance, bool))',
+    'object': 'isinstance(instance, Mapping)',
+    'string': 'isinstance(instance, str)',
+}
+
+_header = '''"""Validators generated by qmk.schema_compiler from %(schema)s, do not edit.
+"""
+import re
+from collections import deque
+from collections.abc import Mapping
+from numbers import Number
+
+SCHEMA_HASH = %(hash)r
+
+# Set by the loader to the schema nodes at NODE_PATHS
+nodes = None
+
+
+def _error(message, keyword, node, instance):
+    return [message, deque(), deque([keyword] if keyword else []), keyword, node, instance]
+
+
+def _descended(error, path, schema_path):
+    if path is not None:
+        error[1].appendleft(path)
+
+    error[2].extendleft(reversed(schema_path))
+
+    return error'''
+
+
+class UnsupportedSchemaError(Exception):
+    """Raised when a schema uses something the compiler can't turn into Python.
+    """
+    def __init__(self, message):
+        self.message = message
+
+
+def _node(documents, document, path):
+    """Returns the schema node at `path` within `documents[document]`.
+    """
+    node = documents[document]
+
+    for part in path:
+        node = node[part]
+
+    return node
+
+
+class _Compiler:
+    """Turns the nodes of a set of schemas into Python functions.
+    """
+    def __init__(self, documents):
+        self.documents = documents
+        self.ids = {document.get('$id'): index for index, document in enumerate(documents) if isinstance(document, dict) and '$id' in document}
+        self.functions = {}
+        self.node_paths = []
+        self.constants = []
+        self.code = []
+
+    def function(self, document, path):
+        """Returns the name of the function that validates the node at `path` within `document`, compiling it the first time.
+        """
+        key = (document, path)
+
+        if key not in self.functions:
+            index = len(self.node_paths)
+            self.node_paths.append(key)
+            self.functions[key] = f'_node_{index}'
+            self._compile(index, document, path)
+
+        return self.functions[key]
+
+    def node(self, document, path):
+        """Returns the schema node at `path` within `document`.
+        """
+        return _node(self.documents, document, path)
+
+    def constant(self, expression):
+        """Adds a module level constant and returns its name.
+        """
+        name = f'_constant_{len(self.constants)}'
+        self.constants.append(f'{name} = {expression}')
+
+        return name
+
+    def _resolve(self, document, ref):
+        """Returns the document and path a `$ref` points to.
+        """
+        target, _, pointer = ref.partition('#')
+
+        if target:
+            if target not in self.ids:
+                raise UnsupportedSchemaError(f'Unknown $ref: {ref}')
+
+            document = self.ids[target]
+
+        path = tuple(part.replace('~1', '/').replace('~0', '~') for part in pointer.split('/') if part)
+        path = tuple(int(part) if isinstance(self.node(document, path[:i]), list) else part for i, part in enumerate(path))
+
+        return document, path
+
+    def _compile(self, index, document, path):
+        """Generate the function for a single schema node.
+        """
+        schema = self.node(document, path)
+        lines = [f'def _node_{index}(instance):']
+
+        if schema is True or schema == {}:
+            lines.append('    return None')
+
+        elif schema is False:
+            lines.append(f'    return _error(f"False schema does not allow {{instance!r}}", None, {index}, instance)')
+
+        elif not isinstance(schema, dict):
+            raise UnsupportedSchemaError(f'Schema must be an object or a boolean, not {schema!r}')
+
+        elif '$ref' in schema:
+            ref_document, ref_path = self._resolve(document, schema['$ref'])
+            lines.append(f'    return {self.function(ref_document, ref_path)}(instance)')
+
+        else:
+            for keyword, value in schema.items():
+                if keyword in _ignored_keywords or keyword not in jsonschema.Draft7Validator.VALIDATORS:
+                    continue
+
+                if keyword not in _keyword_methods:
+                    raise UnsupportedSchemaError(f'Unsupported keyword: {keyword}')
+
+                compile_keyword = getattr(self, _keyword_methods[keyword])
+                lines.extend('    ' + line for line in compile_keyword(index, document, path, value))
+
+            lines.append('    return None')
+
+        self.code.append('\n'.join(lines))
+
+    def _fail(self, index, keyword, message, condition):
+        """Returns the lines that report `message` when `condition` is true.
+        """
+        return [f'if {condition}:', f'    return _error({message}, {keyword!r}, {index}, instance)']
+
+    def _descend(self, call, path, schema_path):
+        """Returns the lines that pass on the error from a child node.
+        """
+        return [f'error = {call}', 'if error:', f'    return _descended(error, {path}, {schema_path!r})']
+
+    def _keyword_type(self, index, document, path, types):
+        types = [types] if isinstance(types, str) else types
+
+        if any(type_name not in _type_checks for type_name in types):
+            raise UnsupportedSchemaError(f'Unsupported type: {types!r}')
+
+        condition = ' or '.join(_type_checks[type_name] for type_name in types)
+        reprs = ', '.join(repr(type_name) for type_name in types)
+
+        return self._fail(index, 'type', f'f"{{instance!r}} is not of type {self._escape(reprs)}"', f'not ({condition})')
+
+    def _keyword_properties(self, index, document, path, properties):
+        lines = ['if isinstance(instance, Mapping):']
+
+        for name in properties:
+            function = self.function(document, (*path, 'properties', name))
+            lines.append(f'    if {name!r} in instance:')
+            lines.extend('        ' + line for line in self._descend(f'{function}(instance[{name!r}])', repr(name), ('properties', name)))
+
+        return lines if len(lines) > 1 else []
+
+    def _keyword_additional_properties(self, index, document, path, additional):
+        schema = self.node(document, path)
+
+        if 'patternProperties' in schema:
+            raise UnsupportedSchemaError('Unsupported keyword: patternProperties')
+
+        known = self.constant(f"frozenset({sorted(schema.get('properties', {}))!r})")
+
+        if isinstance(additional, dict):
+            function = self.function(document, (*path, 'additionalProperties'))
+
+            return [
+                'if isinstance(instance, Mapping):',
+                '    for key in instance:',
+                f'        if key not in {known}:',
+                *('            ' + line for line in self._descend(f'{function}(instance[key])', 'key', ('additionalProperties',))),
+            ]
+
+        if additional is False:
+            return [
+                'if isinstance(instance, Mapping):',
+                f'    extras = sorted((key for key in instance if key not in {known}), key=str)',
+                '    if extras:',
+                '        message = "Additional properties are not allowed (%s %s unexpected)" % (", ".join(repr(extra) for extra in extras), "was" if len(extras) == 1 else "were")',
+                f'        return _error(message, "additionalProperties", {index}, instance)',
+            ]
+
+        return []
+
+    def _keyword_items(self, index, document, path, items):
+        if not isinstance(items, (dict, bool)):
+            raise UnsupportedSchemaError('Unsupported keyword: items as an array')
+
+        function = self.function(document, (*path, 'items'))
+
+        return [
+            'if isinstance(instance, list):',
+            '    for index, item in enumerate(instance):',
+            *('        ' + line for line in self._descend(f'{function}(item)', 'index', ('items',))),
+        ]
+
+    def _keyword_enum(self, index, document, path, enum):
+        if not all(isinstance(value, str) for value in enum):
+            raise UnsupportedSchemaError('Unsupported keyword: enum with values that are not strings')
+
+        values = self.constant(f'frozenset({sorted(enum)!r})')
+        message = f'f"{{instance!r}} is not one of {{nodes[{index}][\'enum\']!r}}"'
+
+        return self._fail(index, 'enum', message, f'not (isinstance(instance, str) and instance in {values})')
+
+    def _keyword_pattern(self, index, document, path, pattern):
+        regex = self.constant(f're.compile({pattern!r})')
+
+        return self._fail(index, 'pattern', f'f"{{instance!r}} does not match {self._escape(repr(pattern))}"', f'isinstance(instance, str) and not {regex}.search(instance)')
+
+    def _length(self, index, keyword, type_check, operator, limit, boundary_message, message):
+        message = boundary_message if limit == (1 if operator == '<' else 0) else message
+
+        return self._fail(index, keyword, f'f"{{instance!r}} {message}"', f'{type_check} and len(instance) {operator} {limit!r}')
+
+    def _keyword_min_length(self, index, document, path, limit):
+        return self._length(index, 'minLength', _type_checks['string'], '<', limit, 'should be non-empty', 'is too short')
+
+    def _keyword_max_length(self, index, document, path, limit):
+        return self._length(index, 'maxLength', _type_checks['string'], '>', limit, 'is expected to be empty', 'is too long')
+
+    def _keyword_min_items(self, index, document, path, limit):
+        return self._length(index, 'minItems', _type_checks['array'], '<', limit, 'should be non-empty', 'is too short')
+
+    def _keyword_max_items(self, index, document, path, limit):
+        return self._length(index, 'maxItems', _type_checks['array'], '>', limit, 'is expected to be empty', 'is too long')
+
+    def _keyword_multiple_of(self, index, document, path, divisor):
+        if not isinstance(divisor, Number) or isinstance(divisor, bool):
+            raise UnsupportedSchemaError(f'Unsupported multipleOf: {divisor!r}')
+
+        failed = f'int(instance / {divisor!r}) != instance / {divisor!r}' if isinstance(divisor, float) else f'instance % {divisor!r}'
+
+        return self._fail(index, 'multipleOf', f'f"{{instance!r}} is not a multiple of {divisor}"', f'{_type_checks["number"]} and {failed}')
+
+    def _comparison(self, index, keyword, operator, limit, description):
+        if not isinstance(limit, Number) or isinstance(limit, bool):
+            raise UnsupportedSchemaError(f'Unsupported {keyword}: {limit!r}')
+
+        return self._fail(index, keyword, f'f"{{instance!r}} is {description} {limit!r}"', f'{_type_checks["number"]} and instance {operator} {limit!r}')
+
+    def _keyword_minimum(self, index, document, path, limit):
+        return self._comparison(index, 'minimum', '<', limit, 'less than the minimum of')
+
+    def _keyword_maximum(self, index, document, path, limit):
+        return self._comparison(index, 'maximum', '>', limit, 'greater than the maximum of')
+
+    def _keyword_exclusive_minimum(self, index, document, path, limit):
+        return self._comparison(index, 'exclusiveMinimum', '<=', limit, 'less than or equal to the minimum of')
+
+    def _keyword_exclusive_maximum(self, index, document, path, limit):
+        return self._comparison(index, 'exclusiveMaximum', '>=', limit, 'greater than or equal to the maximum of')
+
+    def _keyword_required(self, index, document, path, required):
+        lines = []
+
+        for name in required:
+            lines.extend(self._fail(index, 'required', repr(f'{name!r} is a required property'), f'isinstance(instance, Mapping) and {name!r} not in instance'))
+
+        return lines
+
+    def _keyword_all_of(self, index, document, path, all_of):
+        lines = []
+
+        for position in range(len(all_of)):
+            function = self.function(document, (*path, 'allOf', position))
+            lines.extend(self._descend(f'{function}(instance)', None, ('allOf', position)))
+
+        return lines
+
+    def _keyword_one_of(self, index, document, path, one_of):
+        functions = ', '.join(self.function(document, (*path, 'oneOf', position)) for position in range(len(one_of)))
+
+        return [
+            f'valid = [position for position, function in enumerate(({functions},)) if function(instance) is None]',
+            'if not valid:',
+            f'    return _error(f"{{instance!r}} is not valid under any of the given schemas", "oneOf", {index}, instance)',
+            'if len(valid) > 1:',
+            f'    reprs = ", ".join(repr(nodes[{index}]["oneOf"][position]) for position in valid[1:] + valid[:1])',
+            f'    return _error(f"{{instance!r}} is valid under each of {{reprs}}", "oneOf", {index}, instance)',
+        ]
+
+    def _escape(self, text):
+        """Escape text for use inside an f-string.
+        """
+        return text.replace('\\', '\\\\').replace('"', '\\"').replace('{', '{{').replace('}', '}}')
+
+
+def compile_schema(documents, root=0, name='schema', schema_hash=None):
+    """Returns the source code of a Python module that validates instances against a schema.
+
+    Args:
+        documents: a list of schemas, `$ref`s to another schema's `$id` are resolved within this list
+        root: the index of the schema to validate against
+        name: the name of the schema, for the module's docstring
+        schema_hash: a hash of the schemas, stored in the module as `SCHEMA_HASH`
+
+    The module has `validate(instance)`, which returns None or the first error, and `validate_property(name, instance)`, which validates the value of a single top level property. Errors are lists of `[message, path, schema_path, keyword, node, instance]`, where `node` is an index into `NODE_PATHS`, the document and path of each schema node. The loader must set the module's `nodes` to the schema node at each of `NODE_PATHS` before calling them.
+    """
+    compiler = _Compiler(documents)
+    root_function = compiler.function(root, ())
+    root_schema = documents[root]
+    properties = root_schema.get('properties', {}) if isinstance(root_schema, dict) else {}
+    property_functions = {name: compiler.function(root, ('properties', name)) for name in properties}
+
+    source = [_header % {'schema': name, 'hash': schema_hash}]
+    source.append('\n'.join([f'NODE_PATHS = {compiler.node_paths!r}', *compiler.constants]))
+    source.extend(compiler.code)
+    source.append(f'def validate(instance):\n    return {root_function}(instance)')
+    source.append(f'PROPERTIES = {{{", ".join(f"{name!r}: {function}" for name, function in property_functions.items())}}}')
+    source.append('def validate_property(name, instance):\n    function = PROPERTIES.get(name)\n\n    return function(instance) if function else None')
+
+    return '\n\n\n'.join(source) + '\n'
+
+
+def schema_nodes(documents, node_paths):
+    """Returns the schema node at each of a compiled module's `NODE_PATHS`, for its `nodes`.
+    """
+    return [_node(documents, document, path) for document, path in node_paths]
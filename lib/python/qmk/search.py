@@ -0,0 +1,338 @@
+"""Search keyboards by their info.json data.
+
+The info.json data of every keyboard is flattened into an SQLite database in `.build/keyboard_search.sqlite`, one row for each field. Each keyboard is stored with a signature of the files and directories its data was built from, and `refresh()` only rebuilds keyboards whose signature has changed.
+
+Filters are boolean expressions over dotted info.json field names, such as:
+
+    processor=STM32F303 and features.rgblight and matrix_size.cols>14
+
+A field on its own is true when it is set to anything other than false, 0 or an empty string. Fields can be compared with `=`, `==`, `!=`, `<`, `<=`, `>` and `>=`, and comparisons combined with `and`, `or`, `not` and parentheses. Comparisons are numeric when the value is a number, including hex numbers such as `0xFEED`, and case insensitive otherwise. `*` and `?` in a value are wildcards. For lists, such as `community_layouts`, a comparison is true when any item in the list matches.
+"""
+import os
+import re
+import sqlite3
+from collections.abc import Mapping
+from multiprocessing import Pool
+from pathlib import Path
+
+from milc import cli
+
+from qmk import diagnostics
+from qmk.constants import BUILD_DIR
+from qmk.info import info_json, info_json_signature
+from qmk.keyboard import list_keyboards
+from qmk.parse_cache import shared_parses
+
+# Bump this when the layout of the database changes
+SCHEMA_VERSION = 1
+DATABASE_FILE = Path(BUILD_DIR) / 'keyboard_search.sqlite'
+
+number_regex = re.compile(r'-?(0x[0-9a-f]+|[0-9]+(\.[0-9]+)?)', re.IGNORECASE)
+token_regex = re.compile(
+    r'''\s*(?:
+        (?P<paren>[()])
+        |(?P<op>==|!=|<=|>=|=|<|>)
+        |"(?P<dquote>[^"]*)"
+        |'(?P<squote>[^']*)'
+        |(?P<word>[^\s()=!<>"']+)
+    )''',
+    re.VERBOSE,
+)
+
+
+def _number(value):
+    """Returns `value` as a number if it looks like one, otherwise None.
+    """
+    if isinstance(value, bool):
+        return int(value)
+
+    if isinstance(value, (int, float)):
+        return value
+
+    if isinstance(value, str) and number_regex.fullmatch(value):
+        return int(value, 16) if value.lower().lstrip('-').startswith('0x') else float(value)
+
+    return None
+
+
+def _text(value):
+    """Returns the text stored for a scalar value.
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+
+    return str(value)
+
+
+def flatten(data, prefix=''):
+    """Yields a `(field, text, number)` row for each value in info.json data.
+
+    Dictionaries get a row of their own, with a NULL text and number, so that their presence can be tested. Lists of scalars get one row per item, and lists of dictionaries, such as the keys of a layout, are skipped.
+    """
+    for key, value in data.items():
+        field = f'{prefix}{key}'
+
+        if isinstance(value, Mapping):
+            yield field, None, None
+            yield from flatten(value, f'{field}.')
+
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                if not isinstance(item, (Mapping, list, tuple)):
+                    yield field, _text(item), _number(item)
+
+        elif value is not None:
+            yield field, _text(value), _number(value)
+
+
+def _keyboard_rows(keyboards):
+    """Returns a list of `(keyboard, rows)` for each keyboard in `keyboards`.
+    """
+    with diagnostics.collecting(), shared_parses():
+        return [(keyboard, list(flatten(info_json(keyboard)))) for keyboard in keyboards]
+
+
+def _keyboard_rows_worker(keyboards):
+    """Run `_keyboard_rows()` in a worker process.
+    """
+    try:
+        return _keyboard_rows(keyboards)
+
+    except SystemExit:
+        return []
+
+
+def connect(database=DATABASE_FILE):
+    """Open the search database, creating it if it doesn't exist or was made by an incompatible version.
+    """
+    database = Path(database)
+    database.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(database)
+
+    if db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+        db.executescript(
+            f'''
+            DROP TABLE IF EXISTS keyboards;
+            DROP TABLE IF EXISTS fields;
+            CREATE TABLE keyboards (name TEXT PRIMARY KEY, signature TEXT NOT NULL);
+            CREATE TABLE fields (keyboard TEXT NOT NULL, field TEXT NOT NULL, text TEXT, number REAL);
+            CREATE INDEX fields_field ON fields (field, keyboard);
+            CREATE INDEX fields_keyboard ON fields (keyboard);
+            PRAGMA user_version = {SCHEMA_VERSION};
+            '''
+        )
+
+    return db
+
+
+def refresh(db, keyboards, parallel=1):
+    """Bring the database up to date with the current info.json data for `keyboards`.
+
+    Keyboards that are no longer in `keyboards` are removed, and keyboards whose files have changed since they were stored are rebuilt.
+
+    Returns:
+        the number of keyboards that were rebuilt
+    """
+    with shared_parses():
+        signatures = {keyboard: info_json_signature(keyboard) for keyboard in keyboards}
+
+    stored = dict(db.execute('SELECT name, signature FROM keyboards'))
+    removed = [(keyboard,) for keyboard in stored if keyboard not in signatures]
+    changed = [keyboard for keyboard, signature in signatures.items() if stored.get(keyboard) != signature]
+
+    if changed:
+        cli.log.info('Updating the search index for %d keyboards.', len(changed))
+
+    if parallel != 1 and len(changed) > 1:
+        chunk_size = max(1, len(changed) // ((parallel or os.cpu_count()) * 4))
+        chunks = [changed[i:i + chunk_size] for i in range(0, len(changed), chunk_size)]
+
+        with Pool(parallel or None, initializer=diagnostics.reset) as pool:
+            results = [result for chunk in pool.imap(_keyboard_rows_worker, chunks) for result in chunk]
+
+    else:
+        results = _keyboard_rows(changed)
+
+    with db:
+        db.executemany('DELETE FROM keyboards WHERE name = ?', removed)
+        db.executemany('DELETE FROM fields WHERE keyboard = ?', removed)
+
+        for keyboard, rows in results:
+            db.execute('DELETE FROM fields WHERE keyboard = ?', (keyboard,))
+            db.executemany('INSERT INTO fields VALUES (?, ?, ?, ?)', ((keyboard, *row) for row in rows))
+            db.execute('INSERT OR REPLACE INTO keyboards VALUES (?, ?)', (keyboard, signatures[keyboard]))
+
+    return len(results)
+
+
+def _tokenize(expression):
+    """Yields a `(kind, text)` tuple for each token in a filter expression.
+    """
+    position = 0
+    expression = expression.strip()
+
+    while position < len(expression):
+        match = token_regex.match(expression, position)
+
+        if not match or match.end() == position:
+            raise ValueError(f'Unexpected {expression[position:]!r} in {expression!r}')
+
+        position = match.end()
+        kind = match.lastgroup
+
+        if kind in ('dquote', 'squote'):
+            yield 'value', match.group(kind)
+
+        elif kind == 'word' and match.group(kind).lower() in ('and', 'or', 'not'):
+            yield match.group(kind).lower(), match.group(kind)
+
+        else:
+            yield kind, match.group(kind)
+
+
+def _comparison(field, op, value):
+    """Returns an SQL condition and its parameters for a single comparison.
+    """
+    subquery = 'name IN (SELECT keyboard FROM fields WHERE field = ? AND %s)'
+
+    if op is None:
+        return subquery % "(number IS NULL OR number != 0) AND (text IS NULL OR text NOT IN ('', 'false'))", [field]
+
+    if op == '!=':
+        condition, params = _comparison(field, '=', value)
+        return f'NOT {condition}', params
+
+    op = '=' if op == '==' else op
+    number = _number(value)
+
+    if number is not None:
+        return subquery % f'number {op} ?', [field, number]
+
+    if op == '=' and ('*' in value or '?' in value):
+        pattern = re.sub(r'([\\%_])', r'\\\1', value).replace('*', '%').replace('?', '_')
+        return subquery % "text LIKE ? ESCAPE '\\'", [field, pattern]
+
+    return subquery % f'text {op} ? COLLATE NOCASE', [field, value]
+
+
+def compile_filter(expression):
+    """Returns an SQL condition for the `keyboards` table, and its parameters, for a filter expression.
+
+    Raises ValueError if the expression can't be parsed.
+    """
+    tokens = list(_tokenize(expression))
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else (None, None)
+
+    def take(kind):
+        nonlocal position
+        token = peek()
+
+        if token[0] != kind:
+            raise ValueError(f'Expected {kind} but found {token[1] or "the end"} in {expression!r}')
+
+        position += 1
+        return token[1]
+
+    def parse_or():
+        sql, params = parse_and()
+
+        while peek()[0] == 'or':
+            take('or')
+            right_sql, right_params = parse_and()
+            sql, params = f'({sql} OR {right_sql})', params + right_params
+
+        return sql, params
+
+    def parse_and():
+        sql, params = parse_not()
+
+        while peek()[0] == 'and':
+            take('and')
+            right_sql, right_params = parse_not()
+            sql, params = f'({sql} AND {right_sql})', params + right_params
+
+        return sql, params
+
+    def parse_not():
+        if peek()[0] == 'not':
+            take('not')
+            sql, params = parse_not()
+            return f'NOT {sql}', params
+
+        if peek() == ('paren', '('):
+            take('paren')
+            sql, params = parse_or()
+
+            if peek() != ('paren', ')'):
+                raise ValueError(f'Missing ) in {expression!r}')
+
+            take('paren')
+            return sql, params
+
+        field = take('word')
+
+        if peek()[0] == 'op':
+            op = take('op')
+            kind, value = peek()
+
+            if kind not in ('word', 'value'):
+                raise ValueError(f'Expected a value after {field}{op} in {expression!r}')
+
+            take(kind)
+            return _comparison(field, op, value)
+
+        return _comparison(field, None, None)
+
+    if not tokens:
+        raise ValueError('Empty filter')
+
+    sql, params = parse_or()
+
+    if position != len(tokens):
+        raise ValueError(f'Unexpected {peek()[1]!r} in {expression!r}')
+
+    return sql, params
+
+
+def find(db, filters=()):
+    """Returns a sorted list of the keyboards that match every expression in `filters`.
+    """
+    conditions = ['1']
+    params = []
+
+    for expression in filters:
+        sql, filter_params = compile_filter(expression)
+        conditions.append(sql)
+        params.extend(filter_params)
+
+    query = f'SELECT name FROM keyboards WHERE {" AND ".join(conditions)} ORDER BY name'
+
+    return [row[0] for row in db.execute(query, params)]
+
+
+def field_values(db, keyboard, field):
+    """Returns the values of `field` for `keyboard`, or of every field below it if it is a dictionary.
+    """
+    rows = db.execute("SELECT field, text FROM fields WHERE keyboard = ? AND (field = ? OR field LIKE ? ESCAPE '\\') AND text IS NOT NULL ORDER BY rowid", (keyboard, field, re.sub(r'([\\%_])', r'\\\1', field) + '.%'))
+
+    return list(rows)
+
+
+def search(filters=(), parallel=1):
+    """Returns the keyboards that match every expression in `filters`, refreshing the database first.
+
+    Args:
+        filters: a list of filter expressions
+        parallel: how many processes to use when refreshing, 0 for one per CPU
+    """
+    db = connect()
+
+    try:
+        refresh(db, list_keyboards(), parallel)
+        return find(db, filters)
+
+    finally:
+        db.close()
@@ -1,4 +1,7 @@
+import os
 import platform
+from pathlib import Path
+from tempfile import TemporaryDirectory
 
 from subprocess import STDOUT, PIPE
 
@@ -13,6 +16,15 @@ def check_subcommand(command, *args):
     return result
 
 
+def check_subcommand_build_dir(build_dir, command, *args):
+    """Run a command with `BUILD_DIR` pointed at `build_dir`, so it doesn't touch the real `.build/`.
+    """
+    cmd = ['bin/qmk', command, *args]
+    env = dict(os.environ, BUILD_DIR=build_dir, QMK_DAEMON='0')
+    result = run(cmd, env=env, stdout=PIPE, stderr=STDOUT, universal_newlines=True)
+    return result
+
+
 def check_subcommand_stdin(file_to_read, command, *args):
     """Pipe content of a file to a command and return output.
     """
@@ -101,6 +113,18 @@ def test_list_keyboards():
     assert 'handwired/pytest/basic' in result.stdout
 
 
+def test_find():
+    result = check_subcommand('find', '-f', 'keyboard_folder=handwired/pytest/* and usb.pid=0x6465', '-p', 'usb.vid')
+    check_returncode(result)
+    assert 'handwired/pytest/basic: usb.vid=0xFEED' in result.stdout
+
+
+def test_find_usb():
+    result = check_subcommand('find-usb', 'feed:6465')
+    check_returncode(result)
+    assert 'handwired/pytest/basic' in result.stdout
+
+
 def test_list_keymaps():
     result = check_subcommand('list-keymaps', '-kb', 'handwired/pytest/basic')
     check_returncode(result)
@@ -164,6 +188,23 @@ def test_info():
     assert 'k0' not in result.stdout
 
 
+def test_info_profile():
+    with TemporaryDirectory() as tmpdir:
+        profile_json = Path(tmpdir, 'test_info_profile.json')
+        result = check_subcommand('info', '-kb', 'handwired/pytest/basic', '-f', 'json', '--profile', '--profile-json', str(profile_json))
+        check_returncode(result)
+        assert 'Slowest keyboards:' in result.stdout
+        assert 'handwired/pytest/basic' in result.stdout
+        assert profile_json.exists()
+
+
+def test_info_rules_mk_explain():
+    result = check_subcommand('info', '-kb', 'handwired/pytest/basic', '-r', '-e')
+    check_returncode(result, [0, 1])
+    assert 'MCU = atmega32u4' in result.stdout
+    assert 'keyboards/handwired/pytest/basic/rules.mk:1: atmega32u4' in result.stdout
+
+
 def test_info_keyboard_render():
     result = check_subcommand('info', '-kb', 'handwired/pytest/basic', '-l')
     check_returncode(result)
@@ -235,6 +276,36 @@ def test_generate_api():
     check_returncode(result)
 
 
+def test_affected():
+    result = check_subcommand('affected', 'HEAD..HEAD')
+    check_returncode(result)
+    assert '0 changed files can affect 0 targets.' in result.stdout
+
+
+def test_affected_bad_range():
+    result = check_subcommand('affected', 'no-such-revision..HEAD')
+    check_returncode(result, [1])
+    assert 'Could not list the changes' in result.stdout
+
+
+def test_cache():
+    with TemporaryDirectory() as build_dir:
+        check_subcommand_build_dir(build_dir, 'info', '-kb', 'handwired/pytest/basic', '-f', 'json')
+        result = check_subcommand_build_dir(build_dir, 'cache')
+        check_returncode(result)
+        assert 'Entries: 1' in result.stdout
+        assert 'Hit rate:' in result.stdout
+
+
+def test_cache_clear():
+    with TemporaryDirectory() as build_dir:
+        check_subcommand_build_dir(build_dir, 'info', '-kb', 'handwired/pytest/basic', '-f', 'json')
+        result = check_subcommand_build_dir(build_dir, 'cache', '--clear')
+        check_returncode(result)
+        assert 'Cleared the info.json cache' in result.stdout
+        assert not list(Path(build_dir, 'info_json_cache').glob('*.json'))
+
+
 def test_generate_rgb_breathe_table():
     result = check_subcommand("generate-rgb-breathe-table", "-c", "1.2", "-m", "127")
     check_returncode(result)
@@ -258,6 +329,20 @@ def test_generate_config_h():
     assert '#   define MATRIX_ROW_PINS { F5 }' in result.stdout
 
 
+def test_generate_config_h_depfile():
+    with TemporaryDirectory() as output:
+        result = check_subcommand('generate-config-h', '-kb', 'handwired/pytest/basic', '-q', '-o', str(Path(output, 'info_config.h')), '--depfile', str(Path(output, 'info_config.d')))
+        check_returncode(result)
+
+        depfile = Path(output, 'info_config.d').read_text()
+        assert depfile.startswith(f'{Path(output, "info_config.d").as_posix()} {Path(output, "info_config.h").as_posix()}: \\\n')
+        assert '\tkeyboards/handwired/pytest/basic/info.json \\' in depfile
+        assert '\tkeyboards/handwired/pytest/config.h \\' in depfile
+        assert '\ndata/mappings/info_config.json:\n' in depfile
+        assert '\tlib/python/qmk/info.py \\' in depfile
+        assert 'lib/python/qmk/tests/' not in depfile
+
+
 def test_generate_rules_mk():
     result = check_subcommand('generate-rules-mk', '-kb', 'handwired/pytest/basic')
     check_returncode(result)
@@ -271,6 +356,19 @@ def test_generate_layouts():
     assert '#define LAYOUT_custom(k0A) {' in result.stdout
 
 
+def test_generate_all():
+    with TemporaryDirectory() as output:
+        result = check_subcommand('generate-all', '-kb', 'handwired/pytest/basic', '-o', output, '-q')
+        check_returncode(result)
+        assert result.stdout.strip().endswith('rules.mk')
+
+        output = Path(output)
+        assert 'MCU ?= atmega32u4' in (output / 'rules.mk').read_text()
+        assert '#   define VENDOR_ID 0xFEED' in (output / 'info_config.h').read_text()
+        assert '#define LAYOUT_custom(k0A) {' in (output / 'layouts.h').read_text()
+        assert '#include "quantum.h"' in (output / 'default_keyboard.h').read_text()
+
+
 def test_format_json_keyboard():
     result = check_subcommand('format-json', '--format', 'keyboard', 'lib/python/qmk/tests/minimal_info.json')
     check_returncode(result)
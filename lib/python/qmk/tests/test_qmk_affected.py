@@ -0,0 +1,49 @@
+import qmk.affected
+
+
+def test_sort_changes():
+    changes = qmk.affected.sort_changes([
+        'docs/cli.md',
+        'keyboards/handwired/pytest/basic/readme.md',
+        'keyboards/handwired/pytest/config.h',
+        'keyboards/handwired/pytest/basic/keymaps/default/keymap.c',
+        'keyboards/handwired/pytest/keymaps/common.h',
+        'layouts/community/ortho_1x1/layout.json',
+        'layouts/community/ortho_1x1/test/keymap.c',
+        'users/pytest/pytest.c',
+        'data/mappings/info_config.json',
+    ])
+
+    assert changes.everything == ['data/mappings/info_config.json']
+    assert changes.keyboard_dirs == {'handwired/pytest'}
+    assert changes.keymaps == {('handwired/pytest/basic', 'default'), ('handwired/pytest', None)}
+    assert changes.layout_keymaps == {('ortho_1x1', 'test')}
+    assert changes.layouts == {'ortho_1x1'}
+    assert changes.users == {'pytest'}
+
+
+def test_affected_ignored():
+    assert qmk.affected.affected_targets(['docs/cli.md', 'keyboards/handwired/pytest/basic/readme.md']) == []
+
+
+def test_affected_keyboard_folder():
+    targets = qmk.affected.affected_targets(['keyboards/handwired/pytest/config.h'])
+
+    assert ('handwired/pytest/basic', 'default') in targets
+    assert ('handwired/pytest/has_template', 'nocpp') in targets
+    assert ('handwired/pytest/has_community', 'test') in targets
+    assert all(keyboard.startswith('handwired/pytest/') for keyboard, keymap in targets)
+
+
+def test_affected_keymap():
+    targets = qmk.affected.affected_targets(['keyboards/handwired/pytest/basic/keymaps/default_json/keymap.json'])
+
+    assert targets == [('handwired/pytest/basic', 'default_json')]
+
+
+def test_affected_layout_keymap():
+    targets = qmk.affected.affected_targets(['layouts/community/ortho_1x1/test/keymap.c'])
+
+    assert ('handwired/pytest/has_community', 'test') in targets
+    assert ('handwired/pytest/basic', 'default') not in targets
+    assert all(keymap == 'test' for keyboard, keymap in targets)
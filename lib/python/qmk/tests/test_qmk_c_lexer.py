@@ -0,0 +1,62 @@
+from qmk.c_lexer import Define, directives, logical_lines, parse_define, remove_comments
+
+SOURCE = '''\
+#pragma once
+/* A comment
+   over two lines */
+#define URL "http://example.com" // not a comment in the string
+#define LONG \\
+    1 + \\
+    2
+#    define INDENTED /* inline */ 3
+#define LAYOUT( \\
+    k00, k01 \\
+) { { k00, k01 } }
+#define QUOTE '"' // still a comment
+'''
+
+
+def test_logical_lines():
+    lines = list(logical_lines(SOURCE))
+
+    assert lines[0] == (1, '#pragma once')
+    assert lines[1] == (2, ' ')
+    assert lines[2] == (4, '#define URL "http://example.com"  ')
+    assert lines[3] == (5, '#define LONG     1 +     2')
+    assert lines[-1] == (13, '')
+
+
+def test_block_comment_joins_lines():
+    assert list(logical_lines('#define A 1 /*\n*/ 2\nB')) == [(1, '#define A 1   2'), (3, 'B')]
+
+
+def test_line_comment_continues():
+    assert list(logical_lines('// a comment \\\n#define A\n#define B')) == [(1, ' '), (3, '#define B')]
+
+
+def test_unterminated_literal():
+    assert list(logical_lines("#error don't // a comment\n#define A")) == [(1, "#error don't // a comment"), (2, '#define A')]
+
+
+def test_directives():
+    found = [directive[:3] for directive in directives(SOURCE)]
+
+    assert found == [
+        (1, 'pragma', 'once'),
+        (4, 'define', 'URL "http://example.com"'),
+        (5, 'define', 'LONG     1 +     2'),
+        (8, 'define', 'INDENTED   3'),
+        (9, 'define', 'LAYOUT(     k00, k01 ) { { k00, k01 } }'),
+        (12, 'define', 'QUOTE \'"\''),
+    ]
+
+
+def test_parse_define():
+    assert parse_define('LAYOUT( k00, k01 ) { { k00, k01 } }') == Define('LAYOUT', ' k00, k01 ', '{ { k00, k01 } }')
+    assert parse_define('LONG 1 + 2') == Define('LONG', None, '1 + 2')
+    assert parse_define('EMPTY') == Define('EMPTY', None, '')
+    assert parse_define('(broken)') is None
+
+
+def test_remove_comments():
+    assert remove_comments('a /* b */ c // d\n"/* e */" \\\nf') == 'a   c  \n"/* e */" \\\nf'
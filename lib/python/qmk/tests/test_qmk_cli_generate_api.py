@@ -0,0 +1,71 @@
+import hashlib
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from qmk.cli.generate.api import _all_keyboards, _build_keyboards, _build_keyboards_parallel, _keyboard_chunks, _write_api_file, _write_shards
+
+
+def test_all_keyboards_by_name():
+    keyboards = ['foo', 'foo-bar/x', 'foo/a']
+    chunks = _keyboard_chunks(keyboards)
+    assert chunks == [['foo', 'foo/a'], ['foo-bar/x']]
+
+    kb_built = iter([(keyboard, {'keyboard_name': keyboard}, {}) for chunk in chunks for keyboard in chunk])
+    kb_all = list(_all_keyboards(keyboards, set(keyboards), kb_built, None, None, True))
+    assert kb_all == [(keyboard, {'keyboard_name': keyboard}, {}) for keyboard in keyboards]
+
+
+def test_parallel_matches_serial():
+    with TemporaryDirectory() as tmp_dir:
+        v1_dir = Path(tmp_dir)
+        keyboards = ['handwired/pytest/basic', 'handwired/pytest/has_community', 'handwired/pytest/has_template', 'ortho5by12']
+
+        serial = list(_all_keyboards(keyboards, set(keyboards), _build_keyboards(keyboards, v1_dir, 'now', True), v1_dir, 'now', True))
+        parallel = list(_all_keyboards(keyboards, set(keyboards), _build_keyboards_parallel(keyboards, 2, v1_dir, 'now', True), v1_dir, 'now', True))
+
+        assert [keyboard[0] for keyboard in serial] == keyboards
+        assert parallel == serial
+
+
+def test_write_api_file():
+    with TemporaryDirectory() as tmp_dir:
+        v1_dir = Path(tmp_dir)
+        file = v1_dir / 'usb.json'
+        outputs = {}
+
+        _write_api_file(v1_dir, file, '{"last_updated": "then", "usb": {}}', outputs, False)
+        assert outputs['usb.json'] == (hashlib.sha256(file.read_bytes()).hexdigest(), file.stat().st_size, True)
+
+        # Only last_updated differs, so the file is left alone
+        _write_api_file(v1_dir, file, '{"last_updated": "now", "usb": {}}', outputs, False)
+        assert file.read_text() == '{"last_updated": "then", "usb": {}}'
+        assert outputs['usb.json'][2] is False
+
+        # A dry run records the file it would write without writing it
+        content = '{"last_updated": "now", "usb": {"0x0000": {}}}'
+        _write_api_file(v1_dir, file, content, outputs, True)
+        assert file.read_text() == '{"last_updated": "then", "usb": {}}'
+        assert outputs['usb.json'] == (hashlib.sha256(content.encode()).hexdigest(), len(content), True)
+        assert [path.name for path in v1_dir.iterdir()] == ['usb.json']
+
+
+def test_write_shards():
+    keyboards = ['foo', 'foo-bar/x', 'foo/a']
+    kb_all = [(keyboard, {'keyboard_name': keyboard, 'manufacturer': 'Caf\u00e9'}, {}) for keyboard in keyboards]
+
+    with TemporaryDirectory() as tmp_dir:
+        v1_dir = Path(tmp_dir)
+        shard_index = {}
+        outputs = {}
+
+        assert list(_write_shards(iter(kb_all), keyboards, v1_dir, 'now', shard_index, outputs, False)) == kb_all
+        assert sorted(outputs) == ['shards/foo-bar.json', 'shards/foo.json']
+        assert json.loads((v1_dir / 'shards/foo.json').read_bytes())['keyboards'] == {'foo': kb_all[0][1], 'foo/a': kb_all[2][1]}
+
+        for keyboard_name, keyboard_info, _ in kb_all:
+            entry = shard_index[keyboard_name]
+
+            with (v1_dir / entry['shard']).open('rb') as fd:
+                fd.seek(entry['offset'])
+                assert json.loads(fd.read(entry['length'])) == keyboard_info
@@ -0,0 +1,70 @@
+import os
+import socket
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipIf
+
+import qmk.daemon
+
+requires_daemon = skipIf(not qmk.daemon.supported(), 'qmk daemon needs Unix sockets')
+
+
+@requires_daemon
+def test_message_with_fds():
+    sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    read_fd, write_fd = os.pipe()
+
+    with sender, receiver:
+        qmk.daemon.send_message(sender, {'argv': ['qmk', 'hello'], 'environ': {'X': 'y' * 10000}}, [write_fd])
+        message, fds = qmk.daemon.receive_message(receiver)
+
+        assert message == {'argv': ['qmk', 'hello'], 'environ': {'X': 'y' * 10000}}
+        assert len(fds) == 1
+
+        # The received descriptor is a new one for the same pipe
+        os.write(fds[0], b'ok')
+        assert os.read(read_fd, 2) == b'ok'
+
+        qmk.daemon.send_int(sender, -42)
+        assert qmk.daemon.receive_int(receiver) == -42
+
+    for fd in (read_fd, write_fd, *fds):
+        os.close(fd)
+
+
+@requires_daemon
+def test_receive_message_closed():
+    sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    sender.close()
+
+    with receiver, TestCase().assertRaises(EOFError):
+        qmk.daemon.receive_message(receiver)
+
+
+@requires_daemon
+def test_forward_without_daemon():
+    with TemporaryDirectory() as tmpdir:
+        assert qmk.daemon.forward(tmpdir, ['qmk', 'hello']) is None
+
+        # A socket left behind by a daemon that is no longer running
+        socket_file = qmk.daemon.socket_file(tmpdir)
+        socket_file.parent.mkdir(parents=True)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(str(socket_file))
+        listener.close()
+
+        assert qmk.daemon.forward(tmpdir, ['qmk', 'hello']) is None
+
+
+def test_source_signature():
+    with TemporaryDirectory() as tmpdir:
+        module = Path(tmpdir, 'lib', 'python', 'qmk', 'example.py')
+        module.parent.mkdir(parents=True)
+        module.write_text('')
+        signature = qmk.daemon.source_signature(tmpdir)
+
+        assert qmk.daemon.source_signature(tmpdir) == signature
+
+        module.write_text('# Changed\n')
+
+        assert qmk.daemon.source_signature(tmpdir) != signature
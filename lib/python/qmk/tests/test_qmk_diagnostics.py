@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import qmk.diagnostics
+import qmk.info
+
+
+def test_collecting_buffers_diagnostics():
+    with qmk.diagnostics.collecting() as collected:
+        qmk.diagnostics.warning('W207', 'handwired/pytest/basic', 'Unknown MCU: foo')
+        qmk.diagnostics.error('E107', None, 'LAYOUT: Nested layout macro detected.', 'keyboards/handwired/pytest/pytest.h')
+
+    assert collected == [
+        qmk.diagnostics.Diagnostic('warning', 'W207', 'handwired/pytest/basic', None, 'Unknown MCU: foo'),
+        qmk.diagnostics.Diagnostic('error', 'E107', None, 'keyboards/handwired/pytest/pytest.h', 'LAYOUT: Nested layout macro detected.'),
+    ]
+    assert qmk.diagnostics.summarize(collected) == {('warning', 'W207'): 1, ('error', 'E107'): 1}
+
+
+def test_collecting_writes_jsonl():
+    with TemporaryDirectory() as tmpdir:
+        jsonl = Path(tmpdir) / 'diagnostics.jsonl'
+
+        with qmk.diagnostics.collecting(jsonl, batch_size=2):
+            for i in range(3):
+                qmk.diagnostics.warning('W206', 'handwired/pytest/basic', f'message {i}')
+
+            assert len(jsonl.read_text().splitlines()) == 2
+
+        lines = [json.loads(line) for line in jsonl.read_text().splitlines()]
+
+    assert [line['message'] for line in lines] == ['message 0', 'message 1', 'message 2']
+    assert lines[0] == {'level': 'warning', 'code': 'W206', 'keyboard': 'handwired/pytest/basic', 'file': None, 'message': 'message 0'}
+
+
+def test_capture_and_replay():
+    with qmk.diagnostics.collecting() as collected:
+        with qmk.diagnostics.capture() as captured:
+            qmk.diagnostics.warning('W201', 'handwired/pytest/basic', 'Feature foo is specified twice')
+
+        qmk.diagnostics.replay([list(diagnostic) for diagnostic in captured])
+
+    assert len(captured) == 1
+    assert collected == captured * 2
+
+
+def test_collecting_still_fills_parse_errors():
+    info_data = {'keyboard_folder': 'handwired/pytest/basic', 'parse_errors': [], 'parse_warnings': []}
+
+    with qmk.diagnostics.collecting() as collected:
+        qmk.info._log_error(info_data, 'E103', 'No LAYOUTs defined!')
+        qmk.info._log_warning(info_data, 'W202', 'Matrix size is specified twice')
+
+    assert info_data['parse_errors'] == ['No LAYOUTs defined!']
+    assert info_data['parse_warnings'] == ['Matrix size is specified twice']
+    assert [diagnostic.code for diagnostic in collected] == ['E103', 'W202']
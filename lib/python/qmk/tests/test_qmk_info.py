@@ -0,0 +1,29 @@
+import qmk.info
+import qmk.parse_cache
+
+
+def test_lazy_info_json_layouts_only():
+    kb_info_json = qmk.info.LazyInfoJSON('handwired/pytest/basic')
+    assert 'LAYOUT_custom' in kb_info_json['layouts']
+    assert kb_info_json._finished == {'layouts'}
+
+
+def test_lazy_info_json_matches_info_json():
+    kb_info_json = qmk.info.info_json('handwired/pytest/basic')
+    lazy_info = qmk.info.LazyInfoJSON('handwired/pytest/basic')
+    assert lazy_info['manufacturer'] == kb_info_json['manufacturer']
+    assert lazy_info['processor'] == kb_info_json['processor']
+    assert 'keymaps' not in lazy_info._finished
+    assert dict(lazy_info) == kb_info_json
+
+
+def test_lazy_info_json_is_memoized():
+    assert qmk.info.lazy_info_json('handwired/pytest/basic') is qmk.info.lazy_info_json('handwired/pytest/basic')
+
+
+def test_info_json_many_shares_parses():
+    keyboards = ['handwired/pytest/basic', 'handwired/pytest/has_template', 'handwired/pytest/has_community']
+    kb_info_json = qmk.info.info_json_many(keyboards)
+    assert list(kb_info_json) == keyboards
+    assert kb_info_json['handwired/pytest/basic'] == qmk.info.info_json('handwired/pytest/basic')
+    assert qmk.parse_cache.parses_saved() > 0
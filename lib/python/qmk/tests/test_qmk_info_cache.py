@@ -0,0 +1,50 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import qmk.info
+import qmk.info_cache
+from qmk.profiling import profiling
+
+
+def test_input_files_pytest_basic():
+    files = qmk.info_cache.input_files('handwired/pytest/basic')
+    assert Path('keyboards/handwired/pytest/basic/rules.mk') in files
+    assert Path('keyboards/handwired/pytest/basic/info.json') in files
+    assert Path('keyboards/handwired/pytest/config.h') in files
+    assert Path('keyboards/handwired/pytest/pytest.h') in files
+    assert Path('keyboards/handwired/pytest/basic/keymaps/default_json/keymap.json') in files
+    assert Path('keyboards/handwired/pytest/basic/keymaps/default/keymap.c') not in files
+
+
+def test_cache_key_is_stable():
+    assert qmk.info_cache.cache_key('handwired/pytest/basic') == qmk.info_cache.cache_key('handwired/pytest/basic')
+    assert qmk.info_cache.cache_key('handwired/pytest/basic') != qmk.info_cache.cache_key('handwired/pytest/has_template')
+
+
+def test_input_digests():
+    digests = qmk.info_cache.input_digests('handwired/pytest/basic')
+    assert sorted(digests) == [file.as_posix() for file in qmk.info_cache.input_files('handwired/pytest/basic')]
+    assert digests['keyboards/handwired/pytest/basic/rules.mk'] == qmk.info_cache.file_digest(Path('keyboards/handwired/pytest/basic/rules.mk'))
+    assert len(digests['keyboards/handwired/pytest/basic/rules.mk']) == 64
+
+
+def test_profiling_skips_the_cache():
+    saved = qmk.info_cache.CACHE_DIR, qmk.info_cache.STATS_FILE
+
+    with TemporaryDirectory() as tmpdir:
+        try:
+            qmk.info_cache.CACHE_DIR = Path(tmpdir)
+            qmk.info_cache.STATS_FILE = Path(tmpdir, 'stats.json')
+
+            qmk.info.info_json('handwired/pytest/basic')
+            assert qmk.info_cache.get('handwired/pytest/basic') is not None
+
+            with profiling() as profile:
+                qmk.info.info_json('handwired/pytest/basic')
+
+            stages = profile['keyboards']['handwired/pytest/basic']['stages']
+            assert 'info.merge_info_jsons' in stages
+            assert 'info_cache.get' not in stages
+
+        finally:
+            qmk.info_cache.CACHE_DIR, qmk.info_cache.STATS_FILE = saved
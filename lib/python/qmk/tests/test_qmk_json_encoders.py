@@ -0,0 +1,12 @@
+import json
+
+from qmk.info import info_json
+from qmk.json_encoders import InfoJSONEncoder
+
+
+def test_iterencode_items_matches_encode():
+    keyboards = {keyboard: info_json(keyboard) for keyboard in ('handwired/pytest/basic', 'handwired/pytest/has_template')}
+    encoder = InfoJSONEncoder()
+
+    assert ''.join(encoder.iterencode_items(sorted(keyboards.items()))) == json.dumps(keyboards, cls=InfoJSONEncoder)
+    assert ''.join(encoder.iterencode_items([])) == json.dumps({}, cls=InfoJSONEncoder)
@@ -0,0 +1,33 @@
+import qmk.keyboard_aliases
+from qmk.json_schema import json_load
+
+
+def test_compile_aliases():
+    index = qmk.keyboard_aliases.compile_aliases({
+        'old': {'target': 'older'},
+        'older': {'target': 'vendor/new'},
+        'renamed': {'target': 'vendor/new', 'layouts': {'LAYOUT_ansi': 'LAYOUT_65_ansi'}},
+        'layout_only': {'layouts': {'LAYOUT': 'LAYOUT_60_ansi'}},
+        'loop_a': {'target': 'loop_b'},
+        'loop_b': {'target': 'loop_a'},
+    })
+
+    assert index['targets']['old'] == 'older'
+    assert 'layout_only' not in index['targets']
+    assert index['layouts'] == {'renamed': {'LAYOUT_ansi': 'LAYOUT_65_ansi'}, 'layout_only': {'LAYOUT': 'LAYOUT_60_ansi'}}
+    assert index['previous_names']['vendor/new'] == ['old', 'older', 'renamed']
+
+
+def test_index_matches_aliases_file():
+    aliases = json_load(qmk.keyboard_aliases.ALIASES_FILE)
+
+    assert qmk.keyboard_aliases.aliases() == aliases
+
+    for alias, data in aliases.items():
+        assert qmk.keyboard_aliases.resolve(alias) == data.get('target', alias)
+
+        for layout, target in data.get('layouts', {}).items():
+            assert qmk.keyboard_aliases.resolve_layout(alias, layout) == target
+
+    assert qmk.keyboard_aliases.resolve('handwired/pytest/basic') == 'handwired/pytest/basic'
+    assert qmk.keyboard_aliases.resolve_layout('handwired/pytest/basic', 'LAYOUT') == 'LAYOUT'
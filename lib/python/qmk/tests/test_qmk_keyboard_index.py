@@ -0,0 +1,176 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import qmk.keyboard_index
+
+# Far enough in the past that no entry is treated as racy
+OLD_MTIME = 1000000000 * 1000000000
+
+_state = ('DATABASE_FILE', '_db', '_directories', '_checked', '_lookups', '_tree_checked')
+
+
+def new_process():
+    """Forget everything held in memory, as if a new process had started.
+    """
+    qmk.keyboard_index._db = None
+    qmk.keyboard_index._directories = {}
+    qmk.keyboard_index._checked = set()
+    qmk.keyboard_index._lookups = {}
+    qmk.keyboard_index._tree_checked = False
+
+
+def write(path, content=''):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def age_tree():
+    """Set the mtime of everything in the tree to `OLD_MTIME`.
+    """
+    for root in qmk.keyboard_index.ROOTS:
+        for dirpath, dirnames, filenames in os.walk(root):
+            for name in filenames:
+                os.utime(os.path.join(dirpath, name), ns=(OLD_MTIME, OLD_MTIME))
+
+            os.utime(dirpath, ns=(OLD_MTIME, OLD_MTIME))
+
+
+@contextmanager
+def index_tree():
+    """Run the index against a small tree of keyboards in a temporary directory.
+    """
+    saved = {name: getattr(qmk.keyboard_index, name) for name in _state}
+    cwd = os.getcwd()
+
+    with TemporaryDirectory() as tmpdir:
+        try:
+            os.chdir(tmpdir)
+            new_process()
+            qmk.keyboard_index.DATABASE_FILE = Path(tmpdir, '.build', 'keyboard_index.sqlite')
+
+            write('keyboards/alpha/rules.mk', 'DEFAULT_FOLDER = alpha/rev1\n')
+            write('keyboards/alpha/info.json', '{}')
+            write('keyboards/alpha/keymaps/default/keymap.c')
+            write('keyboards/alpha/keymaps/json/keymap.json', '{}')
+            write('keyboards/alpha/rev1/rules.mk')
+            write('keyboards/alpha/rev1/rev1.h')
+            write('keyboards/beta/rules.mk')
+            write('keyboards/beta/keymaps/default/rules.mk')
+            write('keyboards/beta/keymaps/default/keymap.c')
+            write('layouts/community/ortho_4x4/default/keymap.c')
+            age_tree()
+
+            yield Path(tmpdir)
+
+        finally:
+            if qmk.keyboard_index._db:
+                qmk.keyboard_index._db.close()
+
+            os.chdir(cwd)
+
+            for name, value in saved.items():
+                setattr(qmk.keyboard_index, name, value)
+
+
+def test_keyboards():
+    with index_tree():
+        assert sorted(qmk.keyboard_index.keyboards()) == ['alpha', 'alpha/rev1', 'beta']
+        assert qmk.keyboard_index.is_keyboard('alpha/rev1')
+        assert not qmk.keyboard_index.is_keyboard('alpha/keymaps')
+        assert not qmk.keyboard_index.is_keyboard('gamma')
+        assert qmk.keyboard_index.default_folder('alpha') == 'alpha/rev1'
+        assert qmk.keyboard_index.default_folder('beta') is None
+        assert qmk.keyboard_index.subdirectories('keyboards/alpha/keymaps') == ('default', 'json')
+        assert qmk.keyboard_index.subdirectories('layouts/community/ortho_4x4') == ('default',)
+        assert qmk.keyboard_index.files('keyboards/alpha/rev1') == {'rules.mk', 'rev1.h'}
+
+
+def test_is_file():
+    with index_tree() as tree:
+        assert qmk.keyboard_index.is_file('keyboards/alpha/info.json')
+        assert qmk.keyboard_index.is_file(Path('keyboards/alpha/keymaps/json/keymap.json'))
+        assert not qmk.keyboard_index.is_file('keyboards/alpha/rev1/info.json')
+        assert not qmk.keyboard_index.is_file('keyboards/gamma/info.json')
+
+        # Files the index doesn't record are looked up on disk
+        write('keyboards/alpha/readme.md')
+        assert qmk.keyboard_index.is_file('keyboards/alpha/readme.md')
+        assert qmk.keyboard_index.is_file(tree / 'keyboards/alpha/info.json')
+
+
+def test_outside_roots():
+    with index_tree():
+        with TestCase().assertRaises(ValueError):
+            qmk.keyboard_index.directory('quantum')
+
+        with TestCase().assertRaises(ValueError):
+            qmk.keyboard_index.directory('keyboards/../quantum')
+
+
+def test_unchanged_tree_is_not_scanned():
+    with index_tree():
+        qmk.keyboard_index.keyboards()
+        new_process()
+
+        def scandir(path):
+            raise AssertionError(f'{path} was scanned again')
+
+        real_scandir, os.scandir = os.scandir, scandir
+
+        try:
+            assert sorted(qmk.keyboard_index.keyboards()) == ['alpha', 'alpha/rev1', 'beta']
+            assert qmk.keyboard_index.default_folder('alpha') == 'alpha/rev1'
+
+        finally:
+            os.scandir = real_scandir
+
+
+def test_changes_are_noticed():
+    with index_tree():
+        qmk.keyboard_index.keyboards()
+
+        write('keyboards/gamma/rules.mk')
+        write('keyboards/alpha/rev1/keymaps/default/keymap.json', '{}')
+        os.remove('keyboards/beta/keymaps/default/keymap.c')
+        os.remove('keyboards/beta/keymaps/default/rules.mk')
+        os.rmdir('keyboards/beta/keymaps/default')
+        os.remove('keyboards/beta/rules.mk')
+
+        # Changing DEFAULT_FOLDER doesn't change the mtime of the directory
+        Path('keyboards/alpha/rules.mk').write_text('DEFAULT_FOLDER = alpha\n')
+        os.utime('keyboards/alpha', ns=(OLD_MTIME, OLD_MTIME))
+
+        new_process()
+
+        assert sorted(qmk.keyboard_index.keyboards()) == ['alpha', 'alpha/rev1', 'gamma']
+        assert qmk.keyboard_index.default_folder('alpha') == 'alpha'
+        assert qmk.keyboard_index.subdirectories('keyboards/beta/keymaps') == ()
+        assert qmk.keyboard_index.is_file('keyboards/alpha/rev1/keymaps/default/keymap.json')
+
+        # The changes were saved as well
+        new_process()
+
+        assert sorted(qmk.keyboard_index.keyboards()) == ['alpha', 'alpha/rev1', 'gamma']
+
+
+def test_lookup_only_checks_its_path():
+    with index_tree():
+        qmk.keyboard_index.keyboards()
+        new_process()
+
+        assert qmk.keyboard_index.is_keyboard('alpha/rev1')
+        assert qmk.keyboard_index._checked == {'keyboards', 'keyboards/alpha', 'keyboards/alpha/rev1'}
+
+
+def test_keyboard_completions():
+    with index_tree():
+        assert qmk.keyboard_index.keyboard_completions('') == ['alpha', 'alpha/', 'beta']
+        assert qmk.keyboard_index.keyboard_completions('al') == ['alpha', 'alpha/']
+        assert qmk.keyboard_index.keyboard_completions('alpha/') == ['alpha/rev1']
+        assert qmk.keyboard_index.keyboard_completions('alpha/rev2') == []
+        assert qmk.keyboard_index.keyboard_completions('gamma/') == []
+        assert qmk.keyboard_index.keyboard_completions('../') == []
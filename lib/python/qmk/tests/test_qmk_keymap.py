@@ -37,3 +37,9 @@ def test_parse_keymap_c():
 
 
 # FIXME(skullydazed): Add a test for qmk.keymap.write that mocks up an FD.
+
+
+def test_list_keymaps_prefix():
+    assert qmk.keymap.list_keymaps('handwired/pytest/has_template') == ['default', 'default_json', 'nocpp']
+    assert qmk.keymap.list_keymaps('handwired/pytest/has_template', prefix='default') == ['default', 'default_json']
+    assert qmk.keymap.list_keymaps('handwired/pytest/has_template', prefix='x') == []
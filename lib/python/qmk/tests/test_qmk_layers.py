@@ -0,0 +1,64 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import qmk.keyboard
+from qmk.layers import Setting, layer, stack
+from qmk.makefile import rules_mk_layer
+
+
+def test_layers():
+    root = layer({'MCU': Setting('atmega32u4', 'root', 1), 'BOOTLOADER': Setting('atmel-dfu', 'root', 2)})
+    leaf = layer({'MCU': Setting('STM32F303', 'leaf', 1)})
+    settings = stack([root, leaf])
+
+    assert dict(settings) == {'MCU': 'STM32F303', 'BOOTLOADER': 'atmel-dfu'}
+    assert settings.source('MCU') == Setting('STM32F303', 'leaf', 1)
+    assert settings.explain('MCU') == [Setting('STM32F303', 'leaf', 1), Setting('atmega32u4', 'root', 1)]
+
+    settings['MCU'] = 'RP2040'
+    del settings['BOOTLOADER']
+
+    assert dict(settings) == {'MCU': 'RP2040'}
+    assert len(settings) == 1
+
+    with TestCase().assertRaises(KeyError):
+        del settings['BOOTLOADER']
+
+    # The shared layers are left alone
+    assert dict(stack([root, leaf])) == {'MCU': 'STM32F303', 'BOOTLOADER': 'atmel-dfu'}
+
+
+def test_layers_order():
+    root = layer({'MCU': Setting('atmega32u4', 'root', 1), 'BOOTLOADER': Setting('atmel-dfu', 'root', 2)})
+    leaf = layer({'AUDIO_ENABLE': Setting('yes', 'leaf', 1), 'MCU': Setting('STM32F303', 'leaf', 2)})
+
+    assert list(stack([root, leaf])) == ['MCU', 'BOOTLOADER', 'AUDIO_ENABLE']
+
+    settings = stack([root, leaf], leaf_first=True)
+    settings['LTO_ENABLE'] = 'yes'
+    assert list(settings) == ['AUDIO_ENABLE', 'MCU', 'BOOTLOADER', 'LTO_ENABLE']
+    assert list(settings.copy()) == list(settings)
+
+
+def test_rules_mk_layer():
+    with TemporaryDirectory() as tmpdir:
+        parent_file = Path(tmpdir) / 'parent.mk'
+        parent_file.write_text('LAYOUTS = 60_ansi\nMCU ?= atmega32u4\n')
+        child_file = Path(tmpdir) / 'child.mk'
+        child_file.write_text('# A comment\nLAYOUTS += 60_iso\nMCU ?= STM32F303\nBOOTLOADER = caterina\n')
+
+        layers = [rules_mk_layer(parent_file, stack([]))]
+        layers.append(rules_mk_layer(child_file, stack(layers)))
+        rules = stack(layers)
+
+    assert dict(rules) == {'LAYOUTS': '60_ansi 60_iso', 'MCU': 'atmega32u4', 'BOOTLOADER': 'caterina'}
+    assert rules.source('LAYOUTS') == Setting('60_ansi 60_iso', str(child_file), 2)
+    assert rules.source('MCU') == Setting('atmega32u4', str(parent_file), 2)
+
+
+def test_config_h_provenance():
+    config = qmk.keyboard.config_h('handwired/pytest/basic')
+
+    assert config['MATRIX_ROWS'] == '1'
+    assert config.source('PRODUCT_ID') == Setting('0x6465', 'keyboards/handwired/pytest/config.h', 7)
@@ -0,0 +1,51 @@
+import json
+import pickle
+from copy import deepcopy
+
+from qmk.json_encoders import InfoJSONEncoder, json_default
+from qmk.layout import Key, Layout
+
+
+def test_key_behaves_like_dict():
+    key = Key({'x': 1, 'y': 0, 'w': 1, 'label': 'k00'})
+    assert key == {'x': 1, 'y': 0, 'w': 1, 'label': 'k00'}
+    assert 'matrix' not in key
+    assert key.get('h', 1) == 1
+
+    key.update({'matrix': [0, 0], 'h': 2})
+    assert key['matrix'] == [0, 0]
+    assert key.h == 2
+    assert len(key) == 6
+
+    del key['h']
+    assert 'h' not in key
+
+
+def test_key_serializes_like_dict():
+    key_dict = {'label': 'k00', 'matrix': [0, 0], 'x': 0, 'y': 0, 'w': 1.5}
+    layout = {'layouts': {'LAYOUT': {'layout': Layout.from_json([key_dict])}}}
+    expected = {'layouts': {'LAYOUT': {'layout': [key_dict]}}}
+    assert json.dumps(layout, cls=InfoJSONEncoder) == json.dumps(expected, cls=InfoJSONEncoder)
+    assert json.loads(json.dumps(layout, default=json_default)) == expected
+    assert json.dumps(layout, default=json_default) == json.dumps(expected)
+
+
+def test_key_keeps_order():
+    key = Key({'label': 'k00', 'matrix': [0, 0], 'x': 0, 'h': 2, 'hand': 'L'})
+    assert list(key) == ['label', 'matrix', 'x', 'h', 'hand']
+
+    key['w'] = 1
+    key['label'] = None
+    del key['x']
+    assert list(key) == ['matrix', 'h', 'hand', 'w']
+    assert list(deepcopy(key)) == list(key)
+    assert list(pickle.loads(pickle.dumps(key))) == list(key)
+
+
+def test_key_copies():
+    key = Key(x=0, y=0, matrix=[1, 2])
+    assert pickle.loads(pickle.dumps(key)) == key
+
+    key_copy = deepcopy(key)
+    key_copy['matrix'][0] = 3
+    assert key['matrix'] == [1, 2]
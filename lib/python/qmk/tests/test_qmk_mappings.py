@@ -0,0 +1,29 @@
+import qmk.mappings
+
+
+def _entry(mapping_name, key):
+    return next(entry for entry in qmk.mappings.load_mapping(mapping_name) if entry.key == key)
+
+
+def test_load_mapping_is_memoized():
+    assert qmk.mappings.load_mapping('info_config') is qmk.mappings.load_mapping('info_config')
+
+
+def test_config_h_round_trip():
+    entry = _entry('info_config', 'RGBLED_SPLIT')
+    info_data = {}
+    entry.set(info_data, entry.parse('{ 6, 6 }'))
+    assert info_data == {'rgblight': {'split_count': [6, 6]}}
+    assert entry.get(info_data) == [6, 6]
+    assert entry.format([6, 6]) == ['', '#ifndef RGBLED_SPLIT', '#   define RGBLED_SPLIT { 6, 6 }', '#endif // RGBLED_SPLIT']
+
+
+def test_rules_mk_format():
+    entry = _entry('info_rules', 'BOOTLOADER')
+    assert entry.format('atmel-dfu') == ['BOOTLOADER ?= atmel-dfu']
+    assert qmk.mappings.lookup(entry, {}) is None
+
+
+def test_mapped_keys():
+    assert 'usb' in qmk.mappings.mapped_keys('info_config')
+    assert 'keyboard_folder' not in qmk.mappings.mapped_keys('info_config')
@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from tempfile import TemporaryDirectory
 
 import qmk.path
 
@@ -12,3 +13,18 @@ def test_keymap_pytest_basic():
 def test_normpath():
     path = qmk.path.normpath('lib/python')
     assert path.samefile(Path(os.environ['ORIG_CWD']) / 'lib/python')
+
+
+def test_write_if_changed():
+    with TemporaryDirectory() as tmpdir:
+        test_file = Path(tmpdir, 'test_write_if_changed.h')
+
+        assert qmk.path.write_if_changed(test_file, '#pragma once\n')
+        os.utime(test_file, (0, 0))
+
+        assert not qmk.path.write_if_changed(test_file, '#pragma once\n')
+        assert test_file.stat().st_mtime == 0
+
+        assert qmk.path.write_if_changed(test_file, '#pragma once\n#define FOO\n')
+        assert test_file.read_text() == '#pragma once\n#define FOO\n'
+        assert not list(test_file.parent.glob('.test_write_if_changed.h.*'))
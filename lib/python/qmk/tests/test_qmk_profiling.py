@@ -0,0 +1,35 @@
+import qmk.profiling
+from qmk.profiling import profile_keyboard, profile_stage, profiling
+
+
+@profile_stage
+def _allocate():
+    return [0] * 100000
+
+
+def _profile_allocate():
+    with profiling() as profile:
+        with profile_keyboard('handwired/pytest/basic'):
+            _allocate()
+
+    return profile['keyboards']['handwired/pytest/basic']
+
+
+def test_profile_peak():
+    keyboard_data = _profile_allocate()
+    assert keyboard_data['stages']['test_qmk_profiling._allocate']['peak'] >= 800000
+    assert keyboard_data['peak'] >= 800000
+
+
+def test_profile_peak_without_reset_peak():
+    exact_peaks = qmk.profiling._exact_peaks
+    qmk.profiling._exact_peaks = False
+
+    try:
+        keyboard_data = _profile_allocate()
+        stage = keyboard_data['stages']['test_qmk_profiling._allocate']
+        assert stage['calls'] == 1
+        assert stage['peak'] >= 800000
+
+    finally:
+        qmk.profiling._exact_peaks = exact_peaks
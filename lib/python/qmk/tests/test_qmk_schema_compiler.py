@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+from unittest import TestCase
+
+import jsonschema
+
+from qmk.json_schema import Validator, compiled_validator, interpreted_validator, json_load, keyboard_validate, keyboard_validate_key
+from qmk.path import keyboard
+from qmk.schema_compiler import UnsupportedSchemaError, compile_schema, schema_nodes
+
+schema = {
+    '$id': 'test.schema',
+    'type': 'object',
+    'additionalProperties': False,
+    'required': ['name'],
+    'properties': {
+        'name': {'type': 'string', 'minLength': 1, 'pattern': '^[a-z]+$'},
+        'pin': {'$ref': '#/definitions/pin'},
+        'size': {'type': 'number', 'minimum': 0, 'maximum': 10, 'multipleOf': 0.25},
+        'mode': {'type': 'string', 'enum': ['COL2ROW', 'ROW2COL']},
+        'pins': {'type': 'array', 'minItems': 1, 'maxItems': 2, 'items': {'$ref': '#/definitions/pin'}},
+        'either': {'oneOf': [{'type': 'string'}, {'type': 'integer'}, {'type': 'number'}]},
+        'both': {'allOf': [{'type': 'integer'}, {'maximum': 3}]},
+        'labels': {'type': 'object', 'additionalProperties': {'type': 'string', 'maxLength': 3}},
+    },
+    'definitions': {
+        'pin': {'type': ['string', 'null'], 'pattern': '^[A-K]\\d{1,2}$'},
+    },
+}
+
+instances = [
+    {'name': 'ok', 'pin': 'B1', 'size': 1.5, 'mode': 'COL2ROW', 'pins': ['A1', None], 'either': 'x', 'both': 2, 'labels': {'a': 'abc'}},
+    [],
+    {},
+    {'name': ''},
+    {'name': 'UPPER'},
+    {'name': 'ok', 'extra': 1, 'more': 2},
+    {'name': 'ok', 'pin': 'Z1'},
+    {'name': 'ok', 'pin': 7},
+    {'name': 'ok', 'size': -1},
+    {'name': 'ok', 'size': 11},
+    {'name': 'ok', 'size': 0.3},
+    {'name': 'ok', 'size': True},
+    {'name': 'ok', 'mode': 'DIRECT'},
+    {'name': 'ok', 'pins': []},
+    {'name': 'ok', 'pins': ['A1', 'A2', 'A3']},
+    {'name': 'ok', 'pins': ['A1', 'Q2']},
+    {'name': 'ok', 'either': 1},
+    {'name': 'ok', 'either': []},
+    {'name': 'ok', 'both': 4},
+    {'name': 'ok', 'both': 1.5},
+    {'name': 'ok', 'labels': {'a': 'abcd'}},
+]
+
+
+def _compiled(documents):
+    namespace = {}
+    exec(compile_schema(documents), namespace)
+    namespace['nodes'] = schema_nodes(documents, namespace['NODE_PATHS'])
+
+    return SimpleNamespace(**namespace)
+
+
+def _error(validate, instance):
+    try:
+        validate(instance)
+
+    except jsonschema.ValidationError as e:
+        return e.message, list(e.absolute_path), list(e.schema_path), e.validator, e.validator_value, e.instance, str(e)
+
+
+def _compiled_error(module, instance):
+    error = module.validate(instance)
+
+    if error:
+        message, path, schema_path, keyword, node, instance = error
+        node = module.nodes[node]
+
+        return message, list(path), list(schema_path), keyword, node[keyword] if keyword else None, instance, str(jsonschema.ValidationError(message, validator=keyword, path=path, schema_path=schema_path, instance=instance, validator_value=node[keyword] if keyword else None, schema=node))
+
+
+def test_compiled_errors_match_jsonschema():
+    module = _compiled([schema])
+
+    for instance in instances:
+        assert _compiled_error(module, instance) == _error(Validator(schema).validate, instance), instance
+
+
+def test_compile_unsupported_keyword():
+    with TestCase().assertRaises(UnsupportedSchemaError):
+        compile_schema([{'type': 'object', 'patternProperties': {'^a': {'type': 'string'}}}])
+
+
+def test_keyboard_validate_compiled():
+    assert compiled_validator('keyboard')
+    assert compiled_validator('api_keyboard')
+
+    info_data = json_load(keyboard('handwired/pytest/basic') / 'info.json')
+    keyboard_validate(info_data)
+
+    info_data = dict(info_data, matrix_pins={'cols': ['B1', 'Q9'], 'rows': ['D1']})
+
+    with TestCase().assertRaises(jsonschema.ValidationError) as compiled:
+        keyboard_validate(info_data)
+
+    with TestCase().assertRaises(jsonschema.ValidationError) as interpreted:
+        interpreted_validator('keyboard').validate(info_data)
+
+    assert str(compiled.exception) == str(interpreted.exception)
+    assert list(compiled.exception.absolute_path) == ['matrix_pins', 'cols', 1]
+
+
+def test_keyboard_validate_key_compiled():
+    keyboard_validate_key('diode_direction', 'COL2ROW')
+
+    with TestCase().assertRaises(jsonschema.ValidationError) as e:
+        keyboard_validate_key('diode_direction', 'SIDEWAYS')
+
+    assert list(e.exception.schema_path) == ['enum']
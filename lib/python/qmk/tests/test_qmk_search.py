@@ -0,0 +1,63 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import qmk.search
+
+
+def _database(tmpdir):
+    db = qmk.search.connect(Path(tmpdir) / 'search.sqlite')
+    keyboards = {
+        'one': {'processor': 'STM32F303', 'features': {'rgblight': True}, 'matrix_size': {'cols': 15, 'rows': 5}, 'community_layouts': ['60_ansi', '60_iso'], 'usb': {'vid': '0xFEED'}},
+        'two': {'processor': 'atmega32u4', 'features': {'rgblight': False}, 'matrix_size': {'cols': 12, 'rows': 4}, 'usb': {'vid': '0x4B50'}},
+        'vendor/three': {'processor': 'STM32F303', 'matrix_size': {'cols': 21, 'rows': 6}, 'layouts': {'LAYOUT': {'layout': [{'x': 0, 'y': 0}]}}},
+    }
+
+    with db:
+        for keyboard, info_data in keyboards.items():
+            db.execute('INSERT INTO keyboards VALUES (?, ?)', (keyboard, ''))
+            db.executemany('INSERT INTO fields VALUES (?, ?, ?, ?)', ((keyboard, *row) for row in qmk.search.flatten(info_data)))
+
+    return db
+
+
+def test_find():
+    cases = [
+        ('processor=STM32F303 and features.rgblight and matrix_size.cols>14', ['one']),
+        ('processor=stm32f303', ['one', 'vendor/three']),
+        ('features.rgblight', ['one']),
+        ('not features.rgblight', ['two', 'vendor/three']),
+        ('matrix_size.cols >= 15 and not (matrix_size.rows=6 or usb.vid=0xfeed)', []),
+        ('processor!=STM32F303', ['two']),
+        ('community_layouts=60_iso', ['one']),
+        ('usb.vid<0x5000', ['two']),
+        ('layouts.LAYOUT', ['vendor/three']),
+        ('processor="atmega*"', ['two']),
+    ]
+
+    with TemporaryDirectory() as tmpdir:
+        db = _database(tmpdir)
+
+        for expression, expected in cases:
+            assert qmk.search.find(db, [expression]) == expected, expression
+
+        db.close()
+
+
+def test_invalid_filter():
+    for expression in '', 'processor=', '(processor', 'processor=a b', 'and':
+        with TestCase().assertRaises(ValueError):
+            qmk.search.compile_filter(expression)
+
+
+def test_refresh():
+    with TemporaryDirectory() as tmpdir:
+        db = qmk.search.connect(Path(tmpdir) / 'search.sqlite')
+
+        assert qmk.search.refresh(db, ['handwired/pytest/basic']) == 1
+        assert qmk.search.refresh(db, ['handwired/pytest/basic']) == 0
+        assert qmk.search.find(db, ['keyboard_folder=handwired/pytest/basic and usb.pid=0x6465']) == ['handwired/pytest/basic']
+
+        qmk.search.refresh(db, [])
+        assert qmk.search.find(db) == []
+        db.close()
@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+import qmk.usb_index
+from qmk.keyboard import list_keyboards
+
+
+def test_parse_usb_id():
+    assert qmk.usb_index.parse_usb_id('feed:6060') == '0xFEED:0x6060'
+    assert qmk.usb_index.parse_usb_id('0xFEED:0x6060') == '0xFEED:0x6060'
+
+    for bad in 'feed', 'feed:', 'feed:zz', '10000:6060':
+        with TestCase().assertRaises(ValueError):
+            qmk.usb_index.parse_usb_id(bad)
+
+
+def test_build_index():
+    usb_list = {}
+    qmk.usb_index.add_keyboard(usb_list, 'one', {'usb': {'vid': '0xFEED', 'pid': '0x6060', 'device_ver': '0x0001'}})
+    qmk.usb_index.add_keyboard(usb_list, 'two', {'usb': {'vid': '0xfeed', 'pid': '0x6060', 'device_ver': '0x0002'}})
+    qmk.usb_index.add_keyboard(usb_list, 'three', {'usb': {'vid': '0xFEED', 'pid': '0x0003'}})
+    qmk.usb_index.add_keyboard(usb_list, 'no_usb', {})
+    index = qmk.usb_index.build_index(usb_list)
+
+    assert qmk.usb_index.lookup(index, qmk.usb_index.parse_usb_id('feed:6060')) == {
+        'one': {'vid': '0xFEED', 'pid': '0x6060', 'device_ver': '0x0001'},
+        'two': {'vid': '0xfeed', 'pid': '0x6060', 'device_ver': '0x0002'},
+    }
+    assert list(qmk.usb_index.lookup(index, '0xFEED:0x0003')) == ['three']
+    assert qmk.usb_index.lookup(index, '0xFEED:0x0004') == {}
+    assert qmk.usb_index.collisions(index) == {'0xFEED:0x6060': ['one', 'two']}
+
+
+def test_refresh_index():
+    usb = {'device_ver': '0x0001', 'pid': '0x6465', 'vid': '0xFEED'}
+    keyboards = list_keyboards()
+    index = qmk.usb_index.build_index({'0xFEED': {'0x0000': {'gone/keyboard': {}, 'handwired/pytest/basic': {}}}}, keyboards + ['gone/keyboard'], qmk.usb_index.source_signatures())
+    assert qmk.usb_index.refresh_index(index) == (index, 0)
+
+    # Only the keyboards under a changed file are looked up again, and keyboards that no longer exist are removed
+    index['sources']['keyboards/handwired/pytest/config.h'] = 'stale'
+    refreshed, updated = qmk.usb_index.refresh_index(index)
+    assert updated == len([keyboard for keyboard in keyboards if keyboard.startswith('handwired/pytest/')])
+    assert refreshed['keyboards'] == keyboards
+    assert refreshed['sources'] == qmk.usb_index.source_signatures()
+    assert '0xFEED:0x0000' not in refreshed['devices']
+    assert refreshed['devices']['0xFEED:0x6465']['handwired/pytest/basic'] == usb
+    assert qmk.usb_index.refresh_index(refreshed) == (refreshed, 0)
@@ -0,0 +1,203 @@
+"""An index of USB vendor and product IDs to the keyboards that use them.
+
+`qmk generate-api` rebuilds the index every time it runs, and `qmk find-usb` builds it the first time it's needed. The index is stored with the size and mtime of every info.json, config.h and rules.mk in `keyboards/`. Before a lookup these are checked with a stat call each, and only the keyboards under a changed file are looked up again. Looking up a device is then a single dictionary access, no info.json data is built.
+"""
+import json
+from pathlib import Path
+
+from milc import cli
+
+from qmk import info_cache, keyboard_index
+from qmk.constants import BUILD_DIR
+from qmk.info import lazy_info_json
+from qmk.keyboard import list_keyboards
+from qmk.parse_cache import shared_parses
+from qmk.path import write_if_changed
+
+# Bump this when the format of the index changes
+INDEX_VERSION = 3
+INDEX_FILE = Path(BUILD_DIR) / 'usb_index.json'
+
+# The files in a keyboard's directories that its USB IDs can come from
+USB_SOURCES = ('info.json', 'config.h', 'rules.mk')
+
+
+def _hex_id(value):
+    """Returns a VID, PID or device version in the `0xFEED` form used by info.json.
+    """
+    try:
+        return '0x%04X' % (int(value, 16),)
+
+    except ValueError:
+        return value.upper()
+
+
+def usb_id(vid, pid):
+    """Returns the `0xFEED:0x6060` style ID the index uses for a VID and PID.
+    """
+    return f'{_hex_id(vid)}:{_hex_id(pid)}'
+
+
+def parse_usb_id(text):
+    """Parse a `VID:PID` string, such as `feed:6060` or `0xFEED:0x6060`, into the ID used by the index.
+
+    Raises ValueError if `text` isn't a pair of hexadecimal numbers.
+    """
+    vid, sep, pid = text.partition(':')
+
+    if not sep:
+        raise ValueError(f'{text} is not in VID:PID form')
+
+    for value in vid, pid:
+        if not 0 <= int(value, 16) <= 0xFFFF:
+            raise ValueError(f'{value} is not a 16 bit number')
+
+    return usb_id(vid, pid)
+
+
+def add_keyboard(usb_list, keyboard_name, keyboard_info):
+    """Add a keyboard to a mapping of USB VID -> PID -> keyboard -> usb data, as written to usb.json.
+    """
+    if 'usb' in keyboard_info:
+        usb = keyboard_info['usb']
+
+        if 'vid' in usb and usb['vid'] not in usb_list:
+            usb_list[usb['vid']] = {}
+
+        if 'pid' in usb and usb['pid'] not in usb_list[usb['vid']]:
+            usb_list[usb['vid']][usb['pid']] = {}
+
+        if 'vid' in usb and 'pid' in usb:
+            usb_list[usb['vid']][usb['pid']][keyboard_name] = usb
+
+
+def keyboards_usb_list(keyboards):
+    """Returns the mapping of USB VID -> PID -> keyboard -> usb data for a list of keyboards.
+
+    Only the parts of the info.json pipeline that can set `usb` are run.
+    """
+    usb_list = {}
+
+    with shared_parses():
+        for keyboard in keyboards:
+            add_keyboard(usb_list, keyboard, lazy_info_json(keyboard).sections('usb'))
+
+    return usb_list
+
+
+def source_signatures():
+    """Returns the size and mtime of every file in `keyboards/` that a keyboard's USB IDs can come from.
+
+    The tree is walked through `qmk.keyboard_index`, so this costs a stat call for each directory and file rather than running the info.json pipeline. Keymaps can't set USB IDs and are skipped.
+    """
+    signatures = {}
+    pending = ['keyboards']
+
+    while pending:
+        path = pending.pop()
+        files = keyboard_index.files(path)
+
+        for file in USB_SOURCES:
+            if file in files:
+                signatures[f'{path}/{file}'] = keyboard_index.file_signature(f'{path}/{file}')
+
+        pending.extend(f'{path}/{subdir}' for subdir in keyboard_index.subdirectories(path) if subdir != 'keymaps')
+
+    return signatures
+
+
+def build_index(usb_list, keyboards=(), sources=None, devices=None):
+    """Returns an index built from a mapping of USB VID -> PID -> keyboard -> usb data.
+
+    `keyboards` and `sources`, as returned by `source_signatures()`, are stored with the index so `refresh_index()` can tell what has changed since. The keyboards in `usb_list` are added to `devices`, the devices of an existing index, if it is given.
+    """
+    devices = {device: dict(device_keyboards) for device, device_keyboards in (devices or {}).items()}
+
+    for vid, pids in usb_list.items():
+        for pid, device_keyboards in pids.items():
+            devices.setdefault(usb_id(vid, pid), {}).update(device_keyboards)
+
+    return {
+        'version': INDEX_VERSION,
+        'global_digest': info_cache.global_digest(),
+        'keyboards': sorted(keyboards),
+        'sources': dict(sorted((sources or {}).items())),
+        'devices': {device: dict(sorted(device_keyboards.items())) for device, device_keyboards in sorted(devices.items()) if device_keyboards},
+    }
+
+
+def refresh_index(index):
+    """Bring an index up to date with the files in `keyboards/`.
+
+    When none of the files that USB IDs come from have changed, see `source_signatures()`, the index is returned as it is. Otherwise the keyboards in or under a directory with a changed file, and new keyboards, are looked up again, and keyboards that no longer exist are removed. Pass None for `index` to build it from scratch.
+
+    Returns:
+        a tuple of the index and the number of keyboards that were looked up
+    """
+    sources = source_signatures()
+
+    if index and index['sources'] == sources and index['global_digest'] == info_cache.global_digest():
+        return index, 0
+
+    keyboards = list_keyboards()
+
+    if index and index['global_digest'] == info_cache.global_digest():
+        stored = set(index['keyboards'])
+        changed_dirs = {path.rsplit('/', 1)[0] + '/' for path in sources.keys() | index['sources'].keys() if sources.get(path) != index['sources'].get(path)}
+        changed = [keyboard for keyboard in keyboards if keyboard not in stored or any(f'keyboards/{keyboard}/'.startswith(changed_dir) for changed_dir in changed_dirs)]
+        stale = set(changed) | (stored - set(keyboards))
+        devices = {device: {keyboard: usb for keyboard, usb in device_keyboards.items() if keyboard not in stale} for device, device_keyboards in index['devices'].items()}
+
+    else:
+        changed = keyboards
+        devices = {}
+
+    if changed:
+        cli.log.info('Updating the USB index for %d keyboards.', len(changed))
+
+    return build_index(keyboards_usb_list(changed), keyboards, sources, devices), len(changed)
+
+
+def collisions(index):
+    """Returns the IDs that more than one keyboard uses, and the keyboards that use them.
+    """
+    return {device: sorted(keyboards) for device, keyboards in index['devices'].items() if len(keyboards) > 1}
+
+
+def log_collisions(index):
+    """Warn about IDs that more than one keyboard uses, listing them when running with `-v`.
+    """
+    shared = collisions(index)
+
+    if shared:
+        cli.log.warning('%d USB IDs are used by more than one keyboard, run `qmk find-usb --collisions` to list them.', len(shared))
+
+        for device, keyboards in shared.items():
+            cli.log.debug('%s is used by %s', device, ', '.join(keyboards))
+
+
+def write_index(index):
+    """Save the index to `INDEX_FILE`.
+    """
+    write_if_changed(INDEX_FILE, json.dumps(index, indent=4))
+
+
+def load_index():
+    """Returns the saved index, or None if there isn't a usable one.
+    """
+    try:
+        index = json.loads(INDEX_FILE.read_text(encoding='utf-8'))
+
+    except (OSError, ValueError):
+        return None
+
+    if index.get('version') != INDEX_VERSION:
+        return None
+
+    return index
+
+
+def lookup(index, device):
+    """Returns the keyboards that use a device ID, as returned by `parse_usb_id()`, along with their usb data.
+    """
+    return index['devices'].get(device, {})